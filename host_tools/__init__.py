@@ -0,0 +1,2 @@
+NAME = "MCP342X host tools (CPython)"
+VERSION = "1.0"
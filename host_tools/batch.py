@@ -0,0 +1,269 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Пакетная обработка каталогов записей (captures) MCP342X на хосте, параллельно на всех ядрах процессора:
+декодирование, калибровка, фильтр (усреднение), статистика и итоговая таблица CSV.
+Каждый файл обрабатывается целиком в одном процессе из пула, частями по chunk_size отсчетов, поэтому объем
+памяти не зависит от размера файла. Виды записей (по расширению файла):
+    .bin    'сырые' отсчеты int32, младшим байтом вперед (host_tools/noise.py)
+    .log    журнал FlashLogger (sensor_pack_2/flashlog.py)
+    .frm    запись потока кадров FrameWriter (sensor_pack_2/framing.py), например, сохраненный вывод UART
+Настройки АЦП записей .bin и .log берутся из имени файла (..._ch1_rate3_gain0.bin) или из параметров командной
+строки; в записях .frm они передаются кадрами настроек.
+Запуск:
+    python -m host_tools.batch logs/ -o summary.csv --calibration cal.txt --average 4 --jobs 8"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from host_tools.noise import mcp342x_params, read_capture_chunks, RunningStats, MCP342X_REF_VOLTAGE
+from host_tools.serial_stream import FrameDecoder, stream_config
+from sensor_pack_2.adcmod import RAW_GAP
+from sensor_pack_2.calibration import CalibrationTable
+from sensor_pack_2.flashlog import read_log
+
+# расширения файлов записей
+CAPTURE_EXTENSIONS = ".bin", ".log", ".frm"
+
+# настройка АЦП, при которой сделана запись
+capture_settings = namedtuple("capture_settings", "channel data_rate_raw gain_raw")
+
+# параметры обработки
+# default - настройка АЦП (capture_settings) для записей без нее в имени файла
+# calibration - путь к файлу CalibrationTable или None
+# average - кол-во усредняемых подряд отсчетов (1 - без фильтра)
+# chunk_size - отсчетов в части записи
+# block_size - размер блока журнала FlashLogger, байт
+# ref_voltage - опорное напряжение АЦП, Вольт
+batch_options = namedtuple("batch_options", "default calibration average chunk_size block_size ref_voltage")
+
+# строка итоговой таблицы
+# count - кол-во отсчетов после фильтра, gaps - кол-во пропусков (RAW_GAP) в записи
+# mean, std, min, max - статистика отсчетов после калибровки и фильтра, Вольт
+summary_row = namedtuple("summary_row", "path channel data_rate_raw gain_raw count gaps mean std min max")
+# результат обработки файла: строки summary_row (по одной на настройку АЦП) и текст ошибки или None
+file_result = namedtuple("file_result", "path rows error")
+
+_settings_re = {name: re.compile(rf"(?:^|[_\-.]){name}(\d+)") for name in ("ch", "rate", "gain")}
+
+# параметры и таблица калибровки процесса пула, задаются один раз, при его запуске
+_options = None
+_calibration = None
+
+
+def settings_from_name(path: str, default: capture_settings) -> capture_settings:
+    """Настройка АЦП из имени файла: части ch<N>, rate<N>, gain<N>. Отсутствующие части берутся из default"""
+    name = os.path.basename(path).lower()
+    values = []
+    for key, dflt in zip(("ch", "rate", "gain"), default):
+        m = _settings_re[key].search(name)
+        values.append(int(m.group(1)) if m else dflt)
+    return capture_settings(*values)
+
+
+class _Filter:
+    """Фильтр: среднее каждых n отсчетов подряд (с прореживанием в n раз). Остаток части, не кратный n,
+    переносится в следующую часть, поэтому результат не зависит от размера частей"""
+
+    def __init__(self, n: int):
+        self._n = n
+        self._rest = np.empty(0, dtype=np.float64)
+
+    def apply(self, x: np.ndarray) -> np.ndarray:
+        n = self._n
+        if 1 == n:
+            return x
+        if self._rest.size:
+            x = np.concatenate((self._rest, x))
+        m = x.size - x.size % n
+        self._rest = x[m:].copy()
+        return x[:m].reshape(-1, n).mean(axis=1)
+
+
+class _Stats:
+    """Статистика отсчетов одной настройки АЦП после калибровки и фильтра"""
+
+    def __init__(self, settings: capture_settings, lsb: float, offset: float, gain: float, average: int):
+        self.settings = settings
+        # 'сырой' отсчет в Вольты с калибровкой: (raw - offset) * lsb * gain
+        self._k = lsb * gain
+        self._offset = offset
+        self._filter = _Filter(average)
+        self._stats = RunningStats()
+        self.gaps = 0
+
+    def update(self, raw: np.ndarray):
+        """Добавляет часть записи, массив 'сырых' отсчетов"""
+        valid = raw != RAW_GAP
+        self.gaps += raw.size - int(np.count_nonzero(valid))
+        self._stats.update(self._filter.apply((raw[valid] - self._offset) * self._k))
+
+    def row(self, path: str) -> summary_row:
+        s, st = self.settings, self._stats
+        n = st.count
+        return summary_row(path, s.channel, s.data_rate_raw, s.gain_raw, n, self.gaps,
+                           float(st.mean) if n else None, st.std,
+                           None if st.min is None else float(st.min), None if st.max is None else float(st.max))
+
+
+def _init_worker(options: batch_options):
+    """Инициализация процесса пула"""
+    global _options, _calibration
+    _options = options
+    _calibration = CalibrationTable.load(options.calibration) if options.calibration else None
+
+
+def _log_chunks(path: str, block_size: int, chunk_size: int):
+    """Отсчеты журнала FlashLogger частями примерно по chunk_size отсчетов (целыми блоками)"""
+    parts, n = [], 0
+    for blk in read_log(path, block_size):
+        parts.append(np.frombuffer(blk.values, dtype=np.int32))
+        n += len(blk.values)
+        if n >= chunk_size:
+            yield np.concatenate(parts)
+            parts, n = [], 0
+    if parts:
+        yield np.concatenate(parts)
+
+
+def _frame_chunks(path: str, default: capture_settings, chunk_size: int):
+    """Пары (capture_settings, отсчеты) из записи потока кадров. Файл читается частями по 4 * chunk_size байт"""
+    decoder = FrameDecoder()
+    rate, gain = default.data_rate_raw, default.gain_raw
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(4 * chunk_size)
+            if not data:
+                return
+            for frame in decoder.feed(data):
+                if isinstance(frame, stream_config):
+                    rate, gain = frame.data_rate_raw, frame.gain_raw
+                    continue
+                yield capture_settings(frame.channel, rate, gain), frame.values
+
+
+def _settings_chunks(path: str, opt: batch_options):
+    """Пары (capture_settings, отсчеты) записи path"""
+    ext = os.path.splitext(path)[1].lower()
+    if ".frm" == ext:
+        yield from _frame_chunks(path, opt.default, opt.chunk_size)
+        return
+    settings = settings_from_name(path, opt.default)
+    if ".log" == ext:
+        chunks = _log_chunks(path, opt.block_size, opt.chunk_size)
+    else:
+        chunks = read_capture_chunks(path, chunk_size=opt.chunk_size)
+    for chunk in chunks:
+        yield settings, chunk
+
+
+def _new_stats(settings: capture_settings, opt: batch_options) -> _Stats:
+    lsb = mcp342x_params(settings.data_rate_raw, settings.gain_raw, opt.ref_voltage)[1]
+    cc = None if _calibration is None else _calibration.get(settings.channel, settings.gain_raw,
+                                                             settings.data_rate_raw)
+    offset, gain = (0.0, 1.0) if cc is None else (cc.offset, cc.gain)
+    return _Stats(settings, lsb, offset, gain, opt.average)
+
+
+def process_file(path: str) -> file_result:
+    """Обработка одной записи в процессе пула. Ошибка чтения или декодирования не прерывает пакетную обработку"""
+    opt = _options
+    stats = {}
+    try:
+        for settings, chunk in _settings_chunks(path, opt):
+            st = stats.get(settings)
+            if st is None:
+                st = stats[settings] = _new_stats(settings, opt)
+            st.update(chunk)
+        if not stats:
+            raise ValueError("Нет отсчетов в записи!")
+    except (OSError, ValueError, IndexError) as e:
+        return file_result(path, (), f"{type(e).__name__}: {e}")
+    return file_result(path, tuple(stats[s].row(path) for s in sorted(stats)), None)
+
+
+def find_captures(paths) -> list:
+    """Файлы записей (по CAPTURE_EXTENSIONS) в paths (файлы и каталоги, с подкаталогами), по алфавиту"""
+    found = []
+    for p in paths:
+        if os.path.isfile(p):
+            found.append(p)
+            continue
+        for root, dirs, files in os.walk(p):
+            dirs.sort()
+            found.extend(os.path.join(root, name) for name in sorted(files)
+                         if os.path.splitext(name)[1].lower() in CAPTURE_EXTENSIONS)
+    return found
+
+
+def run_batch(paths, options: batch_options, jobs: [int, None] = None, files_per_task: int = 4):
+    """Генератор file_result записей paths, в порядке paths, обработанных пулом из jobs процессов (None - по кол-ву
+    ядер). files_per_task - кол-во файлов, передаваемых процессу за раз (меньше накладных расходов на тысячах
+    небольших файлов)"""
+    if jobs is not None and 1 == jobs:
+        _init_worker(options)
+        yield from map(process_file, paths)
+        return
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(options,)) as pool:
+        yield from pool.map(process_file, paths, chunksize=files_per_task)
+
+
+def _format(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        return f"{value:.9g}"
+    return str(value)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m host_tools.batch",
+                                     description="Пакетная обработка записей MCP342X: калибровка, фильтр, статистика.")
+    parser.add_argument("paths", nargs="+", help="файлы записей и каталоги с ними")
+    parser.add_argument("-o", "--output", default="-", help="итоговая таблица CSV (по умолчанию stdout)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="кол-во процессов (по умолчанию по кол-ву ядер)")
+    parser.add_argument("--calibration", default=None, help="файл таблицы калибровки (CalibrationTable.save)")
+    parser.add_argument("--average", type=int, default=1, help="кол-во усредняемых подряд отсчетов")
+    parser.add_argument("--channel", type=int, default=0, help="канал записей без настроек в имени файла")
+    parser.add_argument("--rate", type=int, default=3, help="'сырая' частота преобразования записей без настроек")
+    parser.add_argument("--gain", type=int, default=0, help="'сырое' усиление записей без настроек")
+    parser.add_argument("--chunk-size", type=int, default=1 << 16, help="отсчетов в части записи")
+    parser.add_argument("--block-size", type=int, default=4096, help="размер блока журнала FlashLogger, байт")
+    args = parser.parse_args(argv)
+    if args.average < 1 or args.chunk_size < 1 or not 0 <= args.rate < 4 or not 0 <= args.gain < 4 \
+            or args.jobs is not None and args.jobs < 1:
+        parser.error("неверные параметры обработки")
+
+    options = batch_options(capture_settings(args.channel, args.rate, args.gain), args.calibration, args.average,
+                            args.chunk_size, args.block_size, MCP342X_REF_VOLTAGE)
+    files = find_captures(args.paths)
+    start = time.monotonic()
+    errors = rows = 0
+    out = sys.stdout if "-" == args.output else open(args.output, "w", newline="")
+    try:
+        writer = csv.writer(out)
+        writer.writerow(summary_row._fields)
+        for res in run_batch(files, options, args.jobs):
+            if res.error is not None:
+                errors += 1
+                print(f"{res.path}: {res.error}", file=sys.stderr)
+            for row in res.rows:
+                writer.writerow([_format(v) for v in row])
+                rows += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Файлов: {len(files)}, строк: {rows}, ошибок: {errors}, время: {time.monotonic() - start:.1f} с",
+          file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
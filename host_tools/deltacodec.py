@@ -0,0 +1,53 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Быстрый (NumPy) декодер потока, закодированного sensor_pack_2.deltacodec.DeltaEncoder.
+Все varint декодируются векторно, цикл Python только по блокам (один на keyframe_interval отсчетов)."""
+
+import numpy as np
+
+
+def decode_varints(data) -> np.ndarray:
+    """Декодирует все varint из data. Возвращает массив int64 значений без знака"""
+    b = np.frombuffer(data, dtype=np.uint8)
+    if 0 == b.size:
+        return np.empty(0, dtype=np.int64)
+    ends = (b & 0x80) == 0
+    if not ends[-1]:
+        raise ValueError("Неожиданный конец данных varint!")
+    end_idx = np.flatnonzero(ends)
+    starts = np.empty_like(end_idx)
+    starts[0] = 0
+    starts[1:] = end_idx[:-1] + 1
+    # номер varint для каждого байта и место байта в нем
+    ids = np.cumsum(ends) - ends
+    pos = np.arange(b.size) - starts[ids]
+    parts = (b & 0x7F).astype(np.int64) << (7 * pos)
+    return np.add.reduceat(parts, starts)
+
+
+def decode(data) -> np.ndarray:
+    """Декодирует все блоки data. Возвращает массив int32 отсчетов"""
+    vals = decode_varints(data)
+    total = vals.size
+    # заголовки блоков (кол-во отсчетов в блоке)
+    heads, counts = [], []
+    i = 0
+    while i < total:
+        n = int(vals[i])
+        if 0 == n or i + 1 + n > total:
+            raise ValueError("Поврежденный или неполный блок!")
+        heads.append(i)
+        counts.append(n)
+        i += 1 + n
+    mask = np.ones(total, dtype=bool)
+    mask[heads] = False
+    zz = vals[mask]
+    d = (zz >> 1) ^ -(zz & 1)   # zig-zag
+    c = np.cumsum(d)
+    counts = np.asarray(counts, dtype=np.int64)
+    # первый отсчет блока абсолютный: вычитается накопленная сумма предыдущих блоков
+    block_starts = np.cumsum(counts) - counts
+    base = np.zeros(counts.size, dtype=np.int64)
+    base[1:] = c[block_starts[1:] - 1]
+    return (c - np.repeat(base, counts)).astype(np.int32)
@@ -0,0 +1,196 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Анализ шума 'сырых' записей (captures) MCP342X на хосте: СКЗ (RMS) и размах (peak-to-peak) шума,
+ENOB, эффективное разрешение, разрешение без шума (noise-free) и спектральная плотность шума (метод Уэлча).
+Записи обрабатываются векторно (NumPy), частями (chunks), поэтому размер записи не ограничен объемом памяти."""
+
+import math
+from collections import namedtuple
+import numpy as np
+
+# опорное напряжение MCP342X, Вольт
+MCP342X_REF_VOLTAGE = 2.048
+# частота преобразования MCP342X по 'сырому' значению, Гц
+MCP342X_SAMPLE_RATES = 240, 60, 15, 3.75
+
+# настройка АЦП, при которой сделана запись
+adc_config = namedtuple("adc_config", "data_rate_raw gain_raw")
+
+# результат анализа
+# config - настройка АЦП (adc_config)
+# count - кол-во отсчетов
+# mean - среднее значение, Вольт
+# rms - СКЗ шума, Вольт
+# p2p - размах шума, Вольт
+# rms_lsb, p2p_lsb - то же, в единицах младшего разряда
+# enob - эффективное кол-во бит, log2(FSR / (rms * sqrt(12)))
+# effective_resolution - log2(FSR / rms)
+# noise_free_bits - log2(FSR / p2p)
+# freq - частоты спектральной плотности, Гц (None, если отсчетов меньше nperseg)
+# nsd - спектральная плотность шума, В/sqrt(Гц) (None, если отсчетов меньше nperseg)
+noise_stats = namedtuple("noise_stats", "config count mean rms p2p rms_lsb p2p_lsb enob effective_resolution "
+                                        "noise_free_bits freq nsd")
+
+
+def mcp342x_params(data_rate_raw: int, gain_raw: int, ref_voltage: float = MCP342X_REF_VOLTAGE) -> tuple:
+    """Возвращает (кол-во бит в отсчете, цену младшего разряда в Вольтах, частоту преобразования в Гц)
+    для 'сырых' настроек MCP342X"""
+    resolution = 12 + 2 * data_rate_raw
+    lsb = 2 * ref_voltage / (2 ** gain_raw * 2 ** resolution)
+    return resolution, lsb, MCP342X_SAMPLE_RATES[data_rate_raw]
+
+
+class RunningStats:
+    """Кол-во, среднее, сумма квадратов отклонений от среднего, наименьшее и наибольшее значение массивов, переданных
+    методу update по очереди. Части объединяются по формулам Чана, поэтому результат не зависит от размера частей"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, x: np.ndarray):
+        """Добавляет часть, массив значений"""
+        n = x.size
+        if 0 == n:
+            return
+        mean = x.mean()
+        m2 = np.square(x - mean).sum()
+        total = self.count + n
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+        lo, hi = x.min(), x.max()
+        self.min = lo if self.min is None else min(self.min, lo)
+        self.max = hi if self.max is None else max(self.max, hi)
+
+    @property
+    def std(self) -> [float, None]:
+        """Среднеквадратическое отклонение или None, если значений нет"""
+        return math.sqrt(self.m2 / self.count) if self.count else None
+
+
+class NoiseAccumulator:
+    """Накопитель статистики шума одной настройки АЦП. Части записи передаются методу update по очереди,
+    после последней части каждой записи вызывается end_capture."""
+
+    def __init__(self, config: adc_config, nperseg: int = 256, ref_voltage: float = MCP342X_REF_VOLTAGE):
+        """config - настройка АЦП, при которой сделана запись.
+        nperseg - длина сегмента метода Уэлча (окно Ханна, перекрытие 50 %)."""
+        self.config = config
+        self._resolution, self._lsb, self._fs = mcp342x_params(config.data_rate_raw, config.gain_raw, ref_voltage)
+        # полная шкала дифференциального входа, Вольт
+        self._fsr = 2 * ref_voltage / 2 ** config.gain_raw
+        # статистика в единицах младшего разряда, объединение частей по формулам Чана
+        self._stats = RunningStats()
+        # Уэлч
+        self._nperseg = nperseg
+        self._step = nperseg // 2
+        self._window = np.hanning(nperseg)
+        self._psd_sum = np.zeros(nperseg // 2 + 1)
+        self._segments = 0
+        # хвост предыдущей части, из которого еще не взят сегмент
+        self._tail = np.empty(0, dtype=np.float64)
+
+    def update(self, raw):
+        """Добавляет часть записи, массив 'сырых' отсчетов"""
+        x = np.asarray(raw, dtype=np.float64)
+        if 0 == x.size:
+            return
+        self._stats.update(x)
+        self._welch(x)
+
+    def _welch(self, x):
+        data = np.concatenate((self._tail, x)) if self._tail.size else x
+        nps, step = self._nperseg, self._step
+        if data.size < nps:
+            self._tail = data.copy()
+            return
+        segs = np.lib.stride_tricks.sliding_window_view(data, nps)[::step]
+        # вычитание среднего каждого сегмента и окно
+        segs = (segs - segs.mean(axis=1, keepdims=True)) * self._window
+        spec = np.square(np.abs(np.fft.rfft(segs, axis=1)))
+        self._psd_sum += spec.sum(axis=0)
+        self._segments += segs.shape[0]
+        self._tail = data[segs.shape[0] * step:].copy()
+
+    def end_capture(self):
+        """Конец записи: сегменты Уэлча не переходят через границу записей, хвост записи отбрасывается"""
+        self._tail = np.empty(0, dtype=np.float64)
+
+    def _capped_bits(self, noise_lsb: float, k: float = 1.0) -> float:
+        """Разрешение в битах при шуме noise_lsb (в единицах младшего разряда), не больше разрядности отсчета"""
+        res = self._resolution
+        if noise_lsb <= 0:
+            return float(res)
+        return min(float(res), math.log2(2 ** res / (noise_lsb * k)))
+
+    def result(self) -> noise_stats:
+        """Возвращает результат анализа всех переданных частей записи"""
+        st, lsb = self._stats, self._lsb
+        n = st.count
+        if 0 == n:
+            raise ValueError("Нет отсчетов для анализа!")
+        rms_lsb = st.std
+        p2p_lsb = float(st.max - st.min)
+        freq = nsd = None
+        if self._segments:
+            # односторонняя спектральная плотность мощности, В^2/Гц
+            psd = self._psd_sum / self._segments * lsb * lsb / (self._fs * np.square(self._window).sum())
+            psd[1:] *= 2
+            if 0 == self._nperseg % 2:
+                psd[-1] /= 2
+            freq = np.fft.rfftfreq(self._nperseg, 1 / self._fs)
+            nsd = np.sqrt(psd)
+        return noise_stats(config=self.config, count=n, mean=st.mean * lsb, rms=rms_lsb * lsb, p2p=p2p_lsb * lsb,
+                           rms_lsb=rms_lsb, p2p_lsb=p2p_lsb, enob=self._capped_bits(rms_lsb, math.sqrt(12)),
+                           effective_resolution=self._capped_bits(rms_lsb),
+                           noise_free_bits=self._capped_bits(p2p_lsb), freq=freq, nsd=nsd)
+
+
+def iter_chunks(raw, chunk_size: int = 1 << 16):
+    """Делит массив отсчетов на части по chunk_size отсчетов, без копирования"""
+    arr = np.asarray(raw)
+    for start in range(0, arr.size, chunk_size):
+        yield arr[start:start + chunk_size]
+
+
+def read_capture_chunks(path: str, dtype: str = '<i4', chunk_size: int = 1 << 16):
+    """Читает файл 'сырых' отсчетов (по умолчанию int32, младшим байтом вперед) частями по chunk_size отсчетов"""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = np.fromfile(f, dtype=dtype, count=chunk_size)
+            if 0 == chunk.size:
+                return
+            yield chunk
+
+
+def analyze_captures(captures, nperseg: int = 256, ref_voltage: float = MCP342X_REF_VOLTAGE) -> dict:
+    """Анализ шума записей. captures - последовательность троек (data_rate_raw, gain_raw, части записи), где
+    части записи - итерируемый объект массивов 'сырых' отсчетов (например, iter_chunks или read_capture_chunks).
+    Записи с одинаковой настройкой объединяются. Возвращает словарь adc_config -> noise_stats."""
+    acc = {}
+    for data_rate_raw, gain_raw, chunks in captures:
+        cfg = adc_config(data_rate_raw, gain_raw)
+        if cfg not in acc:
+            acc[cfg] = NoiseAccumulator(cfg, nperseg, ref_voltage)
+        a = acc[cfg]
+        for chunk in chunks:
+            a.update(chunk)
+        a.end_capture()
+    return {cfg: a.result() for cfg, a in acc.items()}
+
+
+def format_table(results: dict) -> str:
+    """Таблица результатов analyze_captures в виде текста"""
+    lines = ["rate gain       count   rms,uV   p2p,uV  rms,LSB   ENOB  eff.res  noise-free  NSD,uV/rtHz"]
+    for cfg in sorted(results):
+        r = results[cfg]
+        nsd = "-" if r.nsd is None else f"{1e6 * float(np.median(r.nsd[1:])):.3f}"
+        lines.append(f"{cfg.data_rate_raw:4} {cfg.gain_raw:4} {r.count:11} {1e6 * r.rms:8.3f} {1e6 * r.p2p:8.3f} "
+                     f"{r.rms_lsb:8.3f} {r.enob:6.2f} {r.effective_resolution:8.2f} {r.noise_free_bits:11.2f} {nsd:>12}")
+    return "\n".join(lines)
@@ -0,0 +1,170 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Прием кадров sensor_pack_2.framing (FrameWriter) на хосте: из последовательного порта (UART, USB-CDC) или
+любого asyncio.StreamReader. Отсчеты декодируются в массивы NumPy.
+Для проверки без платы: master, slave = os.openpty(); FrameWriter пишет в master, open_serial читает slave.
+Вызывайте open_serial до начала передачи: до перевода терминала в двоичный режим принятые байты искажаются."""
+
+import asyncio
+import os
+import struct
+import termios
+import tty
+import zlib
+from collections import namedtuple
+import numpy as np
+
+from sensor_pack_2.framing import SYNC, FRAME_CONFIG, FRAME_SAMPLES, ENC_RAW, ENC_DELTA, HEADER_FMT, CONFIG_FMT, \
+    SAMPLES_FMT, HEADER_SIZE, CRC_SIZE, MAX_PAYLOAD
+from host_tools.deltacodec import decode as delta_decode
+
+_header = struct.Struct(HEADER_FMT)
+_config = struct.Struct(CONFIG_FMT)
+_samples = struct.Struct(SAMPLES_FMT)
+
+# кадр настроек АЦП
+stream_config = namedtuple("stream_config", "seq address channel data_rate_raw gain_raw resolution lsb offset "
+                           "sample_rate")
+# кадр отсчетов. values - np.ndarray int32 'сырых' отсчетов
+sample_block = namedtuple("sample_block", "seq channel t0 values")
+
+
+class FrameDecoder:
+    """Разбор потока байт на кадры с восстановлением синхронизации после ошибок.
+    Статистика: frames - принято кадров, crc_errors - кадров с неверной CRC, decode_errors - кадров с верной CRC,
+    но недопустимым содержимым (пропускаются), lost - потеряно кадров (по пропускам порядковых номеров),
+    skipped - байт, отброшенных при поиске sync."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._next_seq = None
+        self.frames = 0
+        self.crc_errors = 0
+        self.decode_errors = 0
+        self.lost = 0
+        self.skipped = 0
+
+    def _decode_payload(self, frame_type: int, seq: int, payload: memoryview):
+        if FRAME_CONFIG == frame_type:
+            return stream_config(seq, *_config.unpack_from(payload))
+        if FRAME_SAMPLES == frame_type:
+            channel, encoding, t0, count = _samples.unpack_from(payload)
+            data = payload[_samples.size:]
+            if ENC_RAW == encoding:
+                values = np.frombuffer(data, dtype='<i4', count=count).astype(np.int32)
+            elif ENC_DELTA == encoding:
+                values = delta_decode(data)
+            else:
+                raise ValueError(f"Неизвестное кодирование отсчетов: {encoding}")
+            if values.size != count:
+                raise ValueError(f"Кол-во отсчетов {values.size} не равно заявленному {count}!")
+            return sample_block(seq, channel, t0, values)
+        return None     # неизвестный тип кадра пропускается
+
+    def feed(self, data) -> list:
+        """Добавляет принятые байты. Возвращает список декодированных кадров (stream_config, sample_block)"""
+        buf = self._buf
+        buf += data
+        out = []
+        pos = 0
+        while True:
+            start = buf.find(SYNC, pos)
+            if start < 0:
+                # последний байт может быть началом sync
+                keep = 1 if buf.endswith(SYNC[:1]) else 0
+                self.skipped += len(buf) - pos - keep
+                pos = len(buf) - keep
+                break
+            self.skipped += start - pos
+            if len(buf) - start < HEADER_SIZE:
+                pos = start
+                break
+            length, frame_type, seq = _header.unpack_from(buf, start + 2)
+            if length > MAX_PAYLOAD:
+                self.crc_errors += 1
+                pos = start + 1
+                continue
+            end = start + HEADER_SIZE + length
+            if len(buf) < end + CRC_SIZE:
+                pos = start
+                break
+            crc = struct.unpack_from("<I", buf, end)[0]
+            mv = memoryview(buf)
+            if zlib.crc32(mv[start + 2:end]) != crc:
+                mv.release()
+                self.crc_errors += 1
+                pos = start + 1     # ложный sync или поврежденный кадр: поиск со следующего байта
+                continue
+            decoded = True
+            try:
+                frame = self._decode_payload(frame_type, seq, mv[start + HEADER_SIZE:end])
+            except (ValueError, IndexError, struct.error):
+                # кадр целый, но его содержимое не декодируется: кадр пропускается, поток продолжается
+                self.decode_errors += 1
+                frame, decoded = None, False
+            finally:
+                mv.release()
+            if self._next_seq is not None:
+                self.lost += (seq - self._next_seq) & 0xFFFF
+            self._next_seq = (seq + 1) & 0xFFFF
+            if decoded:
+                self.frames += 1
+            if frame is not None:
+                out.append(frame)
+            pos = end + CRC_SIZE
+        del buf[:pos]
+        return out
+
+
+async def read_frames(reader: asyncio.StreamReader, decoder: [FrameDecoder, None] = None, chunk: int = 4096):
+    """Асинхронный генератор кадров из reader"""
+    if decoder is None:
+        decoder = FrameDecoder()
+    while True:
+        data = await reader.read(chunk)
+        if not data:
+            return
+        for frame in decoder.feed(data):
+            yield frame
+
+
+def _set_raw(fd: int, baudrate: [int, None]):
+    """Перевод терминала в двоичный (raw) режим и установка скорости"""
+    tty.setraw(fd)
+    if baudrate:
+        speed = getattr(termios, f"B{baudrate}")
+        attrs = termios.tcgetattr(fd)
+        attrs[4] = attrs[5] = speed
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+
+
+async def open_serial(path_or_fd: [str, int], baudrate: [int, None] = 115200) -> asyncio.StreamReader:
+    """Открывает последовательный порт (путь /dev/ttyACM0 или дескриптор, например slave конец pty) на чтение.
+    Возвращает asyncio.StreamReader. Для USB-CDC скорость не имеет значения, baudrate=None - не изменять"""
+    fd = os.open(path_or_fd, os.O_RDONLY | os.O_NOCTTY | os.O_NONBLOCK) if isinstance(path_or_fd, str) \
+        else path_or_fd
+    if os.isatty(fd):
+        _set_raw(fd, baudrate)
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, 'rb', buffering=0))
+    return reader
+
+
+class SampleStream:
+    """Отсчеты одного потока кадров: 'сырые' и в Вольтах (по последнему кадру настроек)"""
+
+    def __init__(self, reader: asyncio.StreamReader):
+        self._reader = reader
+        self.decoder = FrameDecoder()
+        self.config = None
+
+    async def blocks(self):
+        """Асинхронный генератор пар (sample_block, np.ndarray Вольт или None, если настройки еще не приняты)"""
+        async for frame in read_frames(self._reader, self.decoder):
+            if isinstance(frame, stream_config):
+                self.config = frame
+                continue
+            volts = None if self.config is None else frame.values * self.config.lsb + self.config.offset
+            yield frame, volts
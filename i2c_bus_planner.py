@@ -0,0 +1,113 @@
+# micropython
+# mail: goctaprog@gmail.com
+# MIT license
+"""Планировщик загрузки шины I2C несколькими АЦП MCP342X. Моделирует время каждой транзакции, которую выполняет
+драйвер (mcp3421mod.Mcp342X), по частоте шины, длине посылки, времени свободной шины между транзакциями, запасу на
+растяжение тактов (clock stretching) и накладным расходам на вызов. По набору устройств (каналы, частоты
+преобразования) вычисляет загрузку шины и наибольшую суммарную частоту отсчетов, которую шина выдержит."""
+
+from collections import namedtuple
+
+# частота преобразования MCP342X по 'сырому' значению, Гц
+_sample_rates = 240, 60, 15, 3.75
+# время свободной шины между STOP и START (tBUF), мкс, для стандартных частот шины I2C
+_bus_free_us = ((100_000, 4.7), (400_000, 1.3), (1_000_000, 0.5))
+# байт в ответе MCP342X при чтении отсчета (get_raw_config читает 4 байта: данные и конфигурация)
+_read_len = 4
+
+# описание устройства на шине
+# address - адрес I2C
+# channels - кол-во опрашиваемых по очереди каналов (1 - без переключения каналов)
+# data_rate_raw - 'сырая' частота преобразования
+# single_shot - однократный режим: запуск каждого преобразования записью конфигурации
+# polls_per_sample - среднее кол-во чтений на один новый отсчет (опрос готовности; 1 - чтение по таймеру
+# с частотой преобразования, как в BackgroundAcquisition)
+device_spec = namedtuple("device_spec", "address channels data_rate_raw single_shot polls_per_sample")
+
+# нагрузка одного устройства
+# sps - отсчетов в секунду (все каналы)
+# bus_us_per_sample - время шины на один отсчет, мкс
+# bus_us_per_s - время шины в секунду, мкс
+device_load = namedtuple("device_load", "address sps bus_us_per_sample bus_us_per_s")
+
+# результат планирования
+# utilization - доля времени, когда шина занята (1.0 - 100 %)
+# aggregate_sps - суммарная частота отсчетов всех устройств
+# max_aggregate_sps - наибольшая суммарная частота отсчетов при загрузке шины max_utilization, при том же
+# соотношении частот устройств
+# overloaded - Истина, если utilization больше max_utilization
+# devices - кортеж device_load
+bus_plan = namedtuple("bus_plan", "freq utilization aggregate_sps max_aggregate_sps overloaded devices")
+
+
+def make_spec(address: int, channels: int = 1, data_rate_raw: int = 0, single_shot: bool = False,
+              polls_per_sample: float = 1.0) -> device_spec:
+    if not 0 <= data_rate_raw < len(_sample_rates) or channels < 1 or polls_per_sample < 1:
+        raise ValueError(f"Неверное описание устройства 0x{address:x}!")
+    return device_spec(address, channels, data_rate_raw, single_shot, polls_per_sample)
+
+
+def spec_from_adc(adc, channels: int = 1, polls_per_sample: float = 1.0) -> device_spec:
+    """Описание устройства по настроенному экземпляру Mcp342X"""
+    return make_spec(adc.address, channels, adc.current_sample_rate, adc.single_shot_mode, polls_per_sample)
+
+
+def get_bus_free_us(freq: int) -> float:
+    """Время свободной шины между транзакциями (tBUF) для частоты freq, мкс"""
+    for f, t in _bus_free_us:
+        if freq <= f:
+            return t
+    return _bus_free_us[-1][1]
+
+
+def transaction_us(payload: int, freq: int = 400_000, stretch: float = 0.0, overhead_us: float = 0.0) -> float:
+    """Время одной транзакции I2C, мкс: START, байт адреса, payload байт данных (по 9 тактов с ACK/NACK), STOP и
+    время свободной шины. stretch - запас на растяжение тактов, доля (0.1 - 10 %).
+    overhead_us - накладные расходы на вызов (драйвер, адаптер, ОС), мкс."""
+    bit_us = 1E6 / freq
+    # START и STOP, примерно по такту каждый
+    clocks = 2 + 9 * (1 + payload)
+    return clocks * bit_us * (1.0 + stretch) + get_bus_free_us(freq) + overhead_us
+
+
+def sample_bus_us(spec: device_spec, freq: int = 400_000, stretch: float = 0.0, overhead_us: float = 0.0) -> float:
+    """Время шины на один отсчет устройства, мкс, для транзакций, которые выполняет Mcp342X"""
+    read_us = transaction_us(_read_len, freq, stretch, overhead_us)
+    write_us = transaction_us(1, freq, stretch, overhead_us)
+    # чтение отсчета (get_raw_value), с учетом повторных чтений при опросе готовности
+    t = spec.polls_per_sample * read_us
+    if spec.channels > 1 or spec.single_shot:
+        # start_measurement: чтение конфигурации, запись конфигурации, чтение конфигурации
+        t += 2 * read_us + write_us
+    return t
+
+
+def plan_bus(devices, freq: int = 400_000, stretch: float = 0.1, overhead_us: float = 0.0,
+             max_utilization: float = 0.7) -> bus_plan:
+    """Загрузка шины I2C частотой freq, Гц, устройствами devices (последовательность device_spec).
+    Частота отсчетов устройства равна его частоте преобразования: каналы опрашиваются по очереди.
+    max_utilization - допустимая загрузка шины (запас на другие устройства, повторы и задержки опроса)."""
+    if freq <= 0 or not 0 < max_utilization <= 1:
+        raise ValueError(f"Неверные параметры: freq: {freq}; max_utilization: {max_utilization}")
+    loads = []
+    busy, total_sps = 0.0, 0.0
+    for spec in devices:
+        sps = _sample_rates[spec.data_rate_raw]
+        per_sample = sample_bus_us(spec, freq, stretch, overhead_us)
+        loads.append(device_load(spec.address, sps, per_sample, sps * per_sample))
+        busy += sps * per_sample
+        total_sps += sps
+    utilization = busy / 1E6
+    max_sps = total_sps * max_utilization / utilization if utilization else 0.0
+    return bus_plan(freq, utilization, total_sps, max_sps, utilization > max_utilization, tuple(loads))
+
+
+def format_plan(result: bus_plan) -> str:
+    """Текстовый отчет по результату plan_bus"""
+    lines = [f"Шина {result.freq // 1000} кГц: загрузка {100 * result.utilization:.1f} %, "
+             f"{result.aggregate_sps:.2f} отсчетов/с, предел {result.max_aggregate_sps:.1f} отсчетов/с"
+             + (" - ПЕРЕГРУЗКА!" if result.overloaded else "")]
+    for d in result.devices:
+        lines.append(f"  0x{d.address:x}: {d.sps} отсчетов/с, {d.bus_us_per_sample:.1f} мкс/отсчет, "
+                     f"{100 * d.bus_us_per_s / 1E6:.2f} %")
+    return "\n".join(lines)
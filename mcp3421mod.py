@@ -5,12 +5,30 @@
 
 from sensor_pack_2 import bus_service
 from sensor_pack_2.base_sensor import DeviceEx, Iterator, check_value, get_error_str   # all_none
-from sensor_pack_2.adcmod import ADC, adc_init_props    # , raw_value_ex
-# import micropython
-# from micropython import const
-from collections import namedtuple
-from sensor_pack_2.bitfield import bit_field_info
-from sensor_pack_2.bitfield import BitFields
+from sensor_pack_2.adcmod import ADC, adc_init_props, RAW_GAP, REAL_GAP    # , raw_value_ex
+from sensor_pack_2.kernels import be_to_int
+from sensor_pack_2.kernels import micropython    # в CPython заглушка
+from sensor_pack_2.ticks import ticks_us, ticks_diff
+
+# в MicroPython имя const распознается компилятором: константы с именами, начинающимися с '_', подставляются
+# в код и не занимают ОЗУ
+const = micropython.const
+
+# битовые поля регистра конфигурации MCP342X
+# RDY - флаг готовности данных. В режиме чтения 0 - выходной регистр обновлен новым преобразованием.
+# В режиме однократного преобразования запись этого бита в «1» инициирует новое преобразование.
+_CFG_RDY = const(0x80)
+# CH - биты выбора канала (в MCP3421 не используются)
+_CFG_CH_MASK = const(0x60)
+_CFG_CH_SHIFT = const(5)
+# CCM (continue conversion mode) - 1 - режим непрерывного преобразования, 0 - однократного
+_CFG_CCM = const(0x10)
+# SampleRate - частота преобразования: 0 - 240 SPS (12 bit); 1 - 60 SPS (14 bit); 2 - 15 SPS (16 bit);
+# 3 - 3.75 SPS (18 bit)
+_CFG_RATE_MASK = const(0x0C)
+_CFG_RATE_SHIFT = const(2)
+# PGA - усиление: 0 - 1; 1 - 2; 2 - 4; 3 - 8
+_CFG_PGA_MASK = const(0x03)
 
 _model_3421 = 'mcp3421'
 _model_3422 = 'mcp3422'
@@ -31,19 +49,152 @@ def get_init_props(model: str) -> adc_init_props:
     raise ValueError(f"Неизвестная модель АЦП!")
 
 
+class AdaptiveRate:
+    """Адаптивное разрешение MCP342X в режиме непрерывного преобразования: быстрое преобразование с малым разрешением
+    (например, 240 Гц/12 бит), пока сигнал изменяется, и медленное с большим разрешением (15 или 3.75 Гц, 16/18 бит),
+    когда сигнал стабилен. Переключение - одна запись конфигурации (Mcp342X.switch_data_rate).
+    Скорость изменения сигнала сравнивается с порогами в 'сырых' отсчетах, приведенных к 18 битам, без вычислений
+    с плавающей точкой на каждый отсчет."""
+
+    def __init__(self, fast_rate_raw: int = 0, slow_rate_raw: int = 3, slew_up: float = 0.01,
+                 slew_down: float = 0.002, settle: int = 8):
+        """fast_rate_raw, slow_rate_raw - 'сырые' частоты преобразования быстрого и медленного режимов.
+        slew_up - скорость изменения сигнала, В/с, выше которой включается быстрый режим.
+        slew_down - скорость изменения сигнала, В/с, ниже которой (settle отсчетов подряд) включается медленный режим.
+        slew_down должна быть меньше slew_up (гистерезис)."""
+        r4 = range(4)
+        check_value(fast_rate_raw, r4, get_error_str("fast_rate_raw", fast_rate_raw, r4))
+        check_value(slow_rate_raw, r4, get_error_str("slow_rate_raw", slow_rate_raw, r4))
+        if fast_rate_raw >= slow_rate_raw or slew_down <= 0 or slew_down >= slew_up:
+            raise ValueError("Неверные параметры адаптивного разрешения!")
+        self.fast_rate_raw = fast_rate_raw
+        self.slow_rate_raw = slow_rate_raw
+        self.slew_up = slew_up
+        self.slew_down = slew_down
+        self.settle = settle
+        # предыдущий отсчет, приведенный к 18 битам
+        self._prev = None
+        # кол-во отсчетов подряд, при которых сигнал стабилен
+        self._stable = 0
+        # пороги в 'сырых' отсчетах (18 бит) за период преобразования, для настроек self._key.
+        # Сигнал стабилен, если приращение не больше _thr_down, и изменяется, если оно больше _thr_up
+        self._thr_up = 0
+        self._thr_down = 0
+        self._key = None
+        # кол-во переключений
+        self.switches = 0
+
+    def _update_thresholds(self, adc):
+        """Пересчет порогов для текущих усиления и частоты преобразования. Вызывается только при их изменении"""
+        # цена младшего разряда при 18 битах, Вольт
+        lsb18 = 2 * adc.init_props.reference_voltage / (adc.gain * 2 ** 18)
+        per_sample = 1 / adc.sample_rate
+        # младший разряд текущего разрешения в единицах 18 бит: приращения отсчетов кратны ему, поэтому порог
+        # стабильности не меньше одного, а порог изменения не меньше двух младших разрядов (шум +-1 разряд)
+        step = 1 << (6 - 2 * adc.current_sample_rate)
+        self._thr_down = max(step, int(self.slew_down * per_sample / lsb18))
+        self._thr_up = max(self._thr_down + step, int(self.slew_up * per_sample / lsb18))
+        self._key = adc.current_raw_gain << 2 | adc.current_sample_rate
+
+    def reset(self):
+        self._prev = None
+        self._stable = 0
+
+    def update(self, adc, raw: int) -> [int, None]:
+        """Вызывается для каждого отсчета. Возвращает отсчет, приведенный к 18 битам."""
+        rate = adc.current_sample_rate
+        if (adc.current_raw_gain << 2 | rate) != self._key:
+            self._update_thresholds(adc)
+        norm = raw << (6 - 2 * rate)
+        prev = self._prev
+        self._prev = norm
+        if prev is None:
+            return norm
+        delta = abs(norm - prev)
+        if delta > self._thr_up:
+            self._stable = 0
+            if rate != self.fast_rate_raw:
+                self._switch(adc, self.fast_rate_raw)
+            return norm
+        if rate == self.slow_rate_raw:
+            return norm
+        if delta <= self._thr_down:
+            self._stable += 1
+            if self._stable >= self.settle:
+                self._switch(adc, self.slow_rate_raw)
+        else:
+            self._stable = 0
+        return norm
+
+    def _switch(self, adc, rate: int):
+        adc.switch_data_rate(rate)
+        self.switches += 1
+        self._stable = 0
+        self._prev = None
+
+
+class StallWatchdog:
+    """Контроль MCP342X в режиме непрерывного преобразования по байту конфигурации, который АЦП возвращает с каждым
+    отсчетом, поэтому в исправном состоянии дополнительного обмена по шине нет.
+    Если конфигурация отличается от ожидаемой (сброс АЦП в начальную конфигурацию после просадки питания)
+    или бит RDY не сбрасывается (нет новых отсчетов) дольше stall_periods периодов преобразования, то конфигурация
+    восстанавливается одной записью. Подключение: adc.attach_watchdog(StallWatchdog())"""
+
+    def __init__(self, stall_periods: int = 8):
+        """stall_periods - наибольшее кол-во периодов преобразования без нового отсчета. 0 - без этой проверки"""
+        if stall_periods < 0:
+            raise ValueError(f"Неверное кол-во периодов: {stall_periods}")
+        self.stall_periods = stall_periods
+        # ожидаемая конфигурация без бита RDY или None
+        self.expected = None
+        self._limit_us = 0
+        # время первого чтения подряд без нового отсчета, если self._stale в Истина
+        self._stale = False
+        self._stale_since = 0
+        # кол-во несовпадений конфигурации, зависаний и восстановлений конфигурации
+        self.mismatches = 0
+        self.stalls = 0
+        self.recoveries = 0
+
+    def arm(self, adc, raw_config: int):
+        """Запоминает ожидаемую конфигурацию. В однократном режиме контроль выключен"""
+        self._stale = False
+        if adc.single_shot_mode:
+            self.expected = None
+            return
+        self.expected = raw_config & 0x7F
+        self._limit_us = self.stall_periods * adc.get_conversion_cycle_time()
+
+    def check(self, adc, raw_config: int) -> bool:
+        """Вызывается для каждого прочитанного байта конфигурации. Возвращает Ложь, если отсчет недействителен"""
+        expected = self.expected
+        if expected is None:
+            return True
+        if (raw_config & 0x7F) != expected:
+            self.mismatches += 1
+            self._recover(adc)
+            return False
+        if 0 == raw_config & 0x80 or 0 == self._limit_us:
+            self._stale = False     # новый отсчет
+            return True
+        now = ticks_us()
+        if not self._stale:
+            self._stale, self._stale_since = True, now
+        elif ticks_diff(now, self._stale_since) > self._limit_us:
+            self.stalls += 1
+            self._recover(adc)
+        return True
+
+    def _recover(self, adc):
+        self._stale = False
+        adc.set_raw_config(self.expected)
+        self.recoveries += 1
+
+
 class Mcp342X(DeviceEx, ADC, Iterator):
     """18-битный аналого-цифровой преобразователь с интерфейсом I2C и встроенным ИОН.
     18-Bit Analog-to-Digital Converter with I2C Interface and On-Board Reference"""
 
-    _config_reg_mcp3421 = (bit_field_info(name='RDY', position=range(7, 8), valid_values=None, description=None),           # Этот бит является флагом готовности данных. В режиме чтения этот бит указывает, был ли выходной регистр обновлен новым преобразованием. В режиме однократного преобразования запись этого бита в «1» инициирует новое преобразование.
-                           bit_field_info(name='CH', position=range(5, 7), valid_values=None, description=None),            # (channel) Это биты выбора канала, но они не используются в MCP3421.
-                           bit_field_info(name='CCM', position=range(4, 5), valid_values=range(6) , description=None),      # (continue conversion mode) Бит режима преобразования. 1 - режим непрерывного преобразования. 0 - режим однократного преобразования.
-                           bit_field_info(name='SampleRate', position=range(2, 4), valid_values=None, description=None),    # Бит выбора частоты дискретизации. 0 - 240 SPS (12 bit); 1 - 60 SPS (14 bit); 2 - 15 SPS (16 bit); 3 - 3.75 SPS (18 bit)
-                           bit_field_info(name='PGA', position=range(2), valid_values=None, description=None),              # Биты выбора усиления PGA. 0 - 1; 1 - 1/2; 2 - 1/4; 3 - 1/8
-                           )
-    # ответ от АЦП
-    _mcp3421_raw_data = namedtuple("_mcp3421_raw_data", "b0 b1 b2 config")
-
     def get_resolution(self, raw_data_rate: int) -> int:
         """Преобразует сырое значение частоты обновления данных в кол-во бит в отсчете АЦП.
         У многих АЦП кол-во бит в отсчете зависит(!) от частоты преобразования."""
@@ -55,8 +206,6 @@ class Mcp342X(DeviceEx, ADC, Iterator):
         DeviceEx.__init__(self, adapter, address, True)
         ADC.__init__(self, get_init_props(model), model=model)
         # print("DBG:__init__")
-        # для удобства работы с настройками АЦП
-        self._bit_fields = BitFields(fields_info=Mcp342X._config_reg_mcp3421)
         # буфер на 4 байта
         self._buf_4 = bytearray((0 for _ in range(4)))
         # последнее считанное из АЦП значение
@@ -66,59 +215,154 @@ class Mcp342X(DeviceEx, ADC, Iterator):
         # обновлен новым преобразованием (0).
         # В режиме однократного преобразования запись этого бита в «1» инициирует новое преобразование.
         self._data_ready = None
+        # если Истина, то итератор возвращает 'сырые' отсчеты (int) без преобразования в Вольты.
+        # В этом режиме цепочка __next__ -> get_value -> get_raw_value не выделяет память в куче!
+        self.raw_mode = False
+        # адаптивное разрешение (AdaptiveRate) в режиме непрерывного преобразования или None
+        self.adaptive = None
+        # если Истина, то следующий отсчет отбрасывается (после переключения частоты преобразования)
+        self._discard_next = False
+        # кол-во ошибок шины (OSError) при чтении отсчетов итератором. Такие отсчеты в потоке помечаются как пропуск:
+        # RAW_GAP для 'сырых' отсчетов, REAL_GAP (nan) для Вольт
+        self.bus_errors = 0
+        # реестр метрик (sensor_pack_2.metrics.MetricsRegistry) и номер первого слота устройства в нем
+        self.metrics = None
+        self._metrics_base = 0
+        # слот метрик текущего канала: по каналу, заданному start_measurement, а не по битам CH ответа АЦП
+        self._metrics_slot = 0
+        # канал, заданный последним вызовом start_measurement
+        self._configured_channel = 0
+        # контроль зависания в режиме непрерывного преобразования (StallWatchdog) или None
+        self.watchdog = None
+        # Истина, если ответ АЦП уже прочитан в _buf_4 вместе с записью конфигурации (set_raw_config)
+        self._cfg_read = False
         # Внимание, важный вызов(!)
         # читаю config АЦП и обновляю поля класса
         _raw_cfg = self.get_raw_config()
         self.raw_config_to_adc_properties(_raw_cfg)
 
-#    def _read_raw_data(self) -> _mcp3421_raw_data:
-#        """Считывает из АЦП информацию о результате преобразования и текущие 'сырые' настройки"""
-#        buf = self._buf_4
-#        self.read_to_buf(buf)
-#        b0, b1, b2, cfg = self.unpack(fmt_char=len(buf)*"B", source=buf)
-#        return Mcp3421._mcp3421_raw_data(b0=b0, b1=b1, b2=b2, config=cfg)
-
     def get_raw_config(self) -> int:
         """Возвращает(считывает) текущие настройки датчика из регистров(конфигурации) в виде числа."""
-        # raw = self._read_raw_data()
         buf = self._buf_4
-        self.read_to_buf(buf)
+        if self._cfg_read:
+            self._cfg_read = False
+        else:
+            self.read_to_buf(buf)
         # последний байт в ответе АЦП это конфигурация(!)
         return buf[-1]
 
     def set_raw_config(self, value: int):
-        """Записывает настройки(value) во внутреннюю память/регистр датчика."""
-        self.write(value.to_bytes(1, 'big'))
+        """Записывает настройки(value) во внутреннюю память/регистр датчика.
+        Если адаптер шины выполняет запись и чтение одной транзакцией (write_and_read, например LinuxI2cAdapter),
+        то ответ АЦП читается сразу после записи, и следующий вызов get_raw_config не обращается к шине."""
+        buf = value.to_bytes(1, 'big')
+        write_and_read = getattr(self.adapter, "write_and_read", None)
+        if write_and_read is None:
+            self.write(buf)
+            return
+        write_and_read(self.address, buf, self._buf_4)
+        self._cfg_read = True
 
     def raw_config_to_adc_properties(self, raw_config: int):
         """Возвращает текущие настройки датчика из числа, возвращенного get_raw_config(!), в поля(!) класса.
         raw_config -> adc_properties"""
         # вызывать только после вызова get_raw_config!!!
-        bf = self._bit_fields
-        bf.source = raw_config
         # 0 - в бите DRY, означает, что данные были обновлены АЦП
-        self._data_ready = not bf['RDY']
-        self._curr_channel = bf['CH']
-        self._single_shot_mode = not bf['CCM']
-        self._curr_raw_gain = bf['PGA']
-        self._curr_raw_data_rate = bf['SampleRate']
+        self._data_ready = 0 == raw_config & _CFG_RDY
+        self._single_shot_mode = 0 == raw_config & _CFG_CCM
+        channel = (raw_config & _CFG_CH_MASK) >> _CFG_CH_SHIFT
+        gain_raw = raw_config & _CFG_PGA_MASK
+        rate_raw = (raw_config & _CFG_RATE_MASK) >> _CFG_RATE_SHIFT
+        if channel != self._curr_channel or gain_raw != self._curr_raw_gain or rate_raw != self._curr_raw_data_rate:
+            # настройки АЦП изменились (сброс, запись конфигурации в обход драйвера): разрешение, усиление и
+            # коэффициенты преобразования в Вольты (пересчитываются при следующем преобразовании)
+            self._curr_channel = channel
+            self._curr_raw_gain = gain_raw
+            self._curr_raw_data_rate = rate_raw
+            self._curr_resolution = self.get_resolution(rate_raw)
+            self._real_gain = self.gain_raw_to_real(gain_raw)
+            self._scale_k = None
 
 
     def get_raw_value(self) -> int:
         """Возвращает 'сырое' значение отсчета АЦП. Переопределяется в классах - наследниках!"""
         # вызывать только после вызова get_raw_config и raw_config_to_adc_properties!!!
         # print("DBG:get_raw_value")
-        cfg = self.get_raw_config()
+        # без unpack, кортежей и строк формата, чтобы не выделять память в куче!
+        m = self.metrics
+        if m is None:
+            cfg = self.get_raw_config()
+        else:
+            t0 = ticks_us()
+            try:
+                cfg = self.get_raw_config()
+            except OSError:
+                m.on_bus_error(self._metrics_slot)
+                raise
+            # RDY в 0 - отсчет новый
+            m.on_read(self._metrics_slot, ticks_diff(ticks_us(), t0), 0 == cfg & _CFG_RDY)
         # print(f"DBG:get_raw_value. config: 0x{cfg:x}")
-        self.raw_config_to_adc_properties(raw_config=cfg)
+        wd = self.watchdog
+        if wd is not None and not wd.check(self, cfg):
+            return None     # конфигурация АЦП была сброшена, отсчет отброшен
+        self.raw_config_to_adc_properties(cfg)
         if self.data_ready:
             if self._curr_raw_data_rate < 3:
                 # два байта на отсчет, 12, 14, 16 бит
-                return self.unpack(fmt_char='h', source=self._buf_4)[0]
-            b0, b1, b2 = self.unpack(fmt_char='bBB', source=self._buf_4)    # 18 бит на отсчет
-            return 65536*b0 + 256*b1 + b2
+                return be_to_int(self._buf_4, 2, 16)
+            # 18 бит на отсчет, три байта
+            return be_to_int(self._buf_4, 3, 18)
         # print(f"DBG:get_raw_value. data not ready! config: 0x{cfg:x}")
 
+    def attach_metrics(self, registry, name: [str, None] = None):
+        """Подключает реестр метрик (MetricsRegistry). Для устройства занимается слот на каждый канал.
+        name - имя устройства в метриках, по умолчанию адрес на шине. None в registry - отключение метрик"""
+        if registry is not None:
+            self._metrics_base = registry.register(name if name else f"0x{self.address:x}",
+                                                   self.init_props.differential_channels)
+        self.metrics = registry
+        self._update_metrics_slot()
+
+    def _update_metrics_slot(self):
+        """Слот метрик заданного канала, не больше последнего слота устройства"""
+        last = self.init_props.differential_channels - 1
+        self._metrics_slot = self._metrics_base + min(self._configured_channel, last)
+
+    def attach_watchdog(self, watchdog: [StallWatchdog, None]):
+        """Подключает контроль зависания (StallWatchdog). Ожидаемая конфигурация - текущая. None - отключение"""
+        if watchdog is not None:
+            watchdog.arm(self, self.get_raw_config())
+        self.watchdog = watchdog
+
+    def start_measurement(self, single_shot: bool, data_rate_raw: int, gain_raw: int, channel: int,
+                          differential_channel: bool):
+        ADC.start_measurement(self, single_shot, data_rate_raw, gain_raw, channel, differential_channel)
+        self._configured_channel = channel
+        self._update_metrics_slot()
+        if self.watchdog is not None:
+            # конфигурация, прочитанная из АЦП в конце start_measurement
+            self.watchdog.arm(self, self._buf_4[-1])
+
+    @property
+    def configured_channel(self) -> int:
+        """Канал, заданный последним вызовом start_measurement. Канал из битов CH ответа АЦП (channel) может
+        отличаться: у MCP3421 эти биты не используются"""
+        return self._configured_channel
+
+    def switch_data_rate(self, data_rate_raw: int):
+        """Быстрое изменение частоты преобразования (и разрешения), одной записью конфигурации, без
+        start_measurement. Конфигурация берется из последнего ответа АЦП. Остальные настройки не изменяются."""
+        self.check_data_rate_raw(data_rate_raw)
+        # последний байт в ответе АЦП это конфигурация(!)
+        cfg = self._buf_4[-1] & ~_CFG_RATE_MASK | data_rate_raw << _CFG_RATE_SHIFT
+        self.set_raw_config(cfg)
+        self._curr_raw_data_rate = data_rate_raw
+        self._curr_resolution = self.get_resolution(data_rate_raw)
+        self._update_scale()
+        self._discard_next = True
+        if self.watchdog is not None:
+            self.watchdog.arm(self, cfg)
+
     def raw_sample_rate_to_real(self, raw_sample_rate: int) -> float:
         """Преобразует сырое значение частоты преобразования в частоту [Гц]."""
         sps = 240, 60, 15, 3.75
@@ -150,18 +394,44 @@ class Mcp342X(DeviceEx, ADC, Iterator):
         """Преобразует свойства АЦП из полей класса в 'сырую' конфигурацию АЦП.
         adc_properties -> raw_config"""
         # print("DBG:adc_properties_to_raw_config")
-        _cfg = self.get_raw_config()
-        bf = self._bit_fields
-        bf.source = _cfg
-        # *
-        bf['CH'] = not self._curr_channel
-        bf['CCM'] = not self.single_shot_mode
-        bf['RDY'] = self.single_shot_mode
-        bf['SampleRate'] = self.current_sample_rate
-        bf['PGA'] = self.current_raw_gain
-        # print(f"DBG:adc_properties_to_raw_config: 0x{bf.source:x}")
-
-        return bf.source
+        self.get_raw_config()
+        # поля занимают все восемь бит конфигурации. CH: 0..3 - канал 1..4 (в MCP3421 не используются)
+        cfg = self._curr_channel << _CFG_CH_SHIFT
+        cfg |= _CFG_RDY if self.single_shot_mode else _CFG_CCM
+        cfg |= self.current_sample_rate << _CFG_RATE_SHIFT | self.current_raw_gain
+        # print(f"DBG:adc_properties_to_raw_config: 0x{cfg:x}")
+
+        return cfg
+
+    def read_batch(self, batch, count: [int, None] = None, channel_base: int = 0, delta: int = 0) -> int:
+        """Добавляет в пакет batch (sensor_pack_2.samples.SampleBatch) 'сырые' отсчеты текущего канала в режиме
+        непрерывного преобразования, с отметкой времени ticks_us и флагами края шкалы (limit_flags, зазор delta).
+        count - кол-во чтений АЦП, по умолчанию по свободному месту в пакете. Отсчет, который еще не готов,
+        не добавляется; при ошибке шины добавляется пропуск RAW_GAP. Номер канала в пакете - channel_base + канал,
+        заданный start_measurement. Адаптивное разрешение (adaptive) не применяется.
+        Возвращает кол-во добавленных отсчетов"""
+        from sensor_pack_2.samples import limit_flags
+        if self.single_shot_mode:
+            return 0
+        free = batch.capacity - len(batch)
+        left = free if count is None else min(count, free)
+        channel = channel_base + self._configured_channel
+        added = 0
+        while left > 0:
+            left -= 1
+            try:
+                raw = self.get_raw_value()
+            except OSError:
+                self.bus_errors += 1
+                raw = RAW_GAP
+            if raw is None:
+                continue
+            if self._discard_next:
+                self._discard_next = False
+                continue
+            batch.append(raw, channel, ticks_us(), limit_flags(raw, self._curr_resolution, delta))
+            added += 1
+        return added
 
     @property
     def data_ready(self) -> bool:
@@ -185,8 +455,27 @@ class Mcp342X(DeviceEx, ADC, Iterator):
     def __iter__(self):
         return self
 
-    def __next__(self) -> [int, None]:
-        if not self.single_shot_mode:
-            # режим непрерывного преобразования!
-            return self.value
-        return None
+    def __next__(self) -> [int, float, None]:
+        """В режиме непрерывного преобразования возвращает отсчет в Вольтах, или 'сырой' отсчет, если raw_mode
+        в Истина. В режиме адаптивного разрешения (adaptive) 'сырой' отсчет приведен к 18 битам.
+        Возвращает None, если отсчета нет, и RAW_GAP/REAL_GAP при ошибке шины."""
+        if self.single_shot_mode:
+            return None
+        # режим непрерывного преобразования!
+        try:
+            if self.adaptive is None:
+                return self.get_value(self.raw_mode)
+            raw = self.get_raw_value()
+        except OSError:
+            # ошибка шины не прерывает поток отсчетов
+            self.bus_errors += 1
+            return RAW_GAP if self.raw_mode else REAL_GAP
+        if raw is None:
+            return None
+        if self._discard_next:
+            self._discard_next = False
+            return None
+        # в Вольты до(!) возможного переключения частоты преобразования
+        val = None if self.raw_mode else self.raw_value_to_real(raw)
+        norm = self.adaptive.update(self, raw)
+        return norm if self.raw_mode else val
@@ -0,0 +1,101 @@
+# micropython
+# mail: goctaprog@gmail.com
+# MIT license
+"""Планировщик настроек MCP342X: самая высокая скорость получения результатов (частота преобразования,
+усиление PGA, кол-во усредняемых отсчетов), при которой выполняется требование к точности.
+Разрешение MCP342X связано с частотой преобразования (12 + 2 * data_rate_raw бит, смотри Mcp342X.get_resolution),
+поэтому 18 бит при 3.75 Гц часто избыточны."""
+
+import math
+from collections import namedtuple
+
+# опорное напряжение MCP342X, Вольт
+_ref_voltage = 2.048
+# частота преобразования по 'сырому' значению, Гц
+_sample_rates = 240, 60, 15, 3.75
+# шум, приведенный ко входу, Вольт (СКЗ). Datasheet MCP3421: 1.5 мкВ при 3.75 Гц, PGA = 1.
+# Для остальных частот шум считается белым: пропорционален корню из частоты преобразования.
+_thermal_noise_3_75 = 1.5E-6
+# отношение размаха шума к его СКЗ (99.9 % нормального распределения)
+_p2p_to_rms = 6.6
+
+# результат планирования
+# data_rate_raw, gain_raw - 'сырые' настройки для Mcp342X.start_measurement
+# oversampling - кол-во усредняемых отсчетов
+# throughput - кол-во результатов (после усреднения) в секунду
+# noise_rms - СКЗ шума результата, Вольт
+# noise_free_bits - разрешение без шума в диапазоне входного напряжения, бит
+plan_result = namedtuple("plan_result", "data_rate_raw gain_raw oversampling throughput noise_rms noise_free_bits")
+
+
+def get_lsb(data_rate_raw: int, gain_raw: int) -> float:
+    """Цена младшего разряда, Вольт"""
+    return 2 * _ref_voltage / (2 ** gain_raw * 2 ** (12 + 2 * data_rate_raw))
+
+
+def model_noise(data_rate_raw: int, gain_raw: int) -> float:
+    """СКЗ шума одного отсчета, приведенного ко входу, Вольт, по модели datasheet: тепловой шум и шум квантования"""
+    thermal = _thermal_noise_3_75 * math.sqrt(_sample_rates[data_rate_raw] / _sample_rates[3])
+    q = get_lsb(data_rate_raw, gain_raw) / math.sqrt(12)
+    return math.sqrt(thermal * thermal + q * q)
+
+
+def _averaged_noise(rms: float, lsb: float, n: int) -> float:
+    """СКЗ шума среднего n отсчетов. Усреднение уменьшает шум, только если шум 'раскачивает' младший разряд,
+    иначе все n отсчетов одинаковы и шум квантования остается."""
+    if rms < lsb / 2:
+        return rms
+    return rms / math.sqrt(n)
+
+
+def plan(input_range: float, max_noise_uv: [float, None] = None, noise_free_bits: [float, None] = None,
+         max_oversampling: int = 256, noise_table: [dict, None] = None) -> plan_result:
+    """Возвращает настройку с наибольшим кол-вом результатов в секунду, при которой выполняются требования.
+    input_range - наибольшее абсолютное значение входного (дифференциального) напряжения, Вольт.
+    max_noise_uv - допустимое СКЗ шума результата, мкВ.
+    noise_free_bits - требуемое разрешение без шума (по размаху шума) в диапазоне ±input_range, бит.
+    max_oversampling - наибольшее кол-во усредняемых отсчетов (перебираются степени двойки).
+    noise_table - измеренный шум, словарь (data_rate_raw, gain_raw) -> СКЗ шума в Вольтах (или объект со
+    свойством rms, например результат host_tools.noise.analyze_captures). Настройки, которых нет в таблице,
+    оцениваются по модели datasheet."""
+    if input_range <= 0 or input_range > _ref_voltage:
+        raise ValueError(f"Диапазон входного напряжения вне (0..{_ref_voltage}] Вольт: {input_range}")
+    if max_noise_uv is None and noise_free_bits is None:
+        raise ValueError("Задайте max_noise_uv и/или noise_free_bits!")
+    best = None
+    for gain_raw in range(4):
+        if _ref_voltage / 2 ** gain_raw < input_range:
+            break   # вход вне шкалы при этом и большем усилении
+        for data_rate_raw in range(4):
+            rms = None
+            if noise_table:
+                rms = noise_table.get((data_rate_raw, gain_raw))
+                if rms is not None and not isinstance(rms, (int, float)):
+                    rms = rms.rms
+            if rms is None:
+                rms = model_noise(data_rate_raw, gain_raw)
+            lsb = get_lsb(data_rate_raw, gain_raw)
+            n = 1
+            while n <= max_oversampling:
+                avg = _averaged_noise(rms, lsb, n)
+                nfb = math.log2(2 * input_range / max(_p2p_to_rms * avg, lsb))
+                ok = (max_noise_uv is None or 1E6 * avg <= max_noise_uv) and \
+                     (noise_free_bits is None or nfb >= noise_free_bits)
+                if ok:
+                    res = plan_result(data_rate_raw, gain_raw, n, _sample_rates[data_rate_raw] / n, avg, nfb)
+                    if best is None or res.throughput > best.throughput or \
+                            (res.throughput == best.throughput and res.noise_rms < best.noise_rms):
+                        best = res
+                    break   # большее n только уменьшит кол-во результатов в секунду
+                if avg == rms and n > 1:
+                    break   # усреднение не помогает
+                n *= 2
+    if best is None:
+        raise ValueError("Требование к точности невыполнимо!")
+    return best
+
+
+def apply_plan(adc, result: plan_result, single_shot: bool = False, channel: int = 0):
+    """Настраивает АЦП (Mcp342X) по результату plan. Усреднение result.oversampling отсчетов выполняет приложение"""
+    adc.start_measurement(single_shot=single_shot, data_rate_raw=result.data_rate_raw, gain_raw=result.gain_raw,
+                          channel=channel, differential_channel=True)
@@ -0,0 +1,39 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Реализация вычислительных ядер для MicroPython (viper/native). Не импортируйте напрямую, смотри kernels.py!
+Код должен совпадать по результату с кодом на чистом Python из kernels.py"""
+import micropython
+
+
+@micropython.viper
+def sign_extend(value: int, bits: int) -> int:
+    sign = 1 << (bits - 1)
+    value = value & ((sign << 1) - 1)
+    return (value ^ sign) - sign
+
+
+@micropython.viper
+def be_to_int(buf, n: int, bits: int) -> int:
+    p = ptr8(buf)
+    val = 0
+    for i in range(n):
+        val = (val << 8) | p[i]
+    sign = 1 << (bits - 1)
+    val = val & ((sign << 1) - 1)
+    return (val ^ sign) - sign
+
+
+@micropython.viper
+def get_bits(source: int, mask: int, shift: int) -> int:
+    return (source & mask) >> shift
+
+
+@micropython.viper
+def set_bits(source: int, value: int, mask: int, shift: int) -> int:
+    return (source & ~mask) | ((value << shift) & mask)
+
+
+@micropython.native
+def raw_to_real(raw: int, k: float, b: float) -> float:
+    return raw * k + b
@@ -0,0 +1,133 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Фоновое получение отсчетов АЦП по таймеру в кольцевой буфер.
+Приложение забирает отсчеты пачками и не опрашивает АЦП само (time.sleep_us в цикле больше не нужен),
+поэтому моменты взятия отсчетов не зависят от задержек в приложении."""
+
+from sensor_pack_2.ringbuf import RingBuffer
+from sensor_pack_2.adcmod import RAW_GAP
+from sensor_pack_2.ticks import ticks_us
+
+try:
+    from machine import Timer
+    import micropython
+except ImportError:
+    # CPython: вместо таймера поток
+    import threading
+    import time
+    Timer = None
+
+
+class BackgroundAcquisition:
+    """Периодически, с частотой преобразования АЦП, читает 'сырой' отсчет и кладет его
+    (вместе с отметкой времени ticks_us) в кольцевой буфер (SPSC).
+    В MicroPython обработчик прерывания machine.Timer лишь планирует (micropython.schedule) чтение по шине.
+    В CPython чтение выполняет отдельный поток.
+    Код чтения отсчета не выделяет память в куче, если ее не выделяет метод get_raw_value АЦП."""
+
+    def __init__(self, adc, capacity: int = 256, timestamps: bool = True, timer_id: int = -1):
+        """adc - экземпляр ADC в режиме непрерывного преобразования (start_measurement(single_shot=False...).
+        capacity - емкость кольцевого буфера в отсчетах, степень двойки.
+        timestamps - если Истина, то вместе с отсчетом сохраняется отметка времени ticks_us.
+        timer_id - номер аппаратного таймера (MicroPython). -1 - виртуальный таймер."""
+        self._adc = adc
+        self._ring = RingBuffer(capacity, 2 if timestamps else 1)
+        self._timer_id = timer_id
+        self._timer = None
+        self._thread = None
+        self._stop_event = None
+        # частота опроса, Гц
+        self._freq = None
+        # кол-во отсчетов, при чтении которых данные АЦП не были готовы
+        self.not_ready = 0
+        # кол-во ошибок шины (OSError) при чтении отсчета
+        self.bus_errors = 0
+        # кол-во пропущенных срабатываний таймера (очередь micropython.schedule переполнена)
+        self.missed = 0
+        # ссылки на связанные методы создаются один раз, чтобы не выделять память в обработчике прерывания!
+        self._sample_ref = self._sample
+        self._irq_ref = self._irq
+
+    @property
+    def ring(self) -> RingBuffer:
+        return self._ring
+
+    @property
+    def overruns(self) -> int:
+        """Кол-во отсчетов, потерянных из-за переполнения кольцевого буфера"""
+        return self._ring.overruns
+
+    @property
+    def running(self) -> bool:
+        return self._timer is not None or self._thread is not None
+
+    def _sample(self, _arg=None):
+        """Производитель. Читает отсчет и кладет его в кольцевой буфер"""
+        try:
+            raw = self._adc.get_raw_value()
+        except OSError:
+            # пропуск в потоке отсчетов
+            self.bus_errors += 1
+            self._ring.push(RAW_GAP, ticks_us())
+            return
+        if raw is None:
+            self.not_ready += 1
+            return
+        self._ring.push(raw, ticks_us())
+
+    def _irq(self, _timer):
+        """Обработчик прерывания таймера. Чтение по шине в прерывании недопустимо, поэтому оно планируется"""
+        try:
+            micropython.schedule(self._sample_ref, 0)
+        except RuntimeError:
+            self.missed += 1
+
+    def _run(self):
+        """Тело потока (CPython). Срабатывает с периодом 1/self._freq, без накопления ошибки"""
+        period = 1.0 / self._freq
+        stop = self._stop_event
+        deadline = time.monotonic()
+        while not stop.is_set():
+            self._sample()
+            deadline += period
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                stop.wait(delay)
+            else:
+                # поток не успевает, пропуск срабатываний
+                self.missed += int(-delay / period)
+                deadline = time.monotonic()
+
+    def start(self, freq: [float, None] = None):
+        """Запуск фонового получения отсчетов.
+        freq - частота опроса, Гц. Если None, то равна частоте преобразования АЦП (adc.sample_rate)."""
+        if self.running:
+            return
+        self._freq = freq if freq else self._adc.sample_rate
+        if Timer is not None:
+            self._timer = Timer(self._timer_id)
+            self._timer.init(freq=self._freq, mode=Timer.PERIODIC, callback=self._irq_ref)
+            return
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="adc-acquisition", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановка фонового получения отсчетов. Отсчеты в буфере сохраняются"""
+        if self._timer is not None:
+            self._timer.deinit()
+            self._timer = None
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def read(self, out_values, out_stamps=None) -> int:
+        """Переносит накопленные отсчеты в массивы out_values и out_stamps (отметки времени ticks_us, если
+        timestamps в Истина). Возвращает кол-во перенесенных отсчетов"""
+        return self._ring.drain(out_values, out_stamps)
+
+    def __len__(self) -> int:
+        """Кол-во отсчетов, ожидающих чтения"""
+        return len(self._ring)
@@ -3,28 +3,52 @@
 # MIT license
 
 # from sensor_pack_2.bus_service import mpy_bl
-from collections import namedtuple
 from sensor_pack_2.base_sensor import check_value
+from sensor_pack_2.kernels import raw_to_real
+
+
+class _LazyRecord:
+    """Тип кортежа с именованными полями (collections.namedtuple), создаваемый при первом использовании.
+    Модуль collections импортируется не при импорте драйвера, а при первом создании кортежа"""
+
+    def __init__(self, typename: str, field_names: str):
+        self._typename = typename
+        self._field_names = field_names
+        self._type = None
+
+    def _get_type(self):
+        t = self._type
+        if t is None:
+            from collections import namedtuple
+            t = self._type = namedtuple(self._typename, self._field_names)
+        return t
+
+    def __call__(self, *args, **kwargs):
+        return self._get_type()(*args, **kwargs)
+
+    def __getattr__(self, name: str):
+        # _fields, _make и т. д.
+        return getattr(self._get_type(), name)
 
 # разностный вход (bool, differential_input)
 # разрядность в битах (int, resolution)
 # опорное напряжение в вольтах (float, rev_voltage)
 # количество аналоговых входов (channels)
-adc_base_props = namedtuple("adc_props", "ref_voltage resolution channels differential_channels")
+adc_base_props = _LazyRecord("adc_props", "ref_voltage resolution channels differential_channels")
 # кортеж информации о канале АЦП: number(номер канала):int, is_differential(дифференциальный_режим):bool
-adc_channel_info = namedtuple("adc_channel_info", "number is_differential")
+adc_channel_info = _LazyRecord("adc_channel_info", "number is_differential")
 # кортеж информации о количестве(!) каналов АЦП
 # channels - количество обычных(single ended) каналов
 # differential_channels - количество дифференциальных(differential) каналов
-adc_channels = namedtuple("adc_channels", "channels differential_channels")
+adc_channels = _LazyRecord("adc_channels", "channels differential_channels")
 # основные свойства АЦП: опорное напряжение, Вольт; текущее кол-во значащих бит в отсчете,
 # предельное кол-во значащих бит в отсчете, текущий номер канала, количество обычных накалов(Vxx..GND),
 # предельное кол-во обычных каналов, предельное кол-во дифференциальных каналов,
 # текущая частота отсчетов(current sample rate), Гц
-adc_general_props = namedtuple("adc_general_props",
-                               "ref_voltage resolution max_resolution current_channel channels diff_channels")
+adc_general_props = _LazyRecord("adc_general_props",
+                                "ref_voltage resolution max_resolution current_channel channels diff_channels")
 # основные 'сырые' настройки, характерные для всех(!) АЦП
-adc_general_raw_props = namedtuple("adc_general_raw_props", "sample_rate gain_amplifier single_shot_mode")
+adc_general_raw_props = _LazyRecord("adc_general_raw_props", "sample_rate gain_amplifier single_shot_mode")
 
 # параметры для инициализации АЦП
 # reference_voltage - опорное напряжение, Вольт
@@ -33,13 +57,19 @@ adc_general_raw_props = namedtuple("adc_general_raw_props", "sample_rate gain_am
 # channels - количество обычных(single ended) каналов
 # differential_channels - количество дифференциальных(differential) каналов
 # differential_mode - Если истина, то это дифференциальный АЦП. для метода get_lsb.
-adc_init_props = namedtuple("adc_init_props",
-                            "reference_voltage max_resolution channels differential_channels differential_mode")
+adc_init_props = _LazyRecord("adc_init_props",
+                             "reference_voltage max_resolution channels differential_channels differential_mode")
 # для метода get_raw_value_ex
 # value - значение АЦП, сырое(!)
 # если low_limit в Истина, то "стрелка" АЦП на нижнем крае шкалы (underflow)
 # если hi_limit в Истина, то "стрелка" АЦП верхнем крае шкалы (overflow)
-raw_value_ex = namedtuple("raw_value_ex", "value low_limit hi_limit")
+raw_value_ex = _LazyRecord("raw_value_ex", "value low_limit hi_limit")
+
+# 'сырой' отсчет - признак пропуска (gap) в потоке отсчетов, например, из-за ошибки шины.
+# Вне диапазона отсчетов любого АЦП до 30 бит, но помещается в малое целое MicroPython и в array('l')
+RAW_GAP = -0x40000000
+# то же для значений в Вольтах
+REAL_GAP = float('nan')
 
 # Типовое содержимое регистра конфигурации (все значения сырые/raw):
 # gain; коэффициент усиления для PGA-programmable gain amplifier (усилитель с программируемым усилением)
@@ -93,6 +123,12 @@ class ADC:
         self._low_pwr_mode = None
         # строковое имя модели АЦП
         self._model_name = model
+        # коэффициенты преобразования 'сырого' отсчета в Вольты: k * raw + b. Вычисляются методом _update_scale
+        # при изменении настроек АЦП, чтобы не вычислять цену младшего разряда для каждого отсчета!
+        self._scale_k = None
+        self._scale_b = 0.0
+        # таблица коэффициентов калибровки (sensor_pack_2.calibration.CalibrationTable) или None
+        self._calibration = None
 
     @property
     def model(self) -> str:
@@ -170,9 +206,38 @@ class ADC:
         return raw_value_ex(value=raw, low_limit=raw in range(limits.low_limit, 1 + delta + limits.low_limit),
                             hi_limit=raw in range(limits.hi_limit - delta, 1 + limits.hi_limit))
 
+    def _update_scale(self) -> float:
+        """Пересчитывает коэффициенты преобразования 'сырого' отсчета в Вольты для текущих настроек АЦП.
+        Вызывайте после изменения разрешения или усиления АЦП!
+        Калибровка (если есть) учитывается здесь: (raw - offset) * lsb * gain = raw * k + b.
+        Возвращает k."""
+        k, b = self.get_lsb(), 0.0
+        cal = self._calibration
+        if cal is not None:
+            cc = cal.get(self._curr_channel, self._curr_raw_gain, self._curr_raw_data_rate)
+            if cc is not None:
+                k *= cc.gain
+                b = -cc.offset * k
+        self._scale_k, self._scale_b = k, b
+        return k
+
+    @property
+    def calibration(self):
+        """Таблица коэффициентов калибровки (CalibrationTable) или None"""
+        return self._calibration
+
+    @calibration.setter
+    def calibration(self, value):
+        self._calibration = value
+        # коэффициенты преобразования будут пересчитаны при следующем преобразовании отсчета в Вольты
+        self._scale_k = None
+
     def raw_value_to_real(self, raw_val: int) -> float:
         """Преобразует 'сырое' значение из регистра АЦП в значение в Вольтах"""
-        return raw_val * self.get_lsb()
+        k = self._scale_k
+        if k is None:
+            k = self._update_scale()
+        return raw_to_real(raw_val, k, self._scale_b)
 
     def gain_raw_to_real(self, raw_gain: int) -> float:
         """Преобразует 'сырое' значение усиления в 'настоящее'.
@@ -182,7 +247,7 @@ class ADC:
     def get_value(self, raw: bool = True) -> float:
         """Возвращает значение текущего канала в Вольтах, если raw в Ложь, в коде, если raw в Истина"""
         val = self.get_raw_value()
-        if raw:
+        if raw or val is None:
             return val
         return self.raw_value_to_real(val)
 
@@ -235,6 +300,7 @@ class ADC:
         self.raw_config_to_adc_properties(_raw_cfg)     # обновляю поля экземпляра класса
         # пересчет в реальное усиление
         self._real_gain = self.gain_raw_to_real(self._curr_raw_gain)
+        self._update_scale()
 
     def raw_config_to_adc_properties(self, raw_config: int):
         """Возвращает текущие настройки датчика из числа, возвращенного get_raw_config(!), в поля(!) класса.
@@ -1,10 +1,48 @@
 # micropython
 # MIT license
 # Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
-import struct
-import micropython
 from sensor_pack_2 import bus_service
-from machine import Pin
+
+try:
+    from machine import Pin
+except ImportError:
+    # CPython (Linux хост): модуля machine нет, адрес устройства - только int. Смотри linux_i2c.py
+    Pin = None
+
+from sensor_pack_2.kernels import micropython    # в CPython заглушка
+
+# модуль struct и тип кодека импортируются при создании первого кодека (_new_codec), а не при импорте модуля
+struct = None
+_Struct = None
+
+
+class _StructMpy:
+    """Замена struct.Struct для MicroPython (в модуле struct MicroPython этого класса нет).
+    Строка формата собирается один раз, при создании"""
+    def __init__(self, fmt: str):
+        self.format = fmt
+        self.size = struct.calcsize(fmt)
+
+    def pack(self, *values) -> bytes:
+        return struct.pack(self.format, *values)
+
+    def pack_into(self, buf, offset: int, *values):
+        struct.pack_into(self.format, buf, offset, *values)
+
+    def unpack(self, source) -> tuple:
+        return struct.unpack(self.format, source)
+
+    def unpack_from(self, source, offset: int = 0) -> tuple:
+        return struct.unpack_from(self.format, source, offset)
+
+
+def _new_codec(fmt: str):
+    """Возвращает кодек (struct.Struct или _StructMpy) для строки формата fmt"""
+    global struct, _Struct
+    if _Struct is None:
+        import struct
+        _Struct = getattr(struct, "Struct", _StructMpy)
+    return _Struct(fmt)
 
 
 @micropython.native
@@ -57,6 +95,8 @@ class Device:
         # передавать первым битом старший или младший
         # для каждого устройства!
         self.msb_first = True
+        # кэш кодеков (struct.Struct): символ порядка байт -> {fmt_char: кодек}
+        self._codecs = {}
 
     def _get_byteorder_as_str(self) -> tuple:
         """Return byteorder as string"""
@@ -64,22 +104,49 @@ class Device:
             return 'big', '>'
         return 'little', '<'
 
+    def get_codec(self, fmt_char: str, redefine_byte_order: str = None):
+        """Возвращает кодек (struct.Struct) для формата fmt_char с порядком байт устройства.
+        Кодек создается при первом запросе и хранится в кэше устройства, поэтому строка формата
+        разбирается один раз. redefine_byte_order - символ порядка байт модуля struct ('>', '<', '!', '=', '@')
+        или 'big'/'little', если не None."""
+        if redefine_byte_order is None:
+            bo = '>' if self.big_byte_order else '<'
+        else:
+            bo = redefine_byte_order[0]
+            if 'b' == bo:
+                bo = '>'
+            elif 'l' == bo:
+                bo = '<'
+        cache = self._codecs.get(bo)
+        if cache is None:
+            if bo not in '<>!=@':
+                raise ValueError(f"Неверный порядок байт: {redefine_byte_order}")
+            cache = self._codecs[bo] = {}
+        codec = cache.get(fmt_char)
+        if codec is None:
+            if not fmt_char:
+                raise ValueError("Invalid fmt_char parameter!")
+            codec = _new_codec(bo + fmt_char)
+            cache[fmt_char] = codec
+        return codec
+
     def pack(self, fmt_char: str, *values) -> bytes:
-        if not fmt_char:
-            raise ValueError("Invalid fmt_char parameter!")
-        bo = self._get_byteorder_as_str()[1]
-        return struct.pack(bo + fmt_char, values)
+        return self.get_codec(fmt_char).pack(*values)
+
+    def pack_into(self, fmt_char: str, buf, offset: int, *values):
+        """упаковка значений values в предварительно созданный буфер buf, начиная с байта offset"""
+        self.get_codec(fmt_char).pack_into(buf, offset, *values)
 
     def unpack(self, fmt_char: str, source: bytes, redefine_byte_order: str = None) -> tuple:
         """распаковка массива, считанного из датчика.
         Если redefine_byte_order != None, то bo (смотри ниже) = redefine_byte_order
         fmt_char: c, b, B, h, H, i, I, l, L, q, Q. pls see: https://docs.python.org/3/library/struct.html"""
-        if not fmt_char:
-            raise ValueError("Invalid fmt_char parameter!")
-        bo = self._get_byteorder_as_str()[1]
-        if redefine_byte_order is not None:
-            bo = redefine_byte_order[0]
-        return struct.unpack(bo + fmt_char, source)
+        return self.get_codec(fmt_char, redefine_byte_order).unpack(source)
+
+    def unpack_from(self, fmt_char: str, source, offset: int = 0, redefine_byte_order: str = None) -> tuple:
+        """распаковка значений из буфера source, начиная с байта offset. Длина source может быть больше
+        размера формата, поэтому один буфер чтения можно использовать для нескольких регистров."""
+        return self.get_codec(fmt_char, redefine_byte_order).unpack_from(source, offset)
 
     @micropython.native
     def is_big_byteorder(self) -> bool:
@@ -4,6 +4,7 @@
 """Представление битового поля"""
 from collections import namedtuple
 from sensor_pack_2.base_sensor import check_value, get_error_str
+from sensor_pack_2.kernels import get_bits, set_bits
 
 # информация о битовом поле в виде именованного кортежа
 # name: str  - имя
@@ -35,44 +36,59 @@ class BitFields:
     def __init__(self, fields_info: tuple[bit_field_info, ...]):
         BitFields._check(fields_info)
         self._fields_info = fields_info
+        # битовые маски полей, вычисляются один раз. Индекс маски равен индексу поля в fields_info
+        self._masks = tuple(map(lambda fi: _bitmask(fi.position), fields_info))
         self._idx = 0
         # имя битового поля, которое будет параметром у методов get_value/set_value
         self._active_field_name = fields_info[0].name
         # значение, из которого будут извлекаться битовые поля
         self._source_val = 0
 
+    def _index_by_name(self, name: str) -> [int, None]:
+        """возвращает индекс битового поля по его имени (поле name именованного кортежа) или None"""
+        items = self._fields_info
+        for i in range(len(items)):
+            if name == items[i].name:
+                return i
+
     def _by_name(self, name: str) -> [bit_field_info, None]:
         """возвращает информацию о битовом поле по его имени (поле name именованного кортежа) или None"""
-        items = self._fields_info
-        for item in items:
-            if name == item.name:
-                return item
+        idx = self._index_by_name(name)
+        if idx is not None:
+            return self._fields_info[idx]
 
-    def _get_field(self, key: [str, int, None]) -> [bit_field_info, None]:
-        """для внутреннего использования"""
-        fi = self._fields_info
-        _itm = None
+    def _get_index(self, key: [str, int, None]) -> [int, None]:
+        """для внутреннего использования. Возвращает индекс битового поля"""
         if key is None:
-            _itm = self._by_name(self.field_name)
+            return self._index_by_name(self.field_name)
         if isinstance(key, int):
-            _itm = fi[key]
+            return key
         if isinstance(key, str):
-            _itm = self._by_name(key)
-        return _itm
+            return self._index_by_name(key)
+
+    def _get_field(self, key: [str, int, None]) -> [bit_field_info, None]:
+        """для внутреннего использования"""
+        idx = self._get_index(key)
+        if idx is not None:
+            return self._fields_info[idx]
+
+    def _get_value_by_index(self, idx: int) -> [int, bool]:
+        """возвращает значение битового поля с индексом idx из self.source.
+        Не выделяет память в куче, поэтому вызывается в 'горячем' коде."""
+        pos = self._fields_info[idx].position
+        val = get_bits(self._source_val, self._masks[idx], pos.start)  # выделение маской битового диапазона и его сдвиг вправо
+        if 1 == len(pos):
+            return 0 != val     # bool
+        return val              # int
 
     def get_field_value(self, field_name: str = None, validate: bool = False) -> [int, bool]:
         """возвращает значение битового поля, по его имени(self.field_name), из self.source."""
-        item = self._get_field(field_name)
-        if item is None:
+        idx = self._get_index(field_name)
+        if idx is None:
             raise ValueError(f"get_field_value. Поле с именем {field_name} не существует!")
-        pos = item.position
-        bitmask = _bitmask(pos)
-        val = (self.source & bitmask) >> pos.start  # выделение маской битового диапазона и его сдвиг вправо
-        if item.valid_values and validate:
+        if self._fields_info[idx].valid_values and validate:
             raise NotImplemented("Если вы решили проверить значение поля при его возвращении, то делайте это самостоятельно!!!")
-        if 1 == len(pos):
-            return 0 != val     # bool
-        return val              # int
+        return self._get_value_by_index(idx)
 
     def set_field_value(self, value: int, source: [int, None] = None, field: [str, int, None] = None,
                         validate: bool = True) -> int:
@@ -80,22 +96,21 @@ class BitFields:
         Возвращает значение с измененным битовым полем.
         Если field is None, то имя поля берется из свойства self._active_field_name.
         Если source is None, то значение поля, подлежащее изменению, изменяется в свойстве self._source_val"""
-        item = self._get_field(key=field)     #   *
+        idx = self._get_index(key=field)     #   *
+        item = self._fields_info[idx]
         rng = item.valid_values
         if rng and validate:
             check_value(value, rng, get_error_str(self.field_name, value, rng))
         pos = item.position
-        bitmask = _bitmask(pos)
-        src = self._get_source(source) & ~bitmask  # чистка битового диапазона
-        src |= (value << pos.start) & bitmask  # установка битов в заданном диапазоне
+        # чистка битового диапазона и установка битов в заданном диапазоне
+        src = set_bits(self._get_source(source), value, self._masks[idx], pos.start)
         if source is None:
             self._source_val = src
         return src
 
     def __getitem__(self, key: [int, str]) -> [int, bool]:
         """возвращает значение битового поля из значения в self.source по его имени/индексу"""
-        _bfi = self._get_field(key)
-        return self.get_field_value(_bfi.name)
+        return self._get_value_by_index(self._get_index(key))
 
     def __setitem__(self, field_name: str, value: [int, bool]):
         """Волшебный метод, вызывает set_field_value.
@@ -0,0 +1,258 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Арбитраж общей шины (одного BusAdapter) между несколькими устройствами: MCP342X и другими датчиками sensor_pack_2.
+Запросы на шину выстраиваются в очередь. Шина отдается запросу с наибольшим приоритетом (меньшее число - выше
+приоритет), при равном приоритете - тому же устройству, что владело шиной перед этим (пакетирование следующих подряд
+операций одного устройства, не более max_batch раз подряд), затем в порядке поступления.
+BusArbiter - для потоков (threading), AsyncBusArbiter - для asyncio."""
+
+from sensor_pack_2.bus_service import BusAdapter
+
+try:
+    import threading
+except ImportError:
+    threading = None    # MicroPython: только AsyncBusArbiter
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+# приоритеты запросов на шину
+PRIORITY_HIGH = 0       # чтение, чувствительное к задержке (например, отсчеты АЦП)
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class _Waiter:
+    """Ожидающий запрос на шину"""
+    def __init__(self, seq: int, device_addr, priority: int, event):
+        self.seq = seq
+        self.device_addr = device_addr
+        self.priority = priority
+        self.event = event
+
+
+class _ArbiterPolicy:
+    """Общая для BusArbiter и AsyncBusArbiter политика выбора следующего владельца шины"""
+
+    def __init__(self, adapter: BusAdapter, max_batch: int):
+        self.adapter = adapter
+        self.max_batch = max_batch
+        self._waiters = []
+        self._seq = 0
+        self._busy = False
+        # устройство, владевшее шиной последним, и кол-во предоставлений шины ему подряд
+        self._last_device = None
+        self._batch = 0
+        # статистика
+        self.grants = 0
+        self.contended = 0
+
+    def _next_seq(self) -> int:
+        self._seq += 1
+        return self._seq
+
+    def _grant_to(self, device_addr):
+        self._busy = True
+        self.grants += 1
+        if device_addr == self._last_device:
+            self._batch += 1
+        else:
+            self._last_device, self._batch = device_addr, 1
+
+    def _select(self) -> [_Waiter, None]:
+        """Выбор следующего владельца шины из ожидающих"""
+        best, best_key = None, None
+        batching = self._batch < self.max_batch
+        for w in self._waiters:
+            other = 0 if batching and w.device_addr == self._last_device else 1
+            key = w.priority, other, w.seq
+            if best is None or key < best_key:
+                best, best_key = w, key
+        return best
+
+    def _release_next(self) -> [_Waiter, None]:
+        """Освобождает шину и возвращает ожидающий запрос, которому она передана, или None"""
+        w = self._select()
+        if w is None:
+            self._busy = False
+            return None
+        self._waiters.remove(w)
+        self._grant_to(w.device_addr)
+        return w
+
+    @property
+    def waiting(self) -> int:
+        """Кол-во ожидающих запросов"""
+        return len(self._waiters)
+
+
+class _Transaction:
+    """Контекстный менеджер транзакции BusArbiter"""
+    def __init__(self, arbiter, device_addr, priority: int):
+        self._arbiter = arbiter
+        self._device_addr = device_addr
+        self._priority = priority
+
+    def __enter__(self):
+        self._arbiter.acquire(self._device_addr, self._priority)
+        return self._arbiter.adapter
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._arbiter.release()
+
+    async def __aenter__(self):
+        await self._arbiter.acquire(self._device_addr, self._priority)
+        return self._arbiter.adapter
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._arbiter.release()
+
+
+class BusArbiter(_ArbiterPolicy):
+    """Арбитр шины для потоков. Повторный захват шины тем же потоком допустим (вложенные транзакции),
+    поэтому устройство может объединить несколько операций в одну транзакцию:
+        with arbiter.transaction(0x68, PRIORITY_HIGH):
+            adc.start_measurement(...)    # запись и чтение конфигурации без вмешательства других устройств"""
+
+    def __init__(self, adapter: BusAdapter, max_batch: int = 4):
+        if threading is None:
+            raise OSError("Модуль threading недоступен!")
+        super().__init__(adapter, max_batch)
+        self._lock = threading.Lock()
+        self._owner = None
+        self._depth = 0
+
+    def acquire(self, device_addr, priority: int = PRIORITY_NORMAL):
+        """Захват шины. Блокирует поток до получения шины"""
+        me = threading.get_ident()
+        with self._lock:
+            if self._owner == me:
+                self._depth += 1
+                return
+            if not self._busy:
+                self._grant_to(device_addr)
+                self._owner, self._depth = me, 1
+                return
+            self.contended += 1
+            w = _Waiter(self._next_seq(), device_addr, priority, threading.Event())
+            self._waiters.append(w)
+        w.event.wait()
+        # шина передана этому потоку в release
+        self._owner, self._depth = me, 1
+
+    def release(self):
+        """Освобождение шины"""
+        with self._lock:
+            if self._owner != threading.get_ident():
+                raise RuntimeError("Шина не захвачена этим потоком!")
+            self._depth -= 1
+            if self._depth:
+                return
+            self._owner = None
+            w = self._release_next()
+        if w is not None:
+            w.event.set()
+
+    def transaction(self, device_addr, priority: int = PRIORITY_NORMAL) -> _Transaction:
+        """Контекстный менеджер: шина захвачена на время блока with"""
+        return _Transaction(self, device_addr, priority)
+
+    def adapter_for(self, priority: int = PRIORITY_NORMAL) -> BusAdapter:
+        """Адаптер шины для устройства, каждая операция которого выполняется с захватом шины"""
+        return ArbitratedAdapter(self, priority)
+
+
+class ArbitratedAdapter(BusAdapter):
+    """Адаптер шины, выполняющий каждую операцию через BusArbiter. Передайте его конструктору устройства
+    вместо общего адаптера: Mcp342X(arbiter.adapter_for(PRIORITY_HIGH))"""
+
+    def __init__(self, arbiter: BusArbiter, priority: int = PRIORITY_NORMAL):
+        super().__init__(arbiter.adapter.bus)
+        self._arbiter = arbiter
+        self._inner = arbiter.adapter
+        self.priority = priority
+
+    def read_register(self, device_addr, reg_addr: int, bytes_count: int) -> bytes:
+        with self._arbiter.transaction(device_addr, self.priority):
+            return self._inner.read_register(device_addr, reg_addr, bytes_count)
+
+    def write_register(self, device_addr, reg_addr: int, value: [int, bytes, bytearray],
+                       bytes_count: int, byte_order: str):
+        with self._arbiter.transaction(device_addr, self.priority):
+            return self._inner.write_register(device_addr, reg_addr, value, bytes_count, byte_order)
+
+    def read(self, device_addr, n_bytes: int) -> bytes:
+        with self._arbiter.transaction(device_addr, self.priority):
+            return self._inner.read(device_addr, n_bytes)
+
+    def read_to_buf(self, device_addr, buf: bytearray) -> bytes:
+        with self._arbiter.transaction(device_addr, self.priority):
+            return self._inner.read_to_buf(device_addr, buf)
+
+    def write(self, device_addr, buf: bytes):
+        with self._arbiter.transaction(device_addr, self.priority):
+            return self._inner.write(device_addr, buf)
+
+    def write_const(self, device_addr, val: int, count: int):
+        with self._arbiter.transaction(device_addr, self.priority):
+            return self._inner.write_const(device_addr, val, count)
+
+    def read_buf_from_memory(self, device_addr, mem_addr, buf, address_size: int = 1):
+        with self._arbiter.transaction(device_addr, self.priority):
+            return self._inner.read_buf_from_memory(device_addr, mem_addr, buf, address_size)
+
+    def write_buf_to_memory(self, device_addr, mem_addr, buf, address_size: int = 1):
+        with self._arbiter.transaction(device_addr, self.priority):
+            return self._inner.write_buf_to_memory(device_addr, mem_addr, buf, address_size)
+
+
+class AsyncBusArbiter(_ArbiterPolicy):
+    """Арбитр шины для asyncio. Операции адаптера блокирующие, арбитр лишь упорядочивает доступ задач к шине.
+    Повторный захват шины той же задачей не поддерживается!
+        async with arbiter.transaction(0x68, PRIORITY_HIGH) as adapter:
+            adapter.read_to_buf(0x68, buf)
+    или
+        await arbiter.run(0x68, adc.get_raw_value, priority=PRIORITY_HIGH)"""
+
+    def __init__(self, adapter: BusAdapter, max_batch: int = 4):
+        if asyncio is None:
+            raise OSError("Модуль asyncio недоступен!")
+        super().__init__(adapter, max_batch)
+
+    async def acquire(self, device_addr, priority: int = PRIORITY_NORMAL):
+        """Захват шины"""
+        if not self._busy:
+            self._grant_to(device_addr)
+            return
+        self.contended += 1
+        w = _Waiter(self._next_seq(), device_addr, priority, asyncio.Event())
+        self._waiters.append(w)
+        try:
+            await w.event.wait()
+        except asyncio.CancelledError:
+            if w in self._waiters:
+                self._waiters.remove(w)
+            else:
+                self.release()  # шина уже передана этой задаче
+            raise
+
+    def release(self):
+        """Освобождение шины"""
+        w = self._release_next()
+        if w is not None:
+            w.event.set()
+
+    def transaction(self, device_addr, priority: int = PRIORITY_NORMAL) -> _Transaction:
+        """Асинхронный контекстный менеджер: шина захвачена на время блока async with"""
+        return _Transaction(self, device_addr, priority)
+
+    async def run(self, device_addr, func, *args, priority: int = PRIORITY_NORMAL):
+        """Выполняет func(*args) с захватом шины. Возвращает результат func"""
+        await self.acquire(device_addr, priority)
+        try:
+            return func(*args)
+        finally:
+            self.release()
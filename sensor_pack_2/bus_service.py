@@ -3,22 +3,34 @@
 # Copyright (c) 2022 Roman Shevchik   goctaprog@gmail.com
 """MicroPython модуль для работы с шинами ввода/вывода"""
 
-import math
-from machine import I2C, SPI, Pin
+# Имена только для аннотаций типов: MicroPython аннотации не вычисляет, а в CPython (Linux хост) модуля machine нет.
+# Модуль machine импортирует код, создающий шину (смотри main.py), а не драйвер, поэтому импорт драйвера не
+# загружает аппаратные модули. Для Linux смотри linux_i2c.py
+I2C = SPI = Pin = None
 
 
 def mpy_bl(value: int) -> int:
     """Возвращает место, занимаемое значением value в битах.
     Аналог int.bit_length(), которая есть в Python, но отсутствует в MicroPython!"""
-    if 0 == value:
-        return 0
-    return 1 + int(math.log2(abs(value)))
+    value = abs(value)
+    n = 0
+    while value:
+        value >>= 1
+        n += 1
+    return n
+
+
+# размер буфера заполнения метода write_const, байт
+_FILL_SIZE = 32
 
 
 class BusAdapter:
     """Посредник между шиной ввода/вывода и классом ввода/вывода устройства"""
     def __init__(self, bus: [I2C, SPI]):
         self.bus = bus
+        # буфер заполнения метода write_const и значение, которым он заполнен. Создается при первом вызове
+        self._fill_buf = None
+        self._fill_val = None
 
     def get_bus_type(self) -> type:
         """Возвращает тип шины"""
@@ -63,19 +75,22 @@ class BusAdapter:
         bl = mpy_bl(val)
         if bl > 8:
             raise ValueError(f"The value must take no more than 8 bits! Current: {bl}")
-        _max = 16
-        if count < _max:
-            _max = count
+        if self._fill_buf is None:
+            self._fill_buf = memoryview(bytearray(_FILL_SIZE))
+        b = self._fill_buf
+        if val != self._fill_val:
+            # буфер заполняется заново только при смене значения
+            for i in range(_FILL_SIZE):
+                b[i] = val
+            self._fill_val = val
         # вычисляю кол-во повторений тела цикла
-        repeats = count // _max  # количество итераций
-        b = bytearray([val for _ in range(_max)])
+        repeats = count // _FILL_SIZE  # количество итераций
         for _ in range(repeats):
             self.write(device_addr, b)
         # вычисляю остаток
-        remainder = count - _max * repeats
+        remainder = count - _FILL_SIZE * repeats
         if remainder:
-            b = bytearray([val for _ in range(remainder)])
-            self.write(device_addr, b)
+            self.write(device_addr, b[:remainder])
 
     def read_buf_from_memory(self, device_addr: [int, Pin], mem_addr, buf, address_size: int):
         """Читает из устройства с адресом device_addr в буфер buf, начиная с адреса в устройстве mem_addr.
@@ -84,7 +99,9 @@ class BusAdapter:
         распознается и размер адреса всегда равен 1 (8 бит))."""
         raise NotImplementedError
 
-    def write_buf_to_memory(self, device_addr: [int, Pin], mem_addr, buf):
+    def write_buf_to_memory(self, device_addr: [int, Pin], mem_addr, buf, address_size: int = 1):
+        """Записывает в устройство с адресом device_addr все байты из буфера buf, начиная с адреса mem_addr.
+        address_size - размер адреса в байтах (смотри read_buf_from_memory)."""
         raise NotImplementedError
 
 
@@ -131,7 +148,7 @@ class I2cAdapter(BusAdapter):
         self.bus.readfrom_mem_into(device_addr, mem_addr, buf)
         return buf
 
-    def write_buf_to_memory(self, device_addr: int, mem_addr, buf):
+    def write_buf_to_memory(self, device_addr: int, mem_addr, buf, address_size: int = 1):
         """Записывает в устройство с адресом device_addr все байты из буфера buf.
         Запись начинается с адреса в устройстве: mem_addr.
         Расширение возможностей базового класса."""
@@ -157,6 +174,15 @@ class SpiAdapter(BusAdapter):
         # вида prepare(buf:bytearray, address_index:int) -> bytes: ...
         # или None
         self._prepare_before_send_ref = None
+        # команды чтения и записи памяти устройства, передаваемые перед адресом (например 0x03 и 0x02 для
+        # SPI EEPROM/FLASH). None - команды нет, сразу передается адрес (регистры датчиков)
+        self.mem_read_cmd = None
+        self.mem_write_cmd = None
+        # заголовок обмена с памятью: команда и адрес (до 4 байт). Создается один раз
+        self._header = memoryview(bytearray(5))
+        # буферы передачи и приема метода read_buf_from_memory (write_readinto), увеличиваются при необходимости.
+        # В буфере передачи после заголовка только нули
+        self._tx = self._rx = None
 
     @property
     def prepare_func(self):
@@ -173,9 +199,33 @@ class SpiAdapter(BusAdapter):
         if ref is not None:
             ref(buf, self._address_index)
 
+    def _make_header(self, cmd: [int, None], mem_addr: int, address_size: int) -> memoryview:
+        """Заполняет заголовок обмена с памятью: команда cmd (если не None) и адрес mem_addr (старшим байтом вперед).
+        Возвращает срез заголовка"""
+        if not 0 < address_size < 5:
+            raise ValueError(f"Неверный размер адреса: {address_size}")
+        h = self._header
+        i = 0
+        if cmd is not None:
+            h[0] = cmd
+            i = 1
+        self._address_index = i
+        for shift in range(8 * (address_size - 1), -8, -8):
+            h[i] = (mem_addr >> shift) & 0xFF
+            i += 1
+        return h[:i]
+
+    def _get_xfer_bufs(self, n: int) -> tuple:
+        """Возвращает буферы передачи и приема (memoryview) длиной n байт"""
+        tx = self._tx
+        if tx is None or len(tx) < n:
+            tx = self._tx = memoryview(bytearray(n))
+            self._rx = memoryview(bytearray(n))
+        return tx[:n], self._rx[:n]
+
     def read(self, device_addr: Pin, n_bytes: int) -> bytes:
         """Read a number of bytes specified by n_bytes while continuously writing the single byte given by write.
-        Returns a bytes object with the data that was read."""
+        Returns a bytes object with the data that was read. Без выделения памяти: read_to_buf."""
         try:
             device_addr.low()
             return self.bus.read(n_bytes)
@@ -221,22 +271,38 @@ class SpiAdapter(BusAdapter):
         finally:
             device_addr.high()
 
-    def read_buf_from_memory(self, device_addr: Pin, mem_addr, buf, address_size: int):
+    def read_buf_from_memory(self, device_addr: Pin, mem_addr, buf, address_size: int = 1):
         """Читает из устройства с адресом device_addr в буфер buf, начиная с адреса в устройстве mem_addr.
-        Количество считываемых байт определяется длинной буфера buf."""
+        Количество считываемых байт определяется длинной буфера buf.
+        Заголовок (mem_read_cmd и адрес размером address_size байт) и чтение данных - одна транзакция
+        write_readinto, в заранее созданных буферах адаптера; принятые данные копируются в buf."""
+        hdr = self._make_header(self.mem_read_cmd, mem_addr, address_size)
+        h = len(hdr)
+        tx, rx = self._get_xfer_bufs(h + len(buf))
+        tx[:h] = hdr
         try:
             device_addr.low()  # chip select
-            # пока нет реализации!!!
-            raise NotImplementedError
+            self.bus.write_readinto(tx, rx)
         finally:
             device_addr.high()
+            # буфер передачи снова из нулей: их устройство принимает во время чтения данных
+            for i in range(h):
+                tx[i] = 0
+        buf[:] = rx[h:]
+        return buf
 
-    def write_buf_to_memory(self, device_addr: Pin, mem_addr, buf):
+    def write_buf_to_memory(self, device_addr: Pin, mem_addr, buf, address_size: int = 1):
+        """Записывает в устройство с адресом device_addr все байты из буфера buf, начиная с адреса mem_addr.
+        Передается заголовок (mem_write_cmd и адрес размером address_size байт), затем buf, без копирования.
+        Перед отправкой buf обрабатывается функцией подготовки буфера (prepare_func)."""
+        hdr = self._make_header(self.mem_write_cmd, mem_addr, address_size)
         try:
             device_addr.low()  # chip select
             # подготовка буфера к пересылке
             self._call_prepare(buf)
-            # пока нет реализации!!!
-            raise NotImplementedError
+            if self.use_data_mode_pin and self.data_mode_pin:
+                self.data_mode_pin.value(self.data_packet)
+            self.bus.write(hdr)
+            self.bus.write(buf)
         finally:
             device_addr.high()
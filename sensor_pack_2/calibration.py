@@ -0,0 +1,103 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Калибровка АЦП: смещение нуля (по записи с закороченным входом) и поправка усиления (по опорному напряжению).
+Коэффициенты хранятся отдельно для каждой комбинации (канал, 'сырое' усиление, 'сырая' частота преобразования)
+и сохраняются в небольшой текстовый файл. Поправка 'встраивается' в коэффициенты преобразования отсчета
+в Вольты (ADC._update_scale), поэтому на каждый отсчет по-прежнему одно умножение и одно сложение."""
+
+from collections import namedtuple
+from sensor_pack_2.ticks import sleep_us
+
+# коэффициенты калибровки
+# offset - смещение нуля в 'сырых' отсчетах (может быть дробным)
+# gain - поправочный коэффициент усиления. Напряжение = (raw - offset) * lsb * gain
+calibration_coeffs = namedtuple("calibration_coeffs", "offset gain")
+
+
+class CalibrationTable:
+    """Таблица коэффициентов калибровки: (channel, gain_raw, data_rate_raw) -> calibration_coeffs"""
+
+    def __init__(self):
+        self._items = {}
+
+    def set(self, channel: int, gain_raw: int, data_rate_raw: int, offset: float = 0.0, gain: float = 1.0):
+        if gain <= 0:
+            raise ValueError(f"Неверный поправочный коэффициент усиления: {gain}")
+        self._items[(channel, gain_raw, data_rate_raw)] = calibration_coeffs(offset, gain)
+
+    def get(self, channel: int, gain_raw: int, data_rate_raw: int) -> [calibration_coeffs, None]:
+        """Возвращает коэффициенты калибровки или None, если их нет"""
+        return self._items.get((channel, gain_raw, data_rate_raw))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def save(self, path: str):
+        """Сохраняет таблицу в текстовый файл: строка на комбинацию, 'channel gain_raw data_rate_raw offset gain'"""
+        with open(path, 'w') as f:
+            for key, cc in self._items.items():
+                f.write(f"{key[0]} {key[1]} {key[2]} {cc.offset} {cc.gain}\n")
+
+    @staticmethod
+    def load(path: str):
+        """Загружает таблицу из файла, созданного методом save"""
+        tbl = CalibrationTable()
+        with open(path, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if 5 != len(parts):
+                    continue    # пустая или поврежденная строка
+                tbl.set(int(parts[0]), int(parts[1]), int(parts[2]), float(parts[3]), float(parts[4]))
+        return tbl
+
+
+def measure_mean(adc, count: int = 64, max_misses: int = 8) -> float:
+    """Возвращает среднее count 'сырых' отсчетов АЦП в режиме непрерывного преобразования.
+    Если АЦП max_misses периодов преобразования подряд не выдает новый отсчет (например, после сброса АЦП),
+    то выбрасывает исключение."""
+    if adc.single_shot_mode:
+        raise ValueError("Калибровка выполняется только в режиме непрерывного преобразования!")
+    td = adc.get_conversion_cycle_time()
+    total, n, misses = 0, 0, 0
+    while n < count:
+        sleep_us(td)
+        raw = adc.get_raw_value()
+        if raw is None:
+            misses += 1
+            if misses >= max_misses:
+                raise ValueError(f"АЦП не выдает отсчеты: {misses} периодов преобразования подряд!")
+            continue
+        misses = 0
+        total += raw
+        n += 1
+    return total / count
+
+
+def _current_key(adc) -> tuple:
+    return adc.get_current_channel().number, adc.current_raw_gain, adc.current_sample_rate
+
+
+def calibrate_offset(adc, table: CalibrationTable, count: int = 64) -> float:
+    """Калибровка смещения нуля для текущих настроек АЦП. Входы АЦП должны быть закорочены!
+    Поправка усиления для этих настроек, если она уже есть, сохраняется. Возвращает смещение в 'сырых' отсчетах."""
+    offset = measure_mean(adc, count)
+    old = table.get(*_current_key(adc))
+    table.set(*_current_key(adc), offset=offset, gain=old.gain if old else 1.0)
+    adc.calibration = table     # пересчет коэффициентов преобразования
+    return offset
+
+
+def calibrate_gain(adc, table: CalibrationTable, reference_voltage: float, count: int = 64) -> float:
+    """Калибровка усиления для текущих настроек АЦП. На вход АЦП должно быть подано опорное напряжение
+    reference_voltage, Вольт! Смещение нуля, если оно уже откалибровано, учитывается.
+    Возвращает поправочный коэффициент усиления."""
+    old = table.get(*_current_key(adc))
+    offset = old.offset if old else 0.0
+    mean = measure_mean(adc, count)
+    if mean == offset:
+        raise ValueError("Нет сигнала на входе АЦП!")
+    gain = reference_voltage / ((mean - offset) * adc.get_lsb())
+    table.set(*_current_key(adc), offset=offset, gain=gain)
+    adc.calibration = table
+    return gain
@@ -0,0 +1,93 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Поток отсчетов 'только изменения': отсчет выдается, если он отличается от последнего выданного больше,
+чем на зону нечувствительности (deadband), или пересек один из порогов, или истек интервал heartbeat.
+Сравнение выполняется над 'сырыми' отсчетами (get_raw_value), до преобразования в Вольты."""
+
+from sensor_pack_2.ticks import ticks_ms, ticks_diff
+
+# причины выдачи отсчета, битовые флаги свойства ChangeFilter.reason
+EMIT_FIRST = 0x01       # первый отсчет
+EMIT_CHANGE = 0x02      # изменение больше зоны нечувствительности
+EMIT_THRESHOLD = 0x04   # пересечение порога
+EMIT_HEARTBEAT = 0x08   # истек интервал heartbeat
+
+
+class ChangeFilter:
+    """Фильтр 'только изменения' для потока 'сырых' отсчетов.
+    Может работать как итератор над АЦП (source), возвращающий None, если отсчет не выдан, или
+    получать отсчеты методом feed."""
+
+    def __init__(self, source=None, deadband: int = 0, thresholds=(), heartbeat_ms: int = 0):
+        """source - АЦП (метод get_raw_value) или None, если отсчеты передаются методом feed.
+        deadband - зона нечувствительности в 'сырых' отсчетах.
+        thresholds - пороги в 'сырых' отсчетах. Пересечение любого из них приводит к выдаче отсчета.
+        heartbeat_ms - если больше нуля, то отсчет выдается не реже чем раз в heartbeat_ms мс."""
+        if deadband < 0 or heartbeat_ms < 0:
+            raise ValueError(f"Неверные параметры: deadband: {deadband}; heartbeat_ms: {heartbeat_ms}")
+        self._source = source
+        self.deadband = deadband
+        self._thresholds = tuple(sorted(thresholds))
+        self.heartbeat_ms = heartbeat_ms
+        # последний выданный отсчет, его 'зона' между порогами и время выдачи
+        self._last = None
+        self._last_zone = 0
+        self._last_ms = 0
+        # причина выдачи последнего отсчета (флаги EMIT_*)
+        self.reason = 0
+        self.emitted = 0
+        self.suppressed = 0
+
+    def _zone(self, raw: int) -> int:
+        """Номер 'зоны' отсчета: кол-во порогов, не превышающих raw"""
+        n = 0
+        for thr in self._thresholds:
+            if raw < thr:
+                break
+            n += 1
+        return n
+
+    def feed(self, raw: int, now_ms: [int, None] = None) -> bool:
+        """Обработка очередного отсчета. Возвращает Истина, если отсчет следует выдать.
+        now_ms - текущее время ticks_ms. Если None, то вызывается ticks_ms()."""
+        if now_ms is None:
+            now_ms = ticks_ms()
+        zone = self._zone(raw)
+        last = self._last
+        reason = 0
+        if last is None:
+            reason = EMIT_FIRST
+        else:
+            if abs(raw - last) > self.deadband:
+                reason |= EMIT_CHANGE
+            if zone != self._last_zone:
+                reason |= EMIT_THRESHOLD
+            if self.heartbeat_ms and ticks_diff(now_ms, self._last_ms) >= self.heartbeat_ms:
+                reason |= EMIT_HEARTBEAT
+        if not reason:
+            self.suppressed += 1
+            return False
+        self._last, self._last_zone, self._last_ms = raw, zone, now_ms
+        self.reason = reason
+        self.emitted += 1
+        return True
+
+    def reset(self):
+        """Следующий отсчет будет выдан в любом случае"""
+        self._last = None
+
+    @property
+    def last(self) -> [int, None]:
+        """Последний выданный отсчет"""
+        return self._last
+
+    # Iterator
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> [int, None]:
+        raw = self._source.get_raw_value()
+        if raw is None or not self.feed(raw):
+            return None
+        return raw
@@ -0,0 +1,99 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Сжатие последовательности 'сырых' отсчетов АЦП (до 18 бит со знаком): разность соседних отсчетов,
+zig-zag и varint кодирование, с периодическими ключевыми отсчетами.
+Формат: последовательность блоков. Блок - varint(n), затем zig-zag varint первого отсчета (ключевой отсчет,
+абсолютное значение), затем n - 1 zig-zag varint разностей соседних отсчетов. Блоки независимы, поэтому
+потеря блока не портит остальные. Разность соседних отсчетов обычно несколько единиц младшего разряда,
+то есть один байт вместо четырех. Быстрый декодер для хоста (NumPy) смотри в host_tools/deltacodec.py"""
+
+# наибольшее кол-во байт varint 32-битного значения
+_max_varint_len = 5
+
+
+def zigzag(value: int) -> int:
+    """Целое со знаком в целое без знака: 0, -1, 1, -2, 2... -> 0, 1, 2, 3, 4..."""
+    return value << 1 if value >= 0 else ((-value) << 1) - 1
+
+
+def unzigzag(value: int) -> int:
+    return (value >> 1) if 0 == value & 1 else -((value + 1) >> 1)
+
+
+def put_varint(value: int, out, offset: int) -> int:
+    """Записывает целое без знака value в out, начиная с offset. Возвращает индекс следующего байта"""
+    while value > 0x7F:
+        out[offset] = 0x80 | (value & 0x7F)
+        value >>= 7
+        offset += 1
+    out[offset] = value
+    return offset + 1
+
+
+def get_varint(data, offset: int) -> tuple:
+    """Читает целое без знака из data, начиная с offset. Возвращает (значение, индекс следующего байта)"""
+    val, shift = 0, 0
+    while True:
+        if offset >= len(data):
+            raise ValueError("Неожиданный конец данных varint!")
+        b = data[offset]
+        offset += 1
+        val |= (b & 0x7F) << shift
+        if not b & 0x80:
+            return val, offset
+        shift += 7
+
+
+class DeltaEncoder:
+    """Кодировщик. Пишет в заранее выделенный буфер, не выделяя память на отсчет"""
+
+    def __init__(self, keyframe_interval: int = 64):
+        """keyframe_interval - кол-во отсчетов в блоке (период ключевых отсчетов)"""
+        if keyframe_interval < 1:
+            raise ValueError(f"Неверный период ключевых отсчетов: {keyframe_interval}")
+        self.keyframe_interval = keyframe_interval
+
+    def max_encoded_size(self, count: int) -> int:
+        """Наибольший размер в байтах закодированных count отсчетов (размер буфера для encode)"""
+        blocks = (count + self.keyframe_interval - 1) // self.keyframe_interval
+        return _max_varint_len * (count + blocks)
+
+    def encode(self, values, out, offset: int = 0, count: [int, None] = None) -> int:
+        """Кодирует count (по умолчанию все) первых отсчетов values (list, array) в out (bytearray), начиная с offset.
+        Возвращает индекс байта, следующего за последним записанным. Размер out смотри max_encoded_size."""
+        if count is None:
+            count = len(values)
+        kfi = self.keyframe_interval
+        i = 0
+        while i < count:
+            n = kfi if count - i > kfi else count - i
+            offset = put_varint(n, out, offset)
+            prev = values[i]
+            offset = put_varint(zigzag(prev), out, offset)
+            for k in range(i + 1, i + n):
+                val = values[k]
+                offset = put_varint(zigzag(val - prev), out, offset)
+                prev = val
+            i += n
+        return offset
+
+
+def decode(data, out=None) -> list:
+    """Декодирует все блоки data. Отсчеты добавляются в out (list или array), если он не None.
+    Возвращает out или новый список. Для больших объемов на хосте используйте host_tools.deltacodec.decode"""
+    if out is None:
+        out = []
+    offset, size = 0, len(data)
+    while offset < size:
+        n, offset = get_varint(data, offset)
+        if 0 == n:
+            raise ValueError("Блок без отсчетов!")
+        zz, offset = get_varint(data, offset)
+        val = unzigzag(zz)
+        out.append(val)
+        for _ in range(n - 1):
+            zz, offset = get_varint(data, offset)
+            val += unzigzag(zz)
+            out.append(val)
+    return out
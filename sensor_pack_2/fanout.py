@@ -0,0 +1,92 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Раздача (fan-out) потока отсчетов одного АЦП нескольким потребителям (журнал, фильтр, интерфейс...)
+через ограниченные очереди, своя у каждого потребителя. Отсчет читается по шине один раз."""
+
+from sensor_pack_2.ringbuf import RingBuffer
+from sensor_pack_2.ticks import ticks_us
+
+# политика при переполнении очереди потребителя
+DROP_NEWEST = 0     # новый отсчет отбрасывается
+DROP_OLDEST = 1     # вытесняется самый старый отсчет
+
+
+class Subscription:
+    """Очередь одного потребителя. Отбрасываемые при переполнении отсчеты подсчитываются (dropped)"""
+
+    def __init__(self, capacity: int, policy: int, width: int, typecode: str):
+        if policy not in (DROP_NEWEST, DROP_OLDEST):
+            raise ValueError(f"Неверная политика переполнения очереди: {policy}")
+        # отметки времени ticks_us - целые, в отдельном массиве, при любом типе отсчетов
+        self._ring = RingBuffer(capacity, width, typecode, 'L')
+        self.policy = policy
+
+    def _put(self, value, extra: int):
+        if DROP_OLDEST == self.policy:
+            self._ring.push_overwrite(value, extra)
+        else:
+            self._ring.push(value, extra)
+
+    @property
+    def dropped(self) -> int:
+        """Кол-во отсчетов, потерянных этим потребителем из-за переполнения очереди"""
+        return self._ring.overruns
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def pop(self):
+        """Самый старый отсчет или None, если очередь пуста"""
+        return self._ring.pop()
+
+    def read(self, out_values, out_stamps=None) -> int:
+        """Переносит отсчеты (и отметки времени ticks_us, если они есть) в массивы. Возвращает кол-во отсчетов"""
+        return self._ring.drain(out_values, out_stamps)
+
+
+class Publisher:
+    """Источник отсчетов для нескольких потребителей.
+    source - итератор отсчетов, например Mcp342X (raw_mode в Истина для typecode 'l') или итератор опроса каналов.
+    Метод poll читает один отсчет из source и кладет его в очереди всех потребителей.
+    Политика DROP_OLDEST изменяет индекс чтения очереди, поэтому используйте ее, только если poll и чтение
+    очереди выполняются в одном потоке (в MicroPython - не из прерывания)!"""
+
+    def __init__(self, source=None, timestamps: bool = False, typecode: str = 'l'):
+        """timestamps - если Истина, то вместе с отсчетом в очередь кладется отметка времени ticks_us.
+        typecode - тип отсчетов в очередях, 'l' для 'сырых' отсчетов, 'f' для Вольт. Отметки времени хранятся
+        отдельно, целыми ('L'), при любом typecode."""
+        self._source = source
+        self._timestamps = timestamps
+        self._typecode = typecode
+        self._subs = []
+        # кол-во отсчетов, розданных потребителям
+        self.published = 0
+
+    def subscribe(self, capacity: int = 64, policy: int = DROP_NEWEST) -> Subscription:
+        """Возвращает очередь нового потребителя. capacity - емкость, степень двойки"""
+        sub = Subscription(capacity, policy, 2 if self._timestamps else 1, self._typecode)
+        self._subs.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        self._subs.remove(sub)
+
+    def __len__(self) -> int:
+        """Кол-во потребителей"""
+        return len(self._subs)
+
+    def publish(self, value, stamp: [int, None] = None):
+        """Кладет отсчет value в очереди всех потребителей. stamp - отметка времени, если None, то ticks_us()"""
+        if self._timestamps and stamp is None:
+            stamp = ticks_us()
+        for sub in self._subs:
+            sub._put(value, stamp if self._timestamps else 0)
+        self.published += 1
+
+    def poll(self):
+        """Читает один отсчет из source и раздает его. Возвращает отсчет или None, если его нет"""
+        value = next(self._source)
+        if value is not None:
+            self.publish(value)
+        return value
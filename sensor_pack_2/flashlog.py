@@ -0,0 +1,244 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Запись 'сырых' отсчетов в файл на flash для длительной автономной работы.
+Отсчеты накапливаются в блоке в ОЗУ и записываются в файл только целыми блоками размера block_size (размер
+блока стирания flash/файловой системы), поэтому нет записей по одному отсчету, которые изнашивают flash и дают
+задержки больше периода преобразования. Блоков два (двойная буферизация): пока один записывается, отсчеты
+накапливаются в другом.
+Блок: заголовок (magic, номер блока, ticks_ms первого отсчета, кол-во отсчетов, CRC-32 отсчетов), затем отсчеты
+int32. Каждые index_every блоков в файл индекса (path + '.idx') добавляется запись фиксированного размера с CRC:
+после сбоя питания действительна последняя целая запись индекса, а блоки после нее проверяются по CRC."""
+
+import os
+import struct
+from array import array
+from collections import namedtuple
+from sensor_pack_2.ticks import ticks_ms
+
+try:
+    from binascii import crc32
+except ImportError:
+    from sensor_pack_2.framing import crc32
+
+try:
+    import threading
+except ImportError:
+    threading = None    # MicroPython: запись блоков методом service
+
+BLOCK_MAGIC = 0x4C50434D     # 'MCPL'
+INDEX_MAGIC = 0x5844494D     # 'MIDX'
+# заголовок блока: magic, номер блока, ticks_ms первого отсчета, кол-во отсчетов, CRC-32 отсчетов
+_BLOCK_HDR = "<IIIII"
+_BLOCK_HDR_WORDS = 5
+# запись индекса: magic, кол-во записанных блоков, кол-во отсчетов, ticks_ms, CRC-32 первых 16 байт
+_INDEX_REC = "<IIIII"
+_INDEX_REC_SIZE = 20
+
+# запись индекса
+index_record = namedtuple("index_record", "blocks samples ticks")
+# блок журнала: номер, ticks_ms первого отсчета, отсчеты (array 'i')
+log_block = namedtuple("log_block", "seq t0 values")
+
+
+def _sync(f):
+    """Сброс буферов файла f на носитель: os.fsync (CPython) или os.sync (MicroPython), если они есть"""
+    if hasattr(os, "fsync"):
+        os.fsync(f.fileno())
+    elif hasattr(os, "sync"):
+        os.sync()
+
+
+class FlashLogger:
+    """Журнал 'сырых' отсчетов. add/extend (производитель) только заполняют блок в ОЗУ. Запись заполненного
+    блока в файл - метод service (вызывайте в главном цикле) или поток записи (CPython, threaded=True).
+    Если оба блока заполнены, а запись еще не выполнена, отсчеты отбрасываются (dropped)."""
+
+    def __init__(self, path: str, block_size: int = 4096, index_every: int = 16, threaded: bool = False):
+        """path - путь к файлу журнала. Если файл существует, запись продолжается после последнего целого блока.
+        block_size - размер блока в байтах, кратен 4. index_every - период записи индекса в блоках."""
+        if block_size % 4 or block_size < 64 or index_every < 1:
+            raise ValueError(f"Неверные параметры: block_size: {block_size}; index_every: {index_every}")
+        self.path = path
+        self.block_size = block_size
+        self.index_every = index_every
+        # отсчетов в блоке
+        self.capacity = block_size // 4 - _BLOCK_HDR_WORDS
+        words = block_size // 4
+        self._blocks = (array('i', (0 for _ in range(words))), array('i', (0 for _ in range(words))))
+        self._active = 0        # индекс заполняемого блока
+        self._count = 0         # отсчетов в заполняемом блоке
+        self._t0 = 0
+        # индекс блока, ожидающего записи, или -1
+        self._pending = -1
+        self._index_buf = bytearray(_INDEX_REC_SIZE)
+        try:
+            size = os.stat(path)[6]
+        except OSError:
+            size = 0
+        # номер следующего блока. Неполный (оборванный) блок в конце файла будет перезаписан
+        self._seq = size // block_size
+        self._file = open(path, "r+b" if size else "wb")
+        self._file.seek(self._seq * block_size)
+        self._index = open(path + ".idx", "ab")
+        # кол-во отсчетов в файле
+        self.samples = self._resume_samples() if self._seq else 0
+        self.dropped = 0
+        self.blocks_written = 0
+        self._thread = None
+        self._event = None
+        self._stop = False
+        if threaded and threading is not None:
+            self._event = threading.Event()
+            self._thread = threading.Thread(target=self._writer, name="flash-log", daemon=True)
+            self._thread.start()
+
+    def _resume_samples(self) -> int:
+        """Кол-во отсчетов в существующем файле: по последней записи индекса и заголовкам блоков после нее"""
+        idx = read_index(self.path)
+        first, total = (idx.blocks, idx.samples) if idx is not None and idx.blocks <= self._seq else (0, 0)
+        f, hdr = self._file, bytearray(4 * _BLOCK_HDR_WORDS)
+        for seq in range(first, self._seq):
+            f.seek(seq * self.block_size)
+            f.readinto(hdr)
+            magic, _, _, count, _ = struct.unpack(_BLOCK_HDR, hdr)
+            if BLOCK_MAGIC == magic:
+                total += count
+        f.seek(self._seq * self.block_size)
+        return total
+
+    # производитель
+    def add(self, raw: int) -> bool:
+        """Добавляет отсчет. Возвращает Ложь, если отсчет отброшен (оба блока заполнены)"""
+        n = self._count
+        if n == self.capacity:
+            if not self._swap():
+                self.dropped += 1
+                return False
+            n = 0
+        blk = self._blocks[self._active]
+        if 0 == n:
+            self._t0 = ticks_ms()
+        blk[_BLOCK_HDR_WORDS + n] = raw
+        self._count = n + 1
+        return True
+
+    def extend(self, values, count: [int, None] = None) -> int:
+        """Добавляет count (по умолчанию все) первых отсчетов values, например заполненных
+        BackgroundAcquisition.read. Возвращает кол-во добавленных отсчетов"""
+        if count is None:
+            count = len(values)
+        for i in range(count):
+            if not self.add(values[i]):
+                self.dropped += count - i - 1
+                return i
+        return count
+
+    def _swap(self) -> bool:
+        """Заполненный блок передается на запись, заполнение продолжается в другом блоке"""
+        if self._pending >= 0:
+            return False    # предыдущий блок еще не записан
+        blk = self._blocks[self._active]
+        count = self._count
+        crc = crc32(memoryview(blk)[_BLOCK_HDR_WORDS:_BLOCK_HDR_WORDS + count])
+        struct.pack_into(_BLOCK_HDR, blk, 0, BLOCK_MAGIC, self._seq, self._t0 & 0xFFFFFFFF, count, crc)
+        self._seq += 1
+        self._pending = self._active
+        self._active ^= 1
+        self._count = 0
+        if self._event is not None:
+            self._event.set()
+        return True
+
+    # запись
+    def service(self) -> bool:
+        """Записывает ожидающий блок, если он есть. Возвращает Истина, если блок записан"""
+        idx = self._pending
+        if idx < 0:
+            return False
+        blk = self._blocks[idx]
+        self._file.write(blk)
+        self._file.flush()
+        self.blocks_written += 1
+        self.samples += blk[3]
+        self._pending = -1
+        if 0 == self.blocks_written % self.index_every:
+            self._write_index()
+        return True
+
+    def _write_index(self):
+        buf = self._index_buf
+        struct.pack_into(_INDEX_REC, buf, 0, INDEX_MAGIC, self._seq_written(), self.samples,
+                         ticks_ms() & 0xFFFFFFFF, 0)
+        struct.pack_into("<I", buf, 16, crc32(memoryview(buf)[:16]))
+        _sync(self._file)   # сначала данные, затем ссылающаяся на них запись индекса
+        self._index.write(buf)
+        self._index.flush()
+        _sync(self._index)
+
+    def _seq_written(self) -> int:
+        """Кол-во блоков в файле"""
+        return self._seq - (1 if self._pending >= 0 else 0)
+
+    def _writer(self):
+        """Тело потока записи (CPython)"""
+        while not self._stop:
+            self._event.wait()
+            self._event.clear()
+            self.service()
+
+    def close(self):
+        """Записывает заполняемый блок (даже неполный), индекс и закрывает файлы"""
+        if self._thread is not None:
+            self._stop = True
+            self._event.set()
+            self._thread.join()
+            self._thread = None
+        self.service()
+        if self._count:
+            self._swap()
+            self.service()
+        self._write_index()
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_index(path: str) -> [index_record, None]:
+    """Последняя действительная запись индекса журнала path или None"""
+    last = None
+    try:
+        f = open(path + ".idx", "rb")
+    except OSError:
+        return None
+    with f:
+        while True:
+            rec = f.read(_INDEX_REC_SIZE)
+            if len(rec) < _INDEX_REC_SIZE:
+                break   # оборванная запись в конце файла
+            magic, blocks, samples, ticks, crc = struct.unpack(_INDEX_REC, rec)
+            if INDEX_MAGIC == magic and crc32(rec[:16]) == crc:
+                last = index_record(blocks, samples, ticks)
+    return last
+
+
+def read_log(path: str, block_size: int = 4096):
+    """Генератор блоков журнала (log_block). Блоки с неверным заголовком или CRC (оборванная запись) пропускаются"""
+    buf = array('i', (0 for _ in range(block_size // 4)))
+    with open(path, "rb") as f:
+        while True:
+            n = f.readinto(buf)
+            if n is None or n < block_size:
+                return
+            magic, seq, t0, count, crc = struct.unpack_from(_BLOCK_HDR, buf, 0)
+            if BLOCK_MAGIC != magic or count > block_size // 4 - _BLOCK_HDR_WORDS:
+                continue
+            values = buf[_BLOCK_HDR_WORDS:_BLOCK_HDR_WORDS + count]
+            if crc32(values) != crc:
+                continue
+            yield log_block(seq, t0, values)
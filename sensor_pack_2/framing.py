@@ -0,0 +1,120 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Передача пакетов 'сырых' отсчетов на хост по потоку байт (UART, USB-CDC) двоичными кадрами,
+вместо печати значений строками. Декодер для хоста (asyncio, NumPy) смотри в host_tools/serial_stream.py.
+Формат кадра (порядок байт little-endian):
+    sync        2 байта, 0xA5 0x5A
+    length      u16, длина полезной нагрузки
+    type        u8, FRAME_CONFIG или FRAME_SAMPLES
+    seq         u16, порядковый номер кадра (по модулю 65536), для обнаружения потерь
+    payload     length байт
+    crc         u32, CRC-32 полей length, type, seq и payload
+Полезная нагрузка FRAME_CONFIG: address u8, channel u8, data_rate_raw u8, gain_raw u8, resolution u8,
+lsb f32 (Вольт), offset f32 (Вольт), sample_rate f32 (Гц). Напряжение с калибровкой: raw * lsb + offset.
+Полезная нагрузка FRAME_SAMPLES: channel u8, encoding u8, t0 u32 (ticks_us первого отсчета), count u16, затем
+отсчеты: ENC_RAW - count значений i32, ENC_DELTA - блоки sensor_pack_2.deltacodec."""
+
+import struct
+from sensor_pack_2.deltacodec import DeltaEncoder
+
+try:
+    from binascii import crc32
+except ImportError:
+    crc32 = None
+
+SYNC = b'\xA5\x5A'
+# типы кадров
+FRAME_CONFIG = 1
+FRAME_SAMPLES = 2
+# кодирование отсчетов
+ENC_RAW = 0
+ENC_DELTA = 1
+
+# форматы заголовка кадра (после sync), полезной нагрузки FRAME_CONFIG и заголовка FRAME_SAMPLES
+HEADER_FMT = "<HBH"
+CONFIG_FMT = "<BBBBBfff"
+SAMPLES_FMT = "<BBIH"
+HEADER_SIZE = 2 + struct.calcsize(HEADER_FMT)
+CRC_SIZE = 4
+# наибольшая длина полезной нагрузки кадра, байт. Декодер хоста считает заголовок с большей длиной поврежденным,
+# чтобы не ждать десятки килобайт до проверки CRC
+MAX_PAYLOAD = 16384
+
+if crc32 is None:
+    # порт MicroPython без binascii.crc32: табличная реализация
+    _crc_table = None
+
+    def crc32(data, crc: int = 0) -> int:
+        global _crc_table
+        if _crc_table is None:
+            from array import array
+            _crc_table = array('L', (0 for _ in range(256)))
+            for n in range(256):
+                c = n
+                for _ in range(8):
+                    c = (0xEDB88320 ^ (c >> 1)) if c & 1 else c >> 1
+                _crc_table[n] = c
+        tbl = _crc_table
+        crc ^= 0xFFFFFFFF
+        for b in data:
+            crc = tbl[(crc ^ b) & 0xFF] ^ (crc >> 8)
+        return crc ^ 0xFFFFFFFF
+
+
+class FrameWriter:
+    """Запись кадров в поток stream (метод write: machine.UART, sys.stdout.buffer...).
+    Буфер кадра создается один раз, на max_samples отсчетов."""
+
+    def __init__(self, stream, max_samples: int = 256, encoding: int = ENC_RAW, keyframe_interval: int = 64):
+        if encoding not in (ENC_RAW, ENC_DELTA) or max_samples < 1 or max_samples > 0xFFFF:
+            raise ValueError(f"Неверные параметры: encoding: {encoding}; max_samples: {max_samples}")
+        self._stream = stream
+        self.max_samples = max_samples
+        self.encoding = encoding
+        self._encoder = DeltaEncoder(keyframe_interval) if ENC_DELTA == encoding else None
+        data_size = self._encoder.max_encoded_size(max_samples) if self._encoder else 4 * max_samples
+        payload = struct.calcsize(SAMPLES_FMT) + data_size
+        if payload > MAX_PAYLOAD:
+            raise ValueError(f"Кадр из {max_samples} отсчетов длиннее {MAX_PAYLOAD} байт: {payload}")
+        self._buf = bytearray(HEADER_SIZE + payload + CRC_SIZE)
+        self._buf[0:2] = SYNC
+        self._mv = memoryview(self._buf)
+        self._seq = 0
+        # кол-во отправленных кадров
+        self.frames = 0
+
+    def _finish(self, frame_type: int, end: int):
+        """Дописывает заголовок и CRC кадра, полезная нагрузка которого занимает буфер до end, и отправляет его"""
+        buf, mv = self._buf, self._mv
+        struct.pack_into(HEADER_FMT, buf, 2, end - HEADER_SIZE, frame_type, self._seq)
+        struct.pack_into("<I", buf, end, crc32(mv[2:end]))
+        self._stream.write(mv[:end + CRC_SIZE])
+        self._seq = (self._seq + 1) & 0xFFFF
+        self.frames += 1
+
+    def send_config(self, adc):
+        """Отправляет кадр настроек АЦП (Mcp342X). Отправляйте после каждого изменения настроек"""
+        b = adc.raw_value_to_real(0)
+        struct.pack_into(CONFIG_FMT, self._buf, HEADER_SIZE, adc.address, adc.channel.number,
+                         adc.current_sample_rate, adc.current_raw_gain, adc.current_resolution,
+                         adc.raw_value_to_real(1) - b, b, adc.sample_rate)
+        self._finish(FRAME_CONFIG, HEADER_SIZE + struct.calcsize(CONFIG_FMT))
+
+    def send_samples(self, values, count: [int, None] = None, channel: int = 0, t0: int = 0):
+        """Отправляет кадр из count (по умолчанию все, не больше max_samples) первых отсчетов values (array 'l',
+        например заполненный BackgroundAcquisition.read). t0 - отметка времени ticks_us первого отсчета"""
+        if count is None:
+            count = len(values)
+        if count > self.max_samples:
+            raise ValueError(f"Отсчетов больше, чем помещается в кадр: {count}")
+        buf = self._buf
+        start = HEADER_SIZE + struct.calcsize(SAMPLES_FMT)
+        struct.pack_into(SAMPLES_FMT, buf, HEADER_SIZE, channel, self.encoding, t0 & 0xFFFFFFFF, count)
+        if self._encoder is not None:
+            end = self._encoder.encode(values, buf, start, count)
+        else:
+            for i in range(count):
+                struct.pack_into("<i", buf, start + 4 * i, values[i])
+            end = start + 4 * count
+        self._finish(FRAME_SAMPLES, end)
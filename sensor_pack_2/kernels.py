@@ -0,0 +1,64 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Вычислительные ядра 'горячего' кода: расширение знака отсчетов, маска/сдвиг битовых полей,
+преобразование 'сырого' отсчета в Вольты.
+В MicroPython используются viper/native реализации из _kernels_viper.py, в CPython (или если порт MicroPython
+не поддерживает генерацию машинного кода) - реализации на чистом Python, с тем же результатом.
+Выбор выполняется автоматически при импорте модуля."""
+
+try:
+    import micropython
+    from sensor_pack_2._kernels_viper import sign_extend, be_to_int, get_bits, set_bits, raw_to_real
+    # имя выбранной реализации
+    KERNEL_IMPL = 'viper'
+except (ImportError, SyntaxError, ValueError):
+    class _MicroPythonStub:
+        """Заглушка модуля micropython для CPython. Декораторы native и viper ничего не делают"""
+
+        @staticmethod
+        def native(func):
+            return func
+
+        @staticmethod
+        def viper(func):
+            return func
+
+        @staticmethod
+        def const(value):
+            return value
+
+    try:
+        import micropython
+    except ImportError:
+        micropython = _MicroPythonStub()
+
+    KERNEL_IMPL = 'python'
+
+    def sign_extend(value: int, bits: int) -> int:
+        """Расширение знака младших bits бит value"""
+        sign = 1 << (bits - 1)
+        value &= (sign << 1) - 1
+        return (value ^ sign) - sign
+
+    def be_to_int(buf, n: int, bits: int) -> int:
+        """Целое со знаком из n первых байт buf (старшим байтом вперед), разрядностью bits бит.
+        Например, 18-битный отсчет MCP342X: be_to_int(buf, 3, 18)"""
+        # while вместо for/range: в CPython range и его итератор - объекты в куче
+        val = i = 0
+        while i < n:
+            val = (val << 8) | buf[i]
+            i += 1
+        return sign_extend(val, bits)
+
+    def get_bits(source: int, mask: int, shift: int) -> int:
+        """Значение битового поля (маска mask, сдвиг shift) из source"""
+        return (source & mask) >> shift
+
+    def set_bits(source: int, value: int, mask: int, shift: int) -> int:
+        """Записывает value в битовое поле (маска mask, сдвиг shift) source. Возвращает новое значение"""
+        return (source & ~mask) | ((value << shift) & mask)
+
+    def raw_to_real(raw: int, k: float, b: float) -> float:
+        """'Сырой' отсчет в физическую величину: k * raw + b"""
+        return raw * k + b
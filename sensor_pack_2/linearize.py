@@ -0,0 +1,234 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Линеаризация датчиков температуры (термопары J, K, T и термосопротивления Pt) по таблице.
+Полиномы NIST ITS-90 (термопары) и уравнение Каллендара - Ван Дюзена (RTD) вычисляются только при построении
+таблицы. Таблица строится один раз для каждой конфигурации АЦП (канал, усиление, частота преобразования) и
+хранит температуру в узлах, расположенных через 2 ** shift 'сырых' отсчетов. Температура отсчета вычисляется
+кусочно-линейной интерполяцией в целых числах (фиксированная точка), без вычислений с плавающей точкой.
+Компенсация холодного спая термопары - смещение 'сырого' отсчета на код ЭДС при температуре холодного спая."""
+
+import math
+from array import array
+from sensor_pack_2.adcmod import RAW_GAP
+from sensor_pack_2.kernels import micropython    # в CPython заглушка
+
+# коэффициенты полиномов NIST ITS-90, ЭДС (мВ) от температуры (°C). Для каждого типа термопары:
+# кортеж участков (нижняя граница, верхняя граница, коэффициенты c0..cn, экспоненциальный член a0, a1, a2 или None)
+_TC_COEFFS = {
+    'J': (
+        (-210.0, 760.0, (0.0, 0.503811878150E-01, 0.304758369300E-04, -0.856810657200E-07, 0.132281952950E-09,
+                         -0.170529583370E-12, 0.209480906970E-15, -0.125383953360E-18, 0.156317256970E-22), None),
+        (760.0, 1200.0, (0.296456256810E+03, -0.149761277860E+01, 0.317871039240E-02, -0.318476867010E-05,
+                         0.157208190040E-08, -0.306913690560E-12), None),
+    ),
+    'K': (
+        (-270.0, 0.0, (0.0, 0.394501280250E-01, 0.236223735980E-04, -0.328589067840E-06, -0.499048287770E-08,
+                       -0.675090591730E-10, -0.574103274280E-12, -0.310888728940E-14, -0.104516093650E-16,
+                       -0.198892668780E-19, -0.163226974860E-22), None),
+        (0.0, 1372.0, (-0.176004136860E-01, 0.389212049750E-01, 0.185587700320E-04, -0.994575928740E-07,
+                       0.318409457190E-09, -0.560728448890E-12, 0.560750590590E-15, -0.320207200030E-18,
+                       0.971511471520E-22, -0.121047212750E-25), (0.118597600000E+00, -0.118343200000E-03, 0.126968600000E+03)),
+    ),
+    'T': (
+        (-270.0, 0.0, (0.0, 0.387481063640E-01, 0.441944343470E-04, 0.118443231050E-06, 0.200329735540E-07,
+                       0.901380195590E-09, 0.226511565930E-10, 0.360711542050E-12, 0.384939398830E-14,
+                       0.282135219250E-16, 0.142515947790E-18, 0.487686622860E-21, 0.107955392700E-23,
+                       0.139450270620E-26, 0.797951539270E-30), None),
+        (0.0, 400.0, (0.0, 0.387481063640E-01, 0.332922278800E-04, 0.206182434040E-06, -0.218822568460E-08,
+                      0.109968809280E-10, -0.308157587720E-13, 0.454791352900E-16, -0.275129016730E-19), None),
+    ),
+}
+
+# коэффициенты уравнения Каллендара - Ван Дюзена для платины (IEC 60751)
+_CVD_A = 3.9083E-3
+_CVD_B = -5.775E-7
+_CVD_C = -4.183E-12
+
+
+def _inverse(func, y: float, lo: float, hi: float, iterations: int = 32) -> float:
+    """Решение уравнения func(x) = y на [lo, hi] методом деления отрезка пополам (func возрастающая).
+    За пределами [func(lo), func(hi)] возвращает границу отрезка"""
+    for _ in range(iterations):
+        mid = 0.5 * (lo + hi)
+        if func(mid) < y:
+            lo = mid
+        else:
+            hi = mid
+    return 0.5 * (lo + hi)
+
+
+class Thermocouple:
+    """Характеристика термопары типа J, K или T"""
+    # нужна компенсация холодного спая
+    cold_junction = True
+
+    def __init__(self, tc_type: str = 'K'):
+        ranges = _TC_COEFFS.get(tc_type)
+        if ranges is None:
+            raise ValueError(f"Неверный тип термопары: {tc_type}")
+        self.tc_type = tc_type
+        self._ranges = ranges
+        self.t_min = ranges[0][0]
+        self.t_max = ranges[-1][1]
+
+    def emf(self, t: float) -> float:
+        """ЭДС термопары в мВ при температуре рабочего спая t, °C (холодный спай при 0 °C)"""
+        for lo, hi, c, a in self._ranges:
+            if t <= hi:
+                break
+        e = 0.0
+        for coeff in reversed(c):
+            e = e * t + coeff
+        if a is not None:
+            e += a[0] * math.exp(a[1] * (t - a[2]) ** 2)
+        return e
+
+    def volts(self, t: float) -> float:
+        """Напряжение на входе АЦП в Вольтах при температуре t, °C"""
+        return 0.001 * self.emf(t)
+
+    def temperature(self, v: float) -> float:
+        """Температура, °C, по напряжению v, Вольт. Медленно, только для построения таблиц!"""
+        return _inverse(self.volts, v, self.t_min, self.t_max)
+
+
+class Rtd:
+    """Характеристика платинового термосопротивления (Pt100, Pt1000...), питаемого током current"""
+    cold_junction = False
+
+    def __init__(self, r0: float = 100.0, current: float = 0.001):
+        """r0 - сопротивление при 0 °C, Ом. current - ток через термосопротивление, А"""
+        if r0 <= 0 or current <= 0:
+            raise ValueError(f"Неверные параметры термосопротивления: r0: {r0}; current: {current}")
+        self.r0 = r0
+        self.current = current
+        self.t_min = -200.0
+        self.t_max = 850.0
+
+    def resistance(self, t: float) -> float:
+        """Сопротивление в Омах при температуре t, °C"""
+        r = 1.0 + _CVD_A * t + _CVD_B * t * t
+        if t < 0:
+            r += _CVD_C * (t - 100.0) * t * t * t
+        return self.r0 * r
+
+    def volts(self, t: float) -> float:
+        return self.current * self.resistance(t)
+
+    def temperature(self, v: float) -> float:
+        """Температура, °C, по напряжению v, Вольт. Медленно, только для построения таблиц!"""
+        return _inverse(self.volts, v, self.t_min, self.t_max)
+
+
+class LookupTable:
+    """Таблица кусочно-линейного преобразования 'сырого' отсчета в температуру.
+    Узлы таблицы: коды code_min + (i << shift), значения - температура * scale (целые)"""
+
+    def __init__(self, code_min: int, shift: int, values: array, scale: int, k: float):
+        self.code_min = code_min
+        self.shift = shift
+        self.values = values
+        self.scale = scale
+        # цена 'сырого' отсчета, Вольт
+        self.k = k
+        self._mask = (1 << shift) - 1
+        self._last = len(values) - 1
+        self._span = self._last << shift
+
+    @micropython.native
+    def eval_fixed(self, code: int) -> [int, None]:
+        """Температура * scale для 'сырого' отсчета code. None, если code вне таблицы"""
+        d = code - self.code_min
+        if d < 0 or d > self._span:
+            return None
+        shift = self.shift
+        i = d >> shift
+        vals = self.values
+        y0 = vals[i]
+        if i == self._last:
+            return y0
+        return y0 + (((vals[i + 1] - y0) * (d & self._mask)) >> shift)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+def build_table(sensor, adc, max_points: int = 512, scale: int = 1000) -> LookupTable:
+    """Строит таблицу для датчика sensor (Thermocouple, Rtd) и текущих настроек АЦП adc.
+    Преобразование отсчета в Вольты берется у АЦП (raw_value_to_real), с учетом калибровки.
+    max_points - наибольшее кол-во узлов таблицы. scale - множитель температуры (1000 - тысячные доли градуса)."""
+    b = adc.raw_value_to_real(0)
+    k = adc.raw_value_to_real(1) - b
+    # диапазон кодов датчика
+    c_lo = int(math.floor((sensor.volts(sensor.t_min) - b) / k))
+    c_hi = int(math.ceil((sensor.volts(sensor.t_max) - b) / k))
+    # ограничение диапазоном АЦП
+    res = adc.current_resolution
+    if adc.init_props.differential_mode:
+        a_lo, a_hi = -(1 << (res - 1)), (1 << (res - 1)) - 1
+    else:
+        a_lo, a_hi = 0, (1 << res) - 1
+    c_lo, c_hi = max(c_lo, a_lo), min(c_hi, a_hi)
+    if c_lo >= c_hi:
+        raise ValueError("Диапазон датчика вне диапазона АЦП!")
+    shift = 0
+    while ((c_hi - c_lo) >> shift) + 2 > max_points:
+        shift += 1
+    n = ((c_hi - c_lo + (1 << shift) - 1) >> shift) + 1
+    values = array('l', (round(scale * sensor.temperature(k * (c_lo + (i << shift)) + b)) for i in range(n)))
+    return LookupTable(c_lo, shift, values, scale, k)
+
+
+class Linearizer:
+    """Преобразование 'сырых' отсчетов АЦП в температуру по таблицам. Таблицы строятся при первом обращении
+    к конфигурации (канал, усиление, частота преобразования) и хранятся. После изменения настроек АЦП вызовите
+    select()! Для термопары задайте температуру холодного спая: set_cold_junction(t)."""
+
+    def __init__(self, adc, sensor, max_points: int = 512, scale: int = 1000):
+        self._adc = adc
+        self.sensor = sensor
+        self.max_points = max_points
+        self.scale = scale
+        self._tables = {}
+        self._table = None
+        # температура холодного спая, °C и соответствующий ей код
+        self._t_cj = 0.0
+        self._cj_code = 0
+
+    def select(self) -> LookupTable:
+        """Выбирает (строит при необходимости) таблицу для текущих настроек АЦП. Возвращает ее"""
+        adc = self._adc
+        key = adc.channel.number, adc.current_raw_gain, adc.current_sample_rate
+        tbl = self._tables.get(key)
+        if tbl is None:
+            tbl = build_table(self.sensor, adc, self.max_points, self.scale)
+            self._tables[key] = tbl
+        self._table = tbl
+        self.set_cold_junction(self._t_cj)
+        return tbl
+
+    def set_cold_junction(self, t: float):
+        """Температура холодного спая термопары, °C. Для датчиков без холодного спая не действует"""
+        self._t_cj = t
+        if self.sensor.cold_junction and self._table is not None:
+            self._cj_code = round(self.sensor.volts(t) / self._table.k)
+
+    @property
+    def table(self) -> LookupTable:
+        if self._table is None:
+            self.select()
+        return self._table
+
+    def eval_fixed(self, raw: int) -> [int, None]:
+        """Температура * scale (целое) для 'сырого' отсчета raw. None для пропуска (RAW_GAP) и вне таблицы"""
+        if raw is None or RAW_GAP == raw:
+            return None
+        return self.table.eval_fixed(raw + self._cj_code)
+
+    def eval(self, raw: int) -> [float, None]:
+        """Температура, °C, для 'сырого' отсчета raw или None"""
+        val = self.eval_fixed(raw)
+        if val is None:
+            return None
+        return val / self.scale
@@ -0,0 +1,167 @@
+# CPython, Linux
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Шина I2C Linux хоста (/dev/i2c-N) через ioctl I2C_RDWR.
+Несколько сообщений (например, запись конфигурации и чтение данных, или чтение из нескольких MCP342X)
+передаются ядру одним системным вызовом."""
+
+import os
+import ctypes
+from collections import namedtuple
+from sensor_pack_2.bus_service import I2cAdapter
+
+try:
+    from fcntl import ioctl as _sys_ioctl
+except ImportError:
+    _sys_ioctl = None
+
+# из linux/i2c-dev.h и linux/i2c.h
+I2C_RDWR = 0x0707
+I2C_M_RD = 0x0001
+# предельное кол-во сообщений в одном вызове I2C_RDWR (I2C_RDWR_IOCTL_MAX_MSGS)
+I2C_RDWR_MAX_MSGS = 42
+
+# сообщение, часть комбинированной транзакции шины I2C
+# address - адрес устройства на шине
+# read - если Истина, то чтение в buf, иначе запись из buf
+# buf - буфер. Для чтения только изменяемый (bytearray, memoryview), для записи любой bytes-like
+i2c_msg = namedtuple("i2c_msg", "address read buf")
+
+
+class _I2cMsg(ctypes.Structure):
+    """struct i2c_msg"""
+    _fields_ = [("addr", ctypes.c_uint16), ("flags", ctypes.c_uint16),
+                ("len", ctypes.c_uint16), ("buf", ctypes.c_void_p)]
+
+
+class _I2cRdwrData(ctypes.Structure):
+    """struct i2c_rdwr_ioctl_data"""
+    _fields_ = [("msgs", ctypes.POINTER(_I2cMsg)), ("nmsgs", ctypes.c_uint32)]
+
+
+def _mem_addr_to_bytes(mem_addr: int, addrsize: int) -> bytes:
+    """Адрес в памяти устройства в виде байт, старшим байтом вперед. addrsize - размер адреса в битах"""
+    return mem_addr.to_bytes(addrsize // 8, 'big')
+
+
+class LinuxI2C:
+    """Шина I2C Linux с интерфейсом, как у machine.I2C MicroPython (readfrom_into, writeto, readfrom_mem...).
+    Все операции выполняются через ioctl I2C_RDWR. Метод transfer выполняет несколько сообщений
+    одним вызовом ioctl, с повторным стартом (repeated start) между ними."""
+
+    def __init__(self, bus_id: int, path: [str, None] = None, ioctl=None):
+        """bus_id - номер шины, N в /dev/i2c-N.
+        path - путь к файлу устройства. Если None, то /dev/i2c-{bus_id}.
+        ioctl - функция вида ioctl(fd, request, arg). Если None, то fcntl.ioctl.
+        Параметры path и ioctl позволяют проверять код без настоящей шины."""
+        self.bus_id = bus_id
+        self._path = path if path else f"/dev/i2c-{bus_id}"
+        self._ioctl = ioctl if ioctl else _sys_ioctl
+        if self._ioctl is None:
+            raise OSError("ioctl недоступен на этой платформе!")
+        self._fd = os.open(self._path, os.O_RDWR)
+        # кол-во вызовов ioctl, для оценки накладных расходов
+        self.syscalls = 0
+
+    def close(self):
+        """Закрывает файл устройства шины"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _rdwr(self, messages) -> int:
+        """Передает ядру не более I2C_RDWR_MAX_MSGS сообщений одним вызовом ioctl"""
+        cnt = len(messages)
+        c_msgs = (_I2cMsg * cnt)()
+        # ссылки на ctypes буферы должны жить до завершения ioctl!
+        keep = []
+        for i, msg in enumerate(messages):
+            buf = msg.buf
+            n = len(buf)
+            if msg.read:
+                # чтение прямо в буфер вызывающего, без копирования
+                c_buf = (ctypes.c_char * n).from_buffer(buf)
+            else:
+                c_buf = (ctypes.c_char * n).from_buffer_copy(buf)
+            keep.append(c_buf)
+            cm = c_msgs[i]
+            cm.addr = msg.address
+            cm.flags = I2C_M_RD if msg.read else 0
+            cm.len = n
+            cm.buf = ctypes.addressof(c_buf)
+        data = _I2cRdwrData(msgs=c_msgs, nmsgs=cnt)
+        self.syscalls += 1
+        return self._ioctl(self._fd, I2C_RDWR, data)
+
+    def transfer(self, messages) -> int:
+        """Выполняет сообщения messages (последовательность i2c_msg) как комбинированную транзакцию.
+        Если сообщений больше I2C_RDWR_MAX_MSGS, то они разбиваются на несколько вызовов ioctl.
+        Возвращает кол-во вызовов ioctl."""
+        if self._fd is None:
+            raise OSError("Шина закрыта!")
+        messages = tuple(messages)
+        calls = 0
+        for start in range(0, len(messages), I2C_RDWR_MAX_MSGS):
+            self._rdwr(messages[start:start + I2C_RDWR_MAX_MSGS])
+            calls += 1
+        return calls
+
+    # интерфейс machine.I2C
+    def readfrom(self, addr: int, nbytes: int) -> bytes:
+        buf = bytearray(nbytes)
+        self.transfer((i2c_msg(addr, True, buf),))
+        return bytes(buf)
+
+    def readfrom_into(self, addr: int, buf):
+        self.transfer((i2c_msg(addr, True, buf),))
+
+    def writeto(self, addr: int, buf) -> int:
+        self.transfer((i2c_msg(addr, False, buf),))
+        return len(buf)
+
+    def readfrom_mem(self, addr: int, memaddr: int, nbytes: int, addrsize: int = 8) -> bytes:
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, memaddr, buf, addrsize)
+        return bytes(buf)
+
+    def readfrom_mem_into(self, addr: int, memaddr: int, buf, addrsize: int = 8):
+        # запись адреса и чтение с повторным стартом, одним вызовом ioctl
+        self.transfer((i2c_msg(addr, False, _mem_addr_to_bytes(memaddr, addrsize)),
+                       i2c_msg(addr, True, buf)))
+
+    def writeto_mem(self, addr: int, memaddr: int, buf, addrsize: int = 8):
+        # адрес и данные должны идти одним сообщением, без повторного старта
+        self.transfer((i2c_msg(addr, False, _mem_addr_to_bytes(memaddr, addrsize) + bytes(buf)),))
+
+
+class LinuxI2cAdapter(I2cAdapter):
+    """Адаптер шины I2C для Linux хоста. Расширяет I2cAdapter пакетными(!) операциями,
+    которые выполняются одним системным вызовом."""
+    def __init__(self, bus: [LinuxI2C, int]):
+        """bus - экземпляр LinuxI2C или номер шины N в /dev/i2c-N"""
+        super().__init__(bus if isinstance(bus, LinuxI2C) else LinuxI2C(bus))
+
+    def transfer(self, messages) -> int:
+        """Выполняет последовательность сообщений i2c_msg одним(по возможности) вызовом ioctl.
+        Возвращает кол-во вызовов ioctl."""
+        return self.bus.transfer(messages)
+
+    def write_and_read(self, device_addr: int, wr_buf: bytes, rd_buf: bytearray) -> bytearray:
+        """Записывает в устройство wr_buf, затем, после повторного старта, читает из него в rd_buf.
+        Например, запись конфигурации MCP342X и чтение результата преобразования. Возвращает rd_buf."""
+        self.bus.transfer((i2c_msg(device_addr, False, wr_buf), i2c_msg(device_addr, True, rd_buf)))
+        return rd_buf
+
+    def read_to_bufs(self, requests) -> int:
+        """Читает из нескольких устройств. requests - последовательность пар (адрес устройства, буфер).
+        Например, чтение результатов преобразования всех MCP342X на шине. Возвращает кол-во вызовов ioctl."""
+        return self.bus.transfer(i2c_msg(addr, True, buf) for addr, buf in requests)
+
+    def close(self):
+        self.bus.close()
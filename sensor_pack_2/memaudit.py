@@ -0,0 +1,126 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Аудит выделения памяти в куче 'горячим' кодом, например, циклом получения отсчетов АЦП.
+В MicroPython используется gc.mem_alloc (сборщик мусора на время измерения выключен),
+в CPython - tracemalloc (пик памяти за время вызовов, с временными объектами). Функции measure_import/audit_import оценивают объем ОЗУ, занимаемый модулем после импорта,
+и время импорта."""
+
+import gc
+import sys
+from sensor_pack_2.ticks import ticks_us, ticks_diff
+
+try:
+    import tracemalloc  # CPython
+    # int до 2**30 в MicroPython - 'малые' целые, не выделяемые в куче, а в CPython - объекты (кроме -5..256).
+    # Пик таких временных int одного вызова (отсчет АЦП, расширение знака, маски) не учитывается
+    _INT_SLACK = 7 * sys.getsizeof(1 << 29)
+except ImportError:
+    tracemalloc = None  # MicroPython
+
+
+def _measure_mpy(func, n: int) -> int:
+    gc.collect()
+    gc.disable()
+    try:
+        start = gc.mem_alloc()
+        for _ in range(n):
+            func()
+        return gc.mem_alloc() - start
+    finally:
+        gc.enable()
+
+
+def _nop():
+    pass
+
+
+def _peak(func, n: int) -> int:
+    """Пик прироста памяти за n вызовов func, байт"""
+    gc.collect()
+    start = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for _ in range(n):
+        func()
+    return tracemalloc.get_traced_memory()[1] - start
+
+
+def _measure_cpython(func, n: int) -> int:
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        # без памяти самого цикла измерения (итератор range, int счетчика и т. д.)
+        used = _peak(func, n) - _peak(_nop, n)
+        return 0 if used <= _INT_SLACK else used
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+
+def measure_alloc(func, n: int = 100, warmup: int = 1) -> int:
+    """Вызывает func() n раз и возвращает кол-во байт, выделенных в куче за эти n вызовов.
+    warmup - кол-во вызовов func перед измерением (ленивая инициализация, кэши и т. д.).
+    В MicroPython возвращается суммарный объем памяти, выделенной за n вызовов.
+    В CPython возвращается пик прироста объема памяти за n вызовов: накопленные объекты и временные объекты
+    одного вызова (кортежи, строки, списки). Пик до _INT_SLACK байт считается нулем: это int, которые в MicroPython
+    не выделяются в куче. Объекты из списков свободных блоков CPython (float, небольшие кортежи) tracemalloc
+    не видит, поэтому такие выделения обнаруживаются только на плате."""
+    for _ in range(warmup):
+        func()
+    if tracemalloc is None:
+        return _measure_mpy(func, n)
+    return _measure_cpython(func, n)
+
+
+def audit_alloc(func, n: int = 100, budget: int = 0, warmup: int = 1) -> int:
+    """Аналог measure_alloc, но если за n вызовов func выделено больше budget байт, то выбрасывает исключение.
+    Возвращает кол-во выделенных байт. Например, для MCP342X в режиме непрерывного преобразования
+    (в MicroPython и CPython):
+        adc.raw_mode = True
+        audit_alloc(adc.__next__, n=240, budget=0)"""
+    used = measure_alloc(func, n, warmup)
+    if used > budget:
+        raise RuntimeError(f"Превышен бюджет выделения памяти: {used} байт на {n} вызовов, допустимо: {budget}!")
+    return used
+
+
+def _allocated() -> int:
+    """Объем занятой памяти кучи после сборки мусора, байт"""
+    gc.collect()
+    if tracemalloc is None:
+        return gc.mem_alloc()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def measure_import(name: str) -> tuple:
+    """Импортирует модуль name вместе с еще не загруженными модулями, от которых он зависит. Возвращает кортеж
+    (байт, мкс): прирост объема памяти кучи, оставшейся занятой после сборки мусора (модули, классы, константы),
+    и время импорта. Модуль не должен быть импортирован ранее: измеряйте в начале программы или в отдельном процессе.
+    Время импорта в MicroPython включает компиляцию .py; для .mpy и замороженных (frozen) модулей оно меньше."""
+    if name in sys.modules:
+        raise ValueError(f"Модуль {name} уже импортирован!")
+    tracing = tracemalloc is not None and tracemalloc.is_tracing()
+    if tracemalloc is not None and not tracing:
+        tracemalloc.start()
+    try:
+        start = _allocated()
+        t0 = ticks_us()
+        __import__(name)
+        elapsed = ticks_diff(ticks_us(), t0)
+        return _allocated() - start, elapsed
+    finally:
+        if tracemalloc is not None and not tracing:
+            tracemalloc.stop()
+
+
+def audit_import(name: str, budget: int, time_budget_us: [int, None] = None) -> tuple:
+    """Аналог measure_import, но если модуль name занимает больше budget байт или импортируется дольше
+    time_budget_us мкс (None - без проверки времени), то выбрасывает исключение. Например, в начале main.py платы:
+        audit_import("mcp3421mod", budget=12_000, time_budget_us=200_000)"""
+    used, elapsed = measure_import(name)
+    if used > budget:
+        raise RuntimeError(f"Превышен бюджет ОЗУ модуля {name}: {used} байт, допустимо: {budget}!")
+    if time_budget_us is not None and elapsed > time_budget_us:
+        raise RuntimeError(f"Превышено время импорта модуля {name}: {elapsed} мкс, допустимо: {time_budget_us}!")
+    return used, elapsed
@@ -0,0 +1,137 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Метрики состояния получения отсчетов: кол-во отсчетов, повторных (устаревших) чтений, транзакций и ошибок шины,
+средняя и наибольшая длительность чтения отсчета, действительная частота отсчетов. Для каждого устройства и канала.
+Счетчики хранятся в одном массиве, созданном заранее, поэтому их обновление в 'горячем' коде (Mcp342X.get_raw_value)
+не выделяет память в куче. Выгрузка в текстовом формате Prometheus - to_prometheus,
+HTTP сервер (CPython) - metrics_http.py."""
+
+from array import array
+from collections import namedtuple
+from sensor_pack_2.ticks import ticks_ms, ticks_diff
+
+# индексы счетчиков слота (устройство, канал)
+_SAMPLES, _STALE, _TRANSACTIONS, _BUS_ERRORS, _LATENCY_SUM, _LATENCY_MAX = range(6)
+_FIELDS = 6
+
+# снимок метрик одного слота
+# device - имя устройства, channel - номер канала
+# samples - кол-во новых отсчетов; stale - кол-во чтений, вернувших уже прочитанный (устаревший) отсчет
+# transactions - кол-во транзакций шины (чтений отсчета); bus_errors - кол-во ошибок шины
+# latency_mean_us, latency_max_us - средняя и наибольшая длительность чтения отсчета, мкс
+# sps - действительная частота новых отсчетов, Гц: средняя с момента reset (создания реестра) или с момента
+# снимка, переданного в snapshot
+# ticks - время снимка, ticks_ms
+metrics_snapshot = namedtuple("metrics_snapshot", "device channel samples stale transactions bus_errors "
+                                                  "latency_mean_us latency_max_us sps ticks")
+
+
+class MetricsRegistry:
+    """Реестр метрик на max_slots слотов (устройство, канал)"""
+
+    def __init__(self, max_slots: int = 32):
+        if max_slots < 1:
+            raise ValueError(f"Неверное кол-во слотов: {max_slots}")
+        # 'q', чтобы сумма длительностей не переполнялась
+        self._data = array('q', (0 for _ in range(max_slots * _FIELDS)))
+        self._max_slots = max_slots
+        # (имя устройства, канал) для каждого занятого слота
+        self._labels = []
+        # время обнуления счетчиков, для частоты отсчетов. Чтение метрик (snapshot) состояние реестра не изменяет,
+        # поэтому снимки можно получать одновременно из нескольких потоков (HTTP сервер) и клиентов
+        self._reset_ms = ticks_ms()
+
+    def register(self, device: str, channels: int = 1) -> int:
+        """Занимает channels слотов подряд для устройства device. Возвращает номер первого слота"""
+        base = len(self._labels)
+        if base + channels > self._max_slots:
+            raise ValueError(f"Нет свободных слотов для устройства {device}!")
+        for ch in range(channels):
+            self._labels.append((device, ch))
+        return base
+
+    def __len__(self) -> int:
+        """Кол-во занятых слотов"""
+        return len(self._labels)
+
+    # 'горячий' код
+    def on_read(self, slot: int, latency_us: int, fresh: bool):
+        """Учет транзакции чтения отсчета длительностью latency_us. fresh - Истина, если отсчет новый"""
+        d = self._data
+        i = slot * _FIELDS
+        d[i + _TRANSACTIONS] += 1
+        if fresh:
+            d[i + _SAMPLES] += 1
+        else:
+            d[i + _STALE] += 1
+        d[i + _LATENCY_SUM] += latency_us
+        if latency_us > d[i + _LATENCY_MAX]:
+            d[i + _LATENCY_MAX] = latency_us
+
+    def on_bus_error(self, slot: int):
+        """Учет транзакции, завершившейся ошибкой шины"""
+        i = slot * _FIELDS
+        self._data[i + _TRANSACTIONS] += 1
+        self._data[i + _BUS_ERRORS] += 1
+
+    def reset(self):
+        """Обнуляет все счетчики"""
+        d = self._data
+        for i in range(len(d)):
+            d[i] = 0
+        self._reset_ms = ticks_ms()
+
+    def snapshot(self, previous: [list, None] = None) -> list:
+        """Возвращает список metrics_snapshot всех занятых слотов. Состояние реестра не изменяется.
+        Частота отсчетов вычисляется с момента reset (создания реестра) или, если previous не None, с момента
+        снимка previous (результат предыдущего вызова snapshot этого клиента)"""
+        now = ticks_ms()
+        d = self._data
+        result = []
+        for slot, (device, ch) in enumerate(self._labels):
+            i = slot * _FIELDS
+            samples, trans, errors = d[i + _SAMPLES], d[i + _TRANSACTIONS], d[i + _BUS_ERRORS]
+            good = trans - errors
+            mean = d[i + _LATENCY_SUM] / good if good else 0.0
+            if previous is not None and slot < len(previous):
+                prev = previous[slot]
+                dt, base = ticks_diff(now, prev.ticks), prev.samples
+            else:
+                dt, base = ticks_diff(now, self._reset_ms), 0
+            sps = 1000 * (samples - base) / dt if dt > 0 else 0.0
+            result.append(metrics_snapshot(device, ch, samples, d[i + _STALE], trans, errors, mean,
+                                           d[i + _LATENCY_MAX], sps, now))
+        return result
+
+
+# метрики Prometheus: (имя, тип, описание, поле metrics_snapshot)
+_PROM_METRICS = (
+    ("samples_total", "counter", "New samples acquired", "samples"),
+    ("stale_reads_total", "counter", "Reads that returned an already read (stale) sample", "stale"),
+    ("bus_transactions_total", "counter", "Bus read transactions", "transactions"),
+    ("bus_errors_total", "counter", "Bus errors", "bus_errors"),
+    ("read_latency_mean_us", "gauge", "Mean sample read duration, us", "latency_mean_us"),
+    ("read_latency_max_us", "gauge", "Max sample read duration, us", "latency_max_us"),
+    ("samples_per_second", "gauge", "Mean sample rate since reset; use rate(samples_total) for the current rate",
+     "sps"),
+)
+
+
+def _escape_label(value) -> str:
+    """Значение метки в формате Prometheus: обратная косая черта, кавычка и перевод строки экранируются"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(snapshots, prefix: str = "mcp342x") -> str:
+    """Возвращает снимки метрик (MetricsRegistry.snapshot) в текстовом формате Prometheus"""
+    lines = []
+    devices = [_escape_label(s.device) for s in snapshots]
+    for name, kind, help_str, field in _PROM_METRICS:
+        full = f"{prefix}_{name}"
+        lines.append(f"# HELP {full} {help_str}")
+        lines.append(f"# TYPE {full} {kind}")
+        for device, s in zip(devices, snapshots):
+            lines.append(f'{full}{{device="{device}",channel="{s.channel}"}} {getattr(s, field)}')
+    lines.append("")
+    return "\n".join(lines)
@@ -0,0 +1,39 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""HTTP сервер метрик (MetricsRegistry) для Prometheus на Linux шлюзе. Метрики отдаются по пути /metrics."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sensor_pack_2.metrics import MetricsRegistry, to_prometheus
+
+_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def make_handler(registry: MetricsRegistry, prefix: str = "mcp342x") -> type:
+    """Возвращает класс обработчика HTTP запросов, выдающего метрики registry"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = to_prometheus(registry.snapshot(), prefix).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", _CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass    # без записи каждого запроса в stderr
+
+    return MetricsHandler
+
+
+def serve_metrics(registry: MetricsRegistry, host: str = "", port: int = 9100,
+                  prefix: str = "mcp342x") -> ThreadingHTTPServer:
+    """Запускает HTTP сервер метрик в отдельном потоке. Возвращает сервер, остановка: server.shutdown()"""
+    server = ThreadingHTTPServer((host, port), make_handler(registry, prefix))
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
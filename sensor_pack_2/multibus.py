@@ -0,0 +1,210 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Опрос АЦП на нескольких шинах (Linux шлюз). На каждую шину (адаптер BusAdapter) свой поток, поэтому
+блокирующий обмен на одной шине не задерживает остальные. Отсчеты всех шин объединяются в одну очередь,
+упорядоченную по времени. Шина, обмен на которой завис (например, ioctl i2c ждет истечения таймаута растяжения
+тактов), задерживает очередь не больше, чем на max_lateness периодов опроса; ее отсчеты, прочитанные позже,
+выдаются с настоящей отметкой времени как опоздавшие."""
+
+import heapq
+import itertools
+import threading
+import time
+import queue
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from sensor_pack_2.adcmod import RAW_GAP, REAL_GAP
+
+# отсчет в выходной очереди
+# timestamp - время начала чтения отсчета, нс (time.monotonic_ns)
+# bus - индекс шины (в порядке первого появления адаптера в списке устройств)
+# address - адрес устройства на шине
+# channel - номер канала АЦП, заданный start_measurement (configured_channel), если устройство его сообщает
+# value - 'сырой' отсчет или значение в Вольтах (параметр raw конструктора MultiBusPoller).
+# При ошибке шины RAW_GAP или REAL_GAP (пропуск)
+poll_sample = namedtuple("poll_sample", "timestamp bus address channel value")
+
+_NEVER = float('inf')
+# пауза ожидания места в заполненной выходной очереди, с. После нее проверяется остановка опроса
+_PUT_TIMEOUT = 0.05
+
+
+def _configured_channel(dev) -> int:
+    """Номер канала для poll_sample: заданный start_measurement, а не прочитанный из ответа АЦП"""
+    ch = getattr(dev, "configured_channel", None)
+    return dev.channel.number if ch is None else ch
+
+
+class _BusWorker:
+    """Состояние потока одной шины"""
+    def __init__(self, index: int, devices: list, max_lateness: int):
+        self.index = index
+        self.devices = devices
+        # время следующего чтения каждого устройства, нс
+        self.due = [0] * len(devices)
+        # период чтения каждого устройства, нс
+        self.period = [int(1e9 / dev.sample_rate) for dev in devices]
+        # отсчеты с отметкой времени меньше watermark этот поток уже не выдаст
+        self.watermark = 0
+        # наибольшее отставание watermark от текущего времени, нс, после которого поток слияния его не ждет
+        self.lateness = max_lateness * min(self.period)
+        self.samples = 0
+        self.errors = 0
+        # кол-во опоздавших отсчетов: выданных в очередь после отсчетов других шин с большей отметкой времени
+        self.late = 0
+
+
+class MultiBusPoller:
+    """Опрос устройств (Mcp342X в режиме непрерывного преобразования) на нескольких шинах.
+    Устройства группируются по адаптеру (device.adapter). Поток слияния выдает отсчеты в очередь output
+    по возрастанию timestamp: отсчет выдается, когда все потоки шин продвинулись дальше его отметки времени, или
+    поток шины отстал больше, чем на max_lateness периодов опроса. Опоздавшие отсчеты такой шины выдаются с настоящей
+    отметкой времени, вне порядка, и учитываются в get_stats."""
+
+    def __init__(self, devices, raw: bool = True, maxsize: int = 0, clock=time.monotonic_ns, max_lateness: int = 4):
+        """devices - последовательность устройств (ADC + DeviceEx, например Mcp342X).
+        raw - если Истина, то в очередь попадают 'сырые' отсчеты, иначе значения в Вольтах.
+        maxsize - емкость выходной очереди (0 - без ограничения). Пока очередь полна, поток слияния ждет;
+        после остановки опроса (stop) не поместившиеся в очередь отсчеты отбрасываются (dropped).
+        clock - источник времени в нс, для проверки кода с имитацией шин.
+        max_lateness - наибольшая задержка очереди зависшей шиной, в периодах опроса самого быстрого устройства
+        на этой шине."""
+        if max_lateness < 1:
+            raise ValueError(f"Неверное значение max_lateness: {max_lateness}")
+        buses = {}
+        for dev in devices:
+            buses.setdefault(id(dev.adapter), []).append(dev)
+        if not buses:
+            raise ValueError("Нет устройств для опроса!")
+        self._workers = [_BusWorker(i, devs, max_lateness) for i, devs in enumerate(buses.values())]
+        self._raw = raw
+        self._clock = clock
+        self.output = queue.Queue(maxsize)
+        self._heap = []
+        # порядковый номер, для устойчивой сортировки отсчетов с одинаковой отметкой времени
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._pool = None
+        self._futures = []
+        self._merger = None
+        # отметка времени последнего выданного отсчета
+        self._emitted = 0
+        # кол-во отсчетов, отброшенных при остановке из-за заполненной выходной очереди
+        self.dropped = 0
+
+    @property
+    def bus_count(self) -> int:
+        return len(self._workers)
+
+    def get_stats(self) -> tuple:
+        """Возвращает кортеж троек (кол-во отсчетов, кол-во ошибок шины, кол-во опоздавших отсчетов) для каждой шины"""
+        return tuple((w.samples, w.errors, w.late) for w in self._workers)
+
+    def _set_watermark(self, worker: _BusWorker, value):
+        with self._cond:
+            worker.watermark = value
+            self._cond.notify()
+
+    def _poll_bus(self, worker: _BusWorker):
+        """Тело потока шины"""
+        clock, stop, raw = self._clock, self._stop, self._raw
+        devices, due, period = worker.devices, worker.due, worker.period
+        try:
+            while not stop.is_set():
+                now = clock()
+                self._set_watermark(worker, now)
+                for i, dev in enumerate(devices):
+                    if due[i] > now:
+                        continue
+                    due[i] = now + period[i]
+                    ts = clock()
+                    try:
+                        val = dev.get_value(raw)
+                        if val is None:
+                            continue
+                        worker.samples += 1
+                    except OSError:
+                        worker.errors += 1
+                        val = RAW_GAP if raw else REAL_GAP
+                    smp = poll_sample(ts, worker.index, dev.address, _configured_channel(dev), val)
+                    with self._cond:
+                        heapq.heappush(self._heap, (ts, next(self._seq), smp))
+                nxt = min(due)
+                # до nxt этот поток отсчетов не выдаст
+                self._set_watermark(worker, nxt)
+                delay = nxt - clock()
+                if delay > 0:
+                    stop.wait(delay / 1e9)
+        finally:
+            self._set_watermark(worker, _NEVER)
+
+    def _limit(self):
+        """Отметка времени, до которой отсчеты можно выдать. Отставание потока шины ограничено его lateness"""
+        now = self._clock()
+        return min(max(w.watermark, now - w.lateness) for w in self._workers)
+
+    def _merge(self):
+        """Тело потока слияния"""
+        heap, workers, cond = self._heap, self._workers, self._cond
+        # пауза ожидания при зависшей шине, с
+        timeout = min(w.lateness for w in workers) / 1e9
+        while True:
+            with cond:
+                limit = self._limit()
+                while not (heap and heap[0][0] < limit):
+                    if all(_NEVER == w.watermark for w in workers) and not heap:
+                        return     # все потоки шин завершены и отсчетов не осталось
+                    cond.wait(timeout if heap else None)
+                    limit = self._limit()
+                ready = []
+                while heap and heap[0][0] < limit:
+                    ready.append(heapq.heappop(heap)[2])
+            for smp in ready:
+                if smp.timestamp < self._emitted:
+                    workers[smp.bus].late += 1
+                else:
+                    self._emitted = smp.timestamp
+                self._put(smp)
+
+    def _put(self, smp: poll_sample):
+        """Кладет отсчет в выходную очередь. Если она заполнена, то ждет места, пока опрос не остановлен"""
+        out = self.output
+        while True:
+            try:
+                out.put(smp, timeout=_PUT_TIMEOUT)
+                return
+            except queue.Full:
+                if self._stop.is_set():
+                    self.dropped += 1
+                    return
+
+    def start(self):
+        """Запуск потоков опроса шин и потока слияния"""
+        if self._pool is not None:
+            return
+        self._stop.clear()
+        self._pool = ThreadPoolExecutor(max_workers=len(self._workers), thread_name_prefix="bus-poll")
+        self._futures = [self._pool.submit(self._poll_bus, w) for w in self._workers]
+        self._merger = threading.Thread(target=self._merge, name="bus-merge", daemon=True)
+        self._merger.start()
+
+    def stop(self):
+        """Остановка опроса. Отсчеты, прочитанные до остановки, попадут в очередь output (если в ней есть место).
+        Если поток шины завершился исключением, оно выбрасывается здесь."""
+        if self._pool is None:
+            return
+        self._stop.set()
+        self._pool.shutdown(wait=True)
+        self._merger.join()
+        self._pool = None
+        for fut in self._futures:
+            fut.result()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
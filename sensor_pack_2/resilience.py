@@ -0,0 +1,177 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Обработка ошибок шины (OSError) с ограниченной задержкой: повтор операции с экспоненциально растущей паузой.
+Суммарная пауза ограничена бюджетом (budget_us), меньшим периода преобразования АЦП, поэтому неисправное
+устройство (плохой контакт, помеха) не останавливает опрос остальных устройств на шине.
+Если все попытки исчерпаны, OSError выбрасывается дальше, а Mcp342X (итератор), BackgroundAcquisition и
+MultiBusPoller помечают такой отсчет как пропуск (RAW_GAP/REAL_GAP из adcmod)."""
+
+from array import array
+from collections import namedtuple
+from sensor_pack_2.bus_service import BusAdapter
+from sensor_pack_2.ticks import sleep_us
+
+# счетчики одного устройства на шине
+# operations - кол-во операций обмена
+# errors - кол-во ошибок шины (OSError), включая ошибки повторных попыток
+# retries - кол-во повторных попыток
+# failures - кол-во операций, завершившихся ошибкой после всех попыток
+device_counters = namedtuple("device_counters", "operations errors retries failures")
+
+# индексы счетчиков в массиве
+_OPS, _ERRORS, _RETRIES, _FAILURES = range(4)
+
+
+class RetryPolicy:
+    """Политика повтора операции обмена. Пауза перед попыткой n (1, 2...) равна base_delay_us * 2 ** (n - 1).
+    Повтор не выполняется, если суммарная пауза превысит budget_us."""
+
+    def __init__(self, retries: int = 3, base_delay_us: int = 50, budget_us: int = 1000):
+        """retries - наибольшее кол-во повторных попыток.
+        base_delay_us - пауза перед первой повторной попыткой, мкс.
+        budget_us - наибольшая суммарная пауза всех повторных попыток одной операции, мкс."""
+        if retries < 0 or base_delay_us < 0 or budget_us < 0:
+            raise ValueError("Параметры политики повтора не могут быть отрицательными!")
+        self.retries = retries
+        self.base_delay_us = base_delay_us
+        self.budget_us = budget_us
+
+    def delay_us(self, attempt: int) -> int:
+        """Пауза перед повторной попыткой attempt (1, 2...), мкс"""
+        return self.base_delay_us << (attempt - 1)
+
+    def fit(self, conversion_time_us: int, fraction: int = 2):
+        """Ограничивает суммарную паузу долей (1/fraction) периода преобразования АЦП conversion_time_us, мкс.
+        Пауза первой попытки подбирается так, чтобы все retries попыток уложились в бюджет.
+        Вызывайте после изменения частоты преобразования: policy.fit(adc.get_conversion_cycle_time())"""
+        self.budget_us = conversion_time_us // fraction
+        # сумма пауз всех попыток: base * (2 ** retries - 1)
+        self.base_delay_us = self.budget_us // ((1 << self.retries) - 1) if self.retries else 0
+
+
+class ResilientAdapter(BusAdapter):
+    """Адаптер шины, повторяющий операцию inner адаптера при ошибке шины (OSError) по политике policy.
+    Ведет счетчики операций и ошибок для каждого устройства (адреса) на шине. Передайте его конструктору
+    устройства вместо исходного адаптера: Mcp342X(ResilientAdapter(I2cAdapter(i2c), policy))"""
+
+    def __init__(self, inner: BusAdapter, policy: [RetryPolicy, None] = None):
+        super().__init__(inner.bus)
+        self._inner = inner
+        self.policy = policy if policy else RetryPolicy()
+        # адрес устройства -> массив счетчиков
+        self._counters = {}
+
+    def _get_counters(self, device_addr) -> array:
+        cnt = self._counters.get(device_addr)
+        if cnt is None:
+            cnt = array('L', (0, 0, 0, 0))
+            self._counters[device_addr] = cnt
+        return cnt
+
+    def _begin(self, device_addr) -> array:
+        """Начало операции обмена с устройством device_addr. Возвращает его счетчики"""
+        cnt = self._get_counters(device_addr)
+        cnt[_OPS] += 1
+        return cnt
+
+    def _backoff(self, cnt: array, attempt: int, spent: int, exc: OSError) -> int:
+        """Ошибка шины exc попытки attempt (1, 2...) операции. spent - суммарная пауза предыдущих попыток, мкс.
+        Выполняет паузу перед повтором и возвращает новую суммарную паузу или выбрасывает exc,
+        если попытки или бюджет исчерпаны"""
+        cnt[_ERRORS] += 1
+        policy = self.policy
+        delay = policy.delay_us(attempt)
+        if attempt > policy.retries or spent + delay > policy.budget_us:
+            cnt[_FAILURES] += 1
+            raise exc
+        cnt[_RETRIES] += 1
+        if delay:
+            sleep_us(delay)
+        return spent + delay
+
+    def get_counters(self, device_addr) -> device_counters:
+        """Счетчики устройства с адресом device_addr"""
+        return device_counters(*self._get_counters(device_addr))
+
+    def get_all_counters(self) -> dict:
+        """Счетчики всех устройств, обращавшихся к шине: {адрес: device_counters}"""
+        return {addr: device_counters(*cnt) for addr, cnt in self._counters.items()}
+
+    def reset_counters(self):
+        for cnt in self._counters.values():
+            for i in range(len(cnt)):
+                cnt[i] = 0
+
+    # Операции обмена. Цикл повтора в каждом методе: без кортежа аргументов (*args) и связанного метода
+    # на операцию, поэтому без ошибок шины операция не выделяет память в куче
+    def read_register(self, device_addr, reg_addr: int, bytes_count: int) -> bytes:
+        cnt = self._begin(device_addr)
+        attempt = spent = 0
+        while True:
+            try:
+                return self._inner.read_register(device_addr, reg_addr, bytes_count)
+            except OSError as e:
+                attempt += 1
+                spent = self._backoff(cnt, attempt, spent, e)
+
+    def write_register(self, device_addr, reg_addr: int, value: [int, bytes, bytearray],
+                       bytes_count: int, byte_order: str):
+        cnt = self._begin(device_addr)
+        attempt = spent = 0
+        while True:
+            try:
+                return self._inner.write_register(device_addr, reg_addr, value, bytes_count, byte_order)
+            except OSError as e:
+                attempt += 1
+                spent = self._backoff(cnt, attempt, spent, e)
+
+    def read(self, device_addr, n_bytes: int) -> bytes:
+        cnt = self._begin(device_addr)
+        attempt = spent = 0
+        while True:
+            try:
+                return self._inner.read(device_addr, n_bytes)
+            except OSError as e:
+                attempt += 1
+                spent = self._backoff(cnt, attempt, spent, e)
+
+    def read_to_buf(self, device_addr, buf: bytearray) -> bytes:
+        cnt = self._begin(device_addr)
+        attempt = spent = 0
+        while True:
+            try:
+                return self._inner.read_to_buf(device_addr, buf)
+            except OSError as e:
+                attempt += 1
+                spent = self._backoff(cnt, attempt, spent, e)
+
+    def write(self, device_addr, buf: bytes):
+        cnt = self._begin(device_addr)
+        attempt = spent = 0
+        while True:
+            try:
+                return self._inner.write(device_addr, buf)
+            except OSError as e:
+                attempt += 1
+                spent = self._backoff(cnt, attempt, spent, e)
+
+    def read_buf_from_memory(self, device_addr, mem_addr, buf, address_size: int = 1):
+        cnt = self._begin(device_addr)
+        attempt = spent = 0
+        while True:
+            try:
+                return self._inner.read_buf_from_memory(device_addr, mem_addr, buf, address_size)
+            except OSError as e:
+                attempt += 1
+                spent = self._backoff(cnt, attempt, spent, e)
+
+    def write_buf_to_memory(self, device_addr, mem_addr, buf, address_size: int = 1):
+        cnt = self._begin(device_addr)
+        attempt = spent = 0
+        while True:
+            try:
+                return self._inner.write_buf_to_memory(device_addr, mem_addr, buf, address_size)
+            except OSError as e:
+                attempt += 1
+                spent = self._backoff(cnt, attempt, spent, e)
@@ -0,0 +1,113 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Кольцевой буфер целых чисел для одного производителя и одного потребителя (SPSC), без блокировок"""
+
+from array import array
+from sensor_pack_2.base_sensor import check_value, get_error_str
+
+
+class RingBuffer:
+    """Кольцевой буфер записей из width целых чисел (например, отсчет и отметка времени).
+    Производитель (обработчик таймера) изменяет только индекс записи, потребитель (приложение) только индекс чтения,
+    поэтому блокировки не нужны. Методы push и drain не выделяют память в куче.
+    Индексы хранятся по модулю 2 * capacity, чтобы отличать полный буфер от пустого и не расти неограниченно."""
+
+    def __init__(self, capacity: int, width: int = 1, typecode: str = 'l', extra_typecode: str = 'l'):
+        """capacity - емкость в записях, степень двойки.
+        width - кол-во целых чисел в записи, 1 или 2.
+        typecode - тип первого числа записи, смотри модуль array.
+        extra_typecode - тип второго числа записи (width равно 2), например, 'L' для отметок времени
+        при typecode 'f'."""
+        if capacity < 2 or capacity & (capacity - 1):
+            raise ValueError(f"Емкость кольцевого буфера должна быть степенью двойки: {capacity}")
+        check_value(width, range(1, 3), get_error_str("width", width, range(1, 3)))
+        self._capacity = capacity
+        self._width = width
+        self._buf = array(typecode, (0 for _ in range(capacity)))
+        # вторые числа записей - в отдельном массиве, со своим типом
+        self._extra = array(extra_typecode, (0 for _ in range(capacity))) if 2 == width else None
+        self._mask = capacity - 1
+        self._mask2 = 2 * capacity - 1
+        # индекс записи. Изменяется только производителем!
+        self._head = 0
+        # индекс чтения. Изменяется только потребителем!
+        self._tail = 0
+        # кол-во записей, потерянных из-за переполнения. Изменяется только производителем!
+        self.overruns = 0
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    def __len__(self) -> int:
+        """Кол-во записей, доступных для чтения"""
+        return (self._head - self._tail) & self._mask2
+
+    def is_full(self) -> bool:
+        return len(self) == self._capacity
+
+    def push(self, value: int, extra: int = 0) -> bool:
+        """Добавляет запись. extra - второе число записи, если width равно 2.
+        Возвращает Ложь, если буфер полон (запись потеряна, счетчик overruns увеличен)."""
+        head = self._head
+        if ((head - self._tail) & self._mask2) == self._capacity:
+            self.overruns += 1
+            return False
+        i = head & self._mask
+        self._buf[i] = value
+        if 2 == self._width:
+            self._extra[i] = extra
+        # индекс записи изменяется последним, после записи данных!
+        self._head = (head + 1) & self._mask2
+        return True
+
+    def push_overwrite(self, value: int, extra: int = 0):
+        """Добавляет запись. Если буфер полон, то самая старая запись вытесняется (счетчик overruns увеличен).
+        Изменяет индекс чтения, поэтому допустим, только если производитель и потребитель не прерывают друг друга
+        (один поток, или потребитель читает в критической секции)!"""
+        tail = self._tail
+        if ((self._head - tail) & self._mask2) == self._capacity:
+            self._tail = (tail + 1) & self._mask2
+            self.overruns += 1
+        self.push(value, extra)
+
+    def pop(self) -> [int, None]:
+        """Возвращает первое число самой старой записи или None, если буфер пуст"""
+        tail = self._tail
+        if tail == self._head:
+            return None
+        val = self._buf[tail & self._mask]
+        self._tail = (tail + 1) & self._mask2
+        return val
+
+    def drain(self, out_values, out_extra=None, max_count: int = 0) -> int:
+        """Переносит записи в массивы out_values и out_extra (если не None и width равно 2), начиная с индекса 0.
+        Переносится не больше len(out_values) записей (и не больше max_count, если он больше нуля).
+        Возвращает кол-во перенесенных записей."""
+        tail = self._tail
+        n = (self._head - tail) & self._mask2
+        lim = len(out_values)
+        if 0 < max_count < lim:
+            lim = max_count
+        if n > lim:
+            n = lim
+        buf, extra, mask = self._buf, self._extra, self._mask
+        if out_extra is None:
+            extra = None
+        for k in range(n):
+            i = (tail + k) & mask
+            out_values[k] = buf[i]
+            if extra is not None:
+                out_extra[k] = extra[i]
+        # индекс чтения изменяется последним, после чтения данных!
+        self._tail = (tail + n) & self._mask2
+        return n
+
+    def clear(self):
+        """Очищает буфер. Вызывать только из потребителя!"""
+        self._tail = self._head
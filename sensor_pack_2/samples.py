@@ -0,0 +1,139 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Компактное представление отсчетов. Sample - запись отсчета со __slots__ (без словаря экземпляра),
+SampleBatch - пакет отсчетов в параллельных массивах array (структура массивов). Проход по пакету
+не создает объект на каждый отсчет: итератор возвращает один и тот же экземпляр Sample (flyweight)."""
+
+from array import array
+from sensor_pack_2.adcmod import RAW_GAP
+
+# флаги отсчета
+FLAG_GAP = 0x01         # пропуск (ошибка шины), raw равен RAW_GAP
+FLAG_LOW_LIMIT = 0x02   # "стрелка" АЦП на нижнем крае шкалы (underflow)
+FLAG_HI_LIMIT = 0x04    # "стрелка" АЦП на верхнем крае шкалы (overflow)
+
+
+def limit_flags(raw: int, resolution: int, delta: int = 0) -> int:
+    """Флаги FLAG_LOW_LIMIT/FLAG_HI_LIMIT 'сырого' отсчета raw (со знаком) АЦП с разрешением resolution бит:
+    отсчет не дальше delta от края шкалы. Для отсчета RAW_GAP возвращает 0"""
+    if RAW_GAP == raw:
+        return 0
+    half = 1 << (resolution - 1)
+    if raw <= delta - half:
+        return FLAG_LOW_LIMIT
+    if raw >= half - 1 - delta:
+        return FLAG_HI_LIMIT
+    return 0
+
+
+class Sample:
+    """Отсчет АЦП. raw - 'сырой' отсчет, channel - номер канала (при опросе нескольких АЦП - сквозной номер,
+    например индекс_АЦП * 4 + канал), timestamp - отметка времени ticks_us, flags - флаги FLAG_*"""
+    __slots__ = ("raw", "channel", "timestamp", "flags")
+
+    def __init__(self, raw: int = 0, channel: int = 0, timestamp: int = 0, flags: int = 0):
+        self.raw = raw
+        self.channel = channel
+        self.timestamp = timestamp
+        self.flags = flags
+
+    def set(self, raw: int, channel: int, timestamp: int, flags: int = 0):
+        """Заполняет запись заново, без создания нового объекта"""
+        self.raw = raw
+        self.channel = channel
+        self.timestamp = timestamp
+        self.flags = flags
+
+    @property
+    def is_gap(self) -> bool:
+        return 0 != self.flags & FLAG_GAP
+
+    def __repr__(self) -> str:
+        return f"Sample(raw={self.raw}, channel={self.channel}, timestamp={self.timestamp}, flags={self.flags})"
+
+
+class SampleBatch:
+    """Пакет отсчетов фиксированной емкости в параллельных массивах: raw ('l'), timestamp ('l'),
+    channel и flags (bytearray). Память выделяется один раз, в конструкторе."""
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"Неверная емкость пакета: {capacity}")
+        self.raw = array('l', (0 for _ in range(capacity)))
+        self.timestamp = array('l', (0 for _ in range(capacity)))
+        self.channel = bytearray(capacity)
+        self.flags = bytearray(capacity)
+        self._capacity = capacity
+        self._count = 0
+        # запись, возвращаемая итератором (flyweight)
+        self._view = Sample()
+
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    def __len__(self) -> int:
+        return self._count
+
+    def is_full(self) -> bool:
+        return self._count == self._capacity
+
+    def clear(self):
+        """Очищает пакет. Массивы не освобождаются"""
+        self._count = 0
+
+    def append(self, raw: int, channel: int, timestamp: int, flags: int = 0) -> bool:
+        """Добавляет отсчет. Отсчет RAW_GAP помечается флагом FLAG_GAP. Флаги края шкалы (limit_flags)
+        задаются источником отсчетов, например Mcp342X.read_batch.
+        Возвращает Ложь, если пакет полон (отсчет не добавлен)"""
+        i = self._count
+        if i == self._capacity:
+            return False
+        if RAW_GAP == raw:
+            flags |= FLAG_GAP
+        self.raw[i] = raw
+        self.timestamp[i] = timestamp
+        self.channel[i] = channel
+        self.flags[i] = flags
+        self._count = i + 1
+        return True
+
+    def extend(self, values, stamps, count: int, channel: int) -> int:
+        """Добавляет count отсчетов одного канала из массивов values и stamps (например, заполненных
+        BackgroundAcquisition.read). Возвращает кол-во добавленных отсчетов"""
+        n = min(count, self._capacity - self._count)
+        for k in range(n):
+            self.append(values[k], channel, stamps[k])
+        return n
+
+    def get(self, index: int, out: [Sample, None] = None) -> Sample:
+        """Отсчет с индексом index. Если out не None, то заполняется и возвращается out"""
+        if not 0 <= index < self._count:
+            raise IndexError(f"Неверный индекс отсчета: {index}")
+        if out is None:
+            out = Sample()
+        out.set(self.raw[index], self.channel[index], self.timestamp[index], self.flags[index])
+        return out
+
+    def __iter__(self):
+        """Перебор отсчетов. Каждый раз возвращается один и тот же экземпляр Sample, заполненный значениями
+        очередного отсчета! Если отсчет нужно сохранить, то сохраните его поля или вызовите get(index)"""
+        view = self._view
+        raw, stamp, chan, flags = self.raw, self.timestamp, self.channel, self.flags
+        for i in range(self._count):
+            view.set(raw[i], chan[i], stamp[i], flags[i])
+            yield view
+
+    def channel_values(self, channel: int, out) -> int:
+        """Копирует 'сырые' отсчеты канала channel (без пропусков) в массив out.
+        Возвращает кол-во скопированных отсчетов"""
+        raw, chan, flags = self.raw, self.channel, self.flags
+        n, size = 0, len(out)
+        for i in range(self._count):
+            if chan[i] == channel and not flags[i] & FLAG_GAP:
+                if n == size:
+                    break
+                out[n] = raw[i]
+                n += 1
+        return n
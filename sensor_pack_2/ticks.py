@@ -0,0 +1,29 @@
+# micropython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Функции отсчета времени MicroPython (ticks_us, ticks_ms, ticks_diff, sleep_us...) для кода,
+который должен работать и в MicroPython, и в CPython."""
+
+try:
+    from time import ticks_us, ticks_ms, ticks_diff, ticks_add, sleep_us, sleep_ms
+except ImportError:
+    # CPython. Значения не переполняются, поэтому ticks_diff и ticks_add - обычная арифметика
+    from time import monotonic_ns as _monotonic_ns, sleep as _sleep
+
+    def ticks_us() -> int:
+        return _monotonic_ns() // 1000
+
+    def ticks_ms() -> int:
+        return _monotonic_ns() // 1_000_000
+
+    def ticks_diff(ticks1: int, ticks2: int) -> int:
+        return ticks1 - ticks2
+
+    def ticks_add(ticks: int, delta: int) -> int:
+        return ticks + delta
+
+    def sleep_us(us: int):
+        _sleep(us / 1_000_000)
+
+    def sleep_ms(ms: int):
+        _sleep(ms / 1000)
@@ -0,0 +1,11 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Общие настройки тестов: корень репозитория в sys.path (mcp3421mod, sensor_pack_2, host_tools)"""
+
+import os
+import sys
+
+_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _root not in sys.path:
+    sys.path.insert(0, _root)
@@ -0,0 +1,123 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+"""Имитация MCP342X на шине I2C (интерфейс machine.I2C) для тестов без платы"""
+
+
+class FakeMcp:
+    """АЦП MCP342X: ответ на чтение - отсчет code и байт конфигурации. Бит RDY ответа 0 (отсчет новый), если
+    busy в Ложь. codes - отсчеты каналов (по битам CH конфигурации) или None, тогда отсчет code для всех каналов.
+    fail - кол-во следующих транзакций, завершающихся OSError.
+    gate - threading.Event или None: если событие не установлено, транзакция ждет его (зависшая шина)"""
+
+    def __init__(self, code: int = 1000, cfg: int = 0x90):
+        self.cfg = cfg
+        self.code = code
+        self.fail = 0
+        self.gate = None
+        self.busy = False
+        self.codes = None
+
+    @property
+    def code(self) -> int:
+        return self._code
+
+    @code.setter
+    def code(self, value: int):
+        self._code = value
+        self._update_raw()
+
+    @property
+    def codes(self):
+        return self._codes
+
+    @codes.setter
+    def codes(self, value):
+        self._codes = value
+        self._update_raw()
+
+    def _update_raw(self):
+        # байты отсчетов каналов (старшим вперед) заранее: в readfrom_into только небольшие int, чтобы имитация
+        # не выделяла память (memaudit)
+        codes = (self._code,) * 4 if getattr(self, "_codes", None) is None else self._codes
+        self._raw = [(c & 0xFFFFFF).to_bytes(3, "big") for c in codes]
+
+    def _check_fail(self):
+        gate = self.gate
+        if gate is not None:
+            gate.wait()
+        if self.fail:
+            self.fail -= 1
+            raise OSError(5)
+
+    def readfrom_into(self, addr: int, buf):
+        self._check_fail()
+        cfg = self.cfg & 0x7F | (0x80 if self.busy else 0)
+        raw = self._raw[(self.cfg >> 5) & 3]
+        if (self.cfg >> 2) & 3 < 3:
+            buf[0], buf[1], n = raw[1], raw[2], 2
+        else:
+            buf[0], buf[1], buf[2], n = raw[0], raw[1], raw[2], 3
+        while n < len(buf):
+            buf[n] = cfg
+            n += 1
+
+    def writeto(self, addr: int, buf) -> int:
+        self._check_fail()
+        self.cfg = buf[0]
+        return 1
+
+
+def make_adc(model: str = "mcp3421", address: int = 0x68, code: int = 1000, bus: [FakeMcp, None] = None):
+    """Возвращает (Mcp342X, FakeMcp) в режиме непрерывного преобразования, 240 Гц"""
+    from sensor_pack_2.bus_service import I2cAdapter
+    from mcp3421mod import Mcp342X
+    if bus is None:
+        bus = FakeMcp(code)
+    adc = Mcp342X(I2cAdapter(bus), model, address)
+    adc.start_measurement(single_shot=False, data_rate_raw=0, gain_raw=0, channel=0, differential_channel=True)
+    return adc, bus
+
+
+class RecordingAdapter:
+    """Адаптер шины (BusAdapter), записывающий вызовы в calls: (имя метода, аргументы).
+    fail - кол-во следующих вызовов, завершающихся OSError"""
+
+    def __init__(self):
+        self.bus = None
+        self.calls = []
+        self.fail = 0
+
+    def _record(self, name: str, *args):
+        self.calls.append((name,) + args)
+        if self.fail:
+            self.fail -= 1
+            raise OSError(5)
+
+    def read_register(self, device_addr, reg_addr: int, bytes_count: int) -> bytes:
+        self._record("read_register", device_addr, reg_addr, bytes_count)
+        return bytes(bytes_count)
+
+    def write_register(self, device_addr, reg_addr: int, value, bytes_count: int, byte_order: str):
+        self._record("write_register", device_addr, reg_addr, value, bytes_count, byte_order)
+
+    def read(self, device_addr, n_bytes: int) -> bytes:
+        self._record("read", device_addr, n_bytes)
+        return bytes(n_bytes)
+
+    def read_to_buf(self, device_addr, buf):
+        self._record("read_to_buf", device_addr, buf)
+        return buf
+
+    def write(self, device_addr, buf):
+        self._record("write", device_addr, buf)
+
+    def write_const(self, device_addr, val: int, count: int):
+        self._record("write_const", device_addr, val, count)
+
+    def read_buf_from_memory(self, device_addr, mem_addr, buf, address_size: int = 1):
+        self._record("read_buf_from_memory", device_addr, mem_addr, buf, address_size)
+        return buf
+
+    def write_buf_to_memory(self, device_addr, mem_addr, buf, address_size: int = 1):
+        self._record("write_buf_to_memory", device_addr, mem_addr, buf, address_size)
@@ -0,0 +1,73 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import time
+from array import array
+import pytest
+from fakes import make_adc
+from sensor_pack_2.acquisition import BackgroundAcquisition
+from sensor_pack_2.adcmod import RAW_GAP
+from sensor_pack_2.ringbuf import RingBuffer
+
+
+def test_ring_wraps_and_counts_overruns():
+    ring = RingBuffer(4, 2)
+    out, extra = array('l', [0] * 4), array('l', [0] * 4)
+    for k in range(3):
+        assert ring.push(k, 10 * k)
+    assert 2 == ring.drain(out, extra, max_count=2)
+    assert [0, 1] == list(out[:2]) and [0, 10] == list(extra[:2])
+    for k in range(3, 6):
+        ring.push(k, 10 * k)
+    assert ring.is_full()
+    assert not ring.push(6, 60)
+    assert 1 == ring.overruns
+    assert 4 == ring.drain(out, extra)
+    assert [2, 3, 4, 5] == list(out)
+    assert [20, 30, 40, 50] == list(extra)
+    assert 0 == len(ring) and ring.pop() is None
+
+
+def test_ring_overwrite_drops_oldest():
+    ring = RingBuffer(2)
+    for k in range(5):
+        ring.push_overwrite(k)
+    assert 3 == ring.overruns
+    assert [3, 4] == [ring.pop(), ring.pop()]
+
+
+def test_ring_rejects_bad_capacity():
+    with pytest.raises(ValueError):
+        RingBuffer(6)
+
+
+def test_sample_marks_gaps_and_not_ready():
+    adc, bus = make_adc(code=1234)
+    acq = BackgroundAcquisition(adc, capacity=8)
+    acq._sample()
+    bus.fail = 1
+    acq._sample()
+    adc.start_measurement(single_shot=False, data_rate_raw=3, gain_raw=0, channel=0, differential_channel=True)
+    bus.busy = True
+    acq._sample()
+    values, stamps = array('l', [0] * 8), array('l', [0] * 8)
+    assert 2 == acq.read(values, stamps)
+    assert [1234, RAW_GAP] == list(values[:2])
+    assert stamps[0] <= stamps[1]
+    assert 1 == acq.bus_errors and 1 == acq.not_ready
+
+
+def test_thread_fills_ring_until_stopped():
+    adc, _ = make_adc(code=-5)
+    acq = BackgroundAcquisition(adc, capacity=64)
+    acq.start(freq=1000)
+    deadline = time.monotonic() + 2.0
+    while len(acq) < 10 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    acq.stop()
+    assert not acq.running
+    n = len(acq)
+    assert n >= 10
+    values = array('l', [0] * 64)
+    assert n == acq.read(values)
+    assert {-5} == set(values[:n])
@@ -0,0 +1,38 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+from fakes import make_adc
+from mcp3421mod import AdaptiveRate
+
+
+def _run(adc, n: int):
+    for _ in range(n):
+        next(adc)
+
+
+def test_fast_slow_fast():
+    adc, bus = make_adc(code=1000)
+    adc.raw_mode = True
+    adc.adaptive = ar = AdaptiveRate(fast_rate_raw=0, slow_rate_raw=3, settle=8)
+    assert 0 == adc.current_sample_rate
+    # постоянный сигнал: переход на медленное преобразование после settle стабильных отсчетов
+    _run(adc, 12)
+    assert 3 == adc.current_sample_rate
+    assert 1 == ar.switches
+    # стабильный сигнал в медленном режиме: без переключений
+    _run(adc, 20)
+    assert 3 == adc.current_sample_rate
+    # скачок сигнала: быстрое преобразование
+    bus.code = 20000
+    _run(adc, 2)
+    assert 0 == adc.current_sample_rate
+    assert 2 == ar.switches
+
+
+def test_thresholds_not_below_resolution():
+    adc, _ = make_adc()
+    ar = AdaptiveRate()
+    ar.update(adc, 0)
+    # 240 Гц, 12 бит: младший разряд - 64 единицы 18 бит
+    assert ar._thr_down >= 64
+    assert ar._thr_up > ar._thr_down
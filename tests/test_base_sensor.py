@@ -0,0 +1,28 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import sys
+import pytest
+from fakes import RecordingAdapter
+from sensor_pack_2.base_sensor import Device
+
+
+@pytest.mark.parametrize("order, expected", [
+    ('>', b"\x12\x34"), ('!', b"\x12\x34"), ('big', b"\x12\x34"),
+    ('<', b"\x34\x12"), ('little', b"\x34\x12"),
+    ('=', (0x1234).to_bytes(2, sys.byteorder)), ('@', (0x1234).to_bytes(2, sys.byteorder)),
+])
+def test_codec_byte_order_prefixes(order, expected):
+    dev = Device(RecordingAdapter(), 0x68, big_byte_order=True)
+    codec = dev.get_codec('H', order)
+    assert expected == codec.pack(0x1234)
+    assert (0x1234,) == dev.unpack('H', expected, order)
+    # кодек из кэша
+    assert codec is dev.get_codec('H', order)
+
+
+def test_codec_bad_byte_order():
+    dev = Device(RecordingAdapter(), 0x68, big_byte_order=False)
+    with pytest.raises(ValueError):
+        dev.get_codec('H', '?')
+    assert b"\x34\x12" == dev.pack('H', 0x1234)
@@ -0,0 +1,32 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import numpy as np
+from host_tools.batch import main
+from host_tools.noise import RunningStats, iter_chunks
+from sensor_pack_2.adcmod import RAW_GAP
+
+
+def test_running_stats_chunk_invariant():
+    x = np.random.default_rng(1).normal(3.0, 2.0, 10_000)
+    st = RunningStats()
+    for chunk in iter_chunks(x, 777):
+        st.update(chunk)
+    assert x.size == st.count
+    assert abs(st.mean - x.mean()) < 1e-12
+    assert abs(st.std - x.std()) < 1e-12
+    assert (x.min(), x.max()) == (st.min, st.max)
+
+
+def test_batch_summary(tmp_path):
+    raw = np.full(1000, 500, dtype='<i4')
+    raw[::100] = RAW_GAP
+    raw.tofile(tmp_path / "dev_ch0_rate3_gain0.bin")
+    out = tmp_path / "summary.csv"
+    assert 0 == main([str(tmp_path), "-o", str(out), "-j", "1", "--chunk-size", "64", "--average", "3"])
+    lines = out.read_text().splitlines()
+    assert 2 == len(lines)
+    row = lines[1].split(",")
+    # 990 отсчетов без пропусков, среднее по 3: 330
+    assert ["0", "3", "0", "330", "10"] == row[1:6]
+    assert abs(float(row[6]) - 500 * 2 * 2.048 / 2 ** 18) < 1e-12
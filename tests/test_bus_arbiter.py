@@ -0,0 +1,98 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import asyncio
+import threading
+from fakes import FakeMcp, RecordingAdapter
+from mcp3421mod import Mcp342X
+from sensor_pack_2.bus_arbiter import AsyncBusArbiter, BusArbiter, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+from sensor_pack_2.bus_service import I2cAdapter
+
+
+def test_memory_transfers_forward_address_size():
+    inner = RecordingAdapter()
+    adapter = BusArbiter(inner).adapter_for(PRIORITY_HIGH)
+    buf = bytearray(2)
+    adapter.read_buf_from_memory(0x50, 0x1234, buf, 2)
+    adapter.write_buf_to_memory(0x50, 0x1234, buf, address_size=2)
+    assert [("read_buf_from_memory", 0x50, 0x1234, buf, 2),
+            ("write_buf_to_memory", 0x50, 0x1234, buf, 2)] == inner.calls
+
+
+def _grant_order(max_batch: int, requests) -> list:
+    """Порядок предоставления шины запросам requests (устройство, приоритет, метка), ожидающим, пока шиной
+    владеет устройство 0x68"""
+    async def scenario():
+        arbiter = AsyncBusArbiter(RecordingAdapter(), max_batch=max_batch)
+        order = []
+
+        async def worker(device_addr, priority, tag):
+            async with arbiter.transaction(device_addr, priority):
+                order.append(tag)
+
+        await arbiter.acquire(0x68, PRIORITY_HIGH)
+        tasks = [asyncio.create_task(worker(*r)) for r in requests]
+        await asyncio.sleep(0)
+        assert len(requests) == arbiter.waiting
+        arbiter.release()
+        await asyncio.gather(*tasks)
+        assert 0 == arbiter.waiting
+        return order
+
+    return asyncio.run(scenario())
+
+
+def test_priority_then_arrival_order():
+    order = _grant_order(1, [(0x69, PRIORITY_LOW, "low"), (0x69, PRIORITY_NORMAL, "n1"),
+                             (0x6A, PRIORITY_NORMAL, "n2"), (0x6A, PRIORITY_HIGH, "high")])
+    assert ["high", "n1", "n2", "low"] == order
+
+
+def test_same_device_batching_is_bounded():
+    order = _grant_order(2, [(0x69, PRIORITY_NORMAL, "other"), (0x68, PRIORITY_NORMAL, "b1"),
+                             (0x68, PRIORITY_NORMAL, "b2")])
+    # шина остается у 0x68, но не больше max_batch раз подряд
+    assert ["b1", "other", "b2"] == order
+
+
+def test_nested_transactions_and_foreign_release():
+    arbiter = BusArbiter(RecordingAdapter())
+    with arbiter.transaction(0x68):
+        with arbiter.transaction(0x68) as adapter:
+            adapter.write(0x68, b"\x10")
+        errors = []
+
+        def foreign():
+            try:
+                arbiter.release()
+            except RuntimeError as e:
+                errors.append(e)
+
+        t = threading.Thread(target=foreign)
+        t.start()
+        t.join()
+        assert 1 == len(errors)
+    # шина свободна: захват без ожидания
+    arbiter.acquire(0x69)
+    arbiter.release()
+    assert 0 == arbiter.contended
+
+
+def test_threads_share_bus_with_mcp342x():
+    arbiter = BusArbiter(I2cAdapter(FakeMcp(code=777)))
+    adcs = [Mcp342X(arbiter.adapter_for(PRIORITY_HIGH)) for _ in range(2)]
+    for adc in adcs:
+        adc.start_measurement(single_shot=False, data_rate_raw=0, gain_raw=0, channel=0, differential_channel=True)
+        adc.raw_mode = True
+    results = []
+
+    def poll(adc):
+        results.extend(next(adc) for _ in range(50))
+
+    threads = [threading.Thread(target=poll, args=(adc,)) for adc in adcs]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert [777] * 100 == results
+    assert 0 == arbiter.waiting
@@ -0,0 +1,60 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import pytest
+from fakes import make_adc
+from sensor_pack_2 import calibration
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(calibration, "sleep_us", lambda us: None)
+
+
+def _adc_18bit():
+    adc, bus = make_adc(code=1234)
+    adc.start_measurement(single_shot=False, data_rate_raw=3, gain_raw=0, channel=0, differential_channel=True)
+    return adc, bus
+
+
+def test_measure_mean(no_sleep):
+    adc, _ = _adc_18bit()
+    assert 1234 == calibration.measure_mean(adc, count=16)
+
+
+def test_measure_mean_not_ready_raises(no_sleep):
+    adc, bus = _adc_18bit()
+    bus.busy = True     # АЦП не выдает новые отсчеты
+    with pytest.raises(ValueError):
+        calibration.measure_mean(adc, count=16, max_misses=4)
+
+
+def test_measure_mean_single_shot_raises(no_sleep):
+    adc, _ = make_adc()
+    adc.start_measurement(single_shot=True, data_rate_raw=3, gain_raw=0, channel=0, differential_channel=True)
+    with pytest.raises(ValueError):
+        calibration.measure_mean(adc)
+
+
+def _select(adc, channel: int):
+    adc.start_measurement(single_shot=False, data_rate_raw=0, gain_raw=0, channel=channel, differential_channel=True)
+
+
+def test_two_channels_calibrated_separately(no_sleep):
+    adc, bus = make_adc("mcp3424")
+    table = calibration.CalibrationTable()
+    bus.codes = [100, 0, -50, 0]    # закороченные входы: смещение нуля каналов 0 и 2
+    _select(adc, 0)
+    assert 100 == calibration.calibrate_offset(adc, table, count=8)
+    _select(adc, 2)
+    assert -50 == calibration.calibrate_offset(adc, table, count=8)
+    assert table.get(0, 0, 0).offset == 100
+    assert table.get(2, 0, 0).offset == -50
+    assert table.get(1, 0, 0) is None
+
+    bus.codes = [1100, 1100, 950, 1000]
+    lsb = adc.get_lsb()
+    for channel, volts in ((0, 1000 * lsb), (1, 1100 * lsb), (2, 1000 * lsb), (3, 1000 * lsb)):
+        _select(adc, channel)
+        assert channel == adc.channel.number
+        assert abs(adc.get_value(raw=False) - volts) < 1e-9, channel
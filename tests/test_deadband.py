@@ -0,0 +1,44 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import pytest
+from fakes import make_adc
+from sensor_pack_2.deadband import ChangeFilter, EMIT_FIRST, EMIT_CHANGE, EMIT_THRESHOLD, EMIT_HEARTBEAT
+
+
+def test_deadband_suppresses_small_changes():
+    f = ChangeFilter(deadband=10)
+    assert f.feed(100, 0) and EMIT_FIRST == f.reason
+    assert not f.feed(110, 1)
+    assert not f.feed(90, 2)
+    assert f.feed(111, 3) and EMIT_CHANGE == f.reason
+    # сравнение с последним выданным отсчетом, а не с последним полученным
+    assert not f.feed(101, 4)
+    assert (2, 3) == (f.emitted, f.suppressed)
+    assert 111 == f.last
+
+
+def test_threshold_crossing_and_heartbeat():
+    f = ChangeFilter(deadband=100, thresholds=(50, 0), heartbeat_ms=1000)
+    assert f.feed(-5, 0)
+    assert f.feed(1, 10) and EMIT_THRESHOLD == f.reason
+    assert not f.feed(2, 500)
+    assert f.feed(3, 1010) and EMIT_HEARTBEAT == f.reason
+    assert f.feed(60, 1020) and EMIT_THRESHOLD == f.reason
+    f.reset()
+    assert f.feed(60, 1030) and EMIT_FIRST == f.reason
+
+
+def test_iterates_over_adc():
+    adc, bus = make_adc(code=500)
+    f = ChangeFilter(adc, deadband=5)
+    assert 500 == next(f)
+    bus.code = 503
+    assert next(f) is None
+    bus.code = 506
+    assert 506 == next(f)
+
+
+def test_bad_parameters():
+    with pytest.raises(ValueError):
+        ChangeFilter(deadband=-1)
@@ -0,0 +1,51 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import random
+from array import array
+import pytest
+from host_tools import deltacodec as host_codec
+from sensor_pack_2.deltacodec import DeltaEncoder, decode, zigzag, unzigzag
+
+
+def _encode(values, kfi: int) -> bytes:
+    enc = DeltaEncoder(kfi)
+    out = bytearray(enc.max_encoded_size(len(values)))
+    return bytes(out[:enc.encode(values, out)])
+
+
+def test_zigzag():
+    assert [0, 1, 2, 3, 4] == [zigzag(v) for v in (0, -1, 1, -2, 2)]
+    for v in (-(1 << 17), -1, 0, 1, (1 << 17) - 1):
+        assert v == unzigzag(zigzag(v))
+
+
+@pytest.mark.parametrize("kfi", [1, 7, 64])
+def test_round_trip_matches_host_decoder(kfi):
+    rnd = random.Random(kfi)
+    values = array('l', [-(1 << 17), (1 << 17) - 1])
+    for _ in range(300):
+        values.append(max(-(1 << 17), min((1 << 17) - 1, values[-1] + rnd.randint(-40, 40))))
+    data = _encode(values, kfi)
+    assert list(values) == decode(data)
+    assert list(values) == host_codec.decode(data).tolist()
+
+
+def test_slow_signal_compresses_to_about_a_byte_per_sample():
+    values = [100000 + (k % 5) for k in range(1024)]
+    assert len(_encode(values, 64)) < 1.2 * len(values)
+
+
+def test_blocks_are_independent():
+    values = list(range(-8, 8))
+    data = _encode(values, 4)
+    # второй блок: varint(4) и 4 отсчета по одному байту
+    assert values[4:] == decode(data[5:])
+
+
+def test_truncated_data():
+    data = _encode([1000, 1001, 1002], 8)
+    with pytest.raises(ValueError):
+        decode(data[:-1] + b"\x80")
+    with pytest.raises(ValueError):
+        host_codec.decode(data[:-1])
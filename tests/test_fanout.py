@@ -0,0 +1,27 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+from array import array
+from sensor_pack_2.fanout import Publisher, DROP_OLDEST
+
+
+def test_float_samples_keep_integer_stamps():
+    pub = Publisher(typecode='f', timestamps=True)
+    sub = pub.subscribe(capacity=4)
+    # отметка времени, не представимая точно в float32
+    stamps = 0x7FFF_FFF1, 0x7FFF_FFF3
+    pub.publish(0.5, stamps[0])
+    pub.publish(-1.25, stamps[1])
+    values, out_stamps = array('f', (0, 0, 0)), array('L', (0, 0, 0))
+    assert 2 == sub.read(values, out_stamps)
+    assert [0.5, -1.25] == list(values[:2])
+    assert list(stamps) == list(out_stamps[:2])
+
+
+def test_drop_oldest():
+    pub = Publisher()
+    fast, slow = pub.subscribe(capacity=2), pub.subscribe(capacity=2, policy=DROP_OLDEST)
+    for v in range(3):
+        pub.publish(v)
+    assert 1 == fast.dropped and 1 == slow.dropped
+    assert 0 == fast.pop() and 1 == slow.pop()
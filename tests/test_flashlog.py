@@ -0,0 +1,76 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import os
+import time
+from sensor_pack_2.flashlog import FlashLogger, read_index, read_log
+
+BLOCK = 64
+
+
+def _values(path) -> list:
+    return [v for blk in read_log(path, BLOCK) for v in blk.values]
+
+
+def test_blocks_round_trip_and_resume(tmp_path):
+    path = str(tmp_path / "adc.log")
+    with FlashLogger(path, block_size=BLOCK, index_every=1) as log:
+        capacity = log.capacity
+        for v in range(-15, 15):
+            log.add(v)
+            log.service()
+    assert 0 == os.path.getsize(path) % BLOCK
+    assert list(range(-15, 15)) == _values(path)
+    idx = read_index(path)
+    assert (os.path.getsize(path) // BLOCK, 30) == (idx.blocks, idx.samples)
+    # продолжение записи после последнего блока
+    with FlashLogger(path, block_size=BLOCK) as log:
+        assert 30 == log.samples
+        assert 5 == log.extend(range(100, 105))
+    assert list(range(-15, 15)) + list(range(100, 105)) == _values(path)
+    assert [0, 1, 2, 3] == [blk.seq for blk in read_log(path, BLOCK)]
+    assert 11 == capacity
+
+
+def test_samples_dropped_when_both_blocks_wait(tmp_path):
+    path = str(tmp_path / "adc.log")
+    log = FlashLogger(path, block_size=BLOCK)
+    n = 2 * log.capacity
+    # один блок ожидает записи, второй заполнен: остальные отсчеты отбрасываются
+    assert n == log.extend(range(n))
+    assert 0 == log.extend(range(3))
+    assert 3 == log.dropped
+    assert log.service()
+    assert log.add(7)
+    log.close()
+    assert list(range(n)) + [7] == _values(path)
+
+
+def test_corrupted_block_is_skipped(tmp_path):
+    path = str(tmp_path / "adc.log")
+    with FlashLogger(path, block_size=BLOCK) as log:
+        for v in range(3 * log.capacity):
+            log.add(v)
+            log.service()
+        capacity = log.capacity
+    with open(path, "r+b") as f:
+        f.seek(BLOCK + 30)
+        b = f.read(1)
+        f.seek(BLOCK + 30)
+        f.write(bytes([b[0] ^ 0xFF]))
+    blocks = list(read_log(path, BLOCK))
+    assert [0, 2] == [blk.seq for blk in blocks]
+    assert list(range(capacity)) == list(blocks[0].values)
+
+
+def test_threaded_writer(tmp_path):
+    path = str(tmp_path / "adc.log")
+    log = FlashLogger(path, block_size=BLOCK, threaded=True)
+    retries = 0
+    for v in range(5 * log.capacity):
+        while not log.add(v):
+            retries += 1
+            time.sleep(0.001)
+    log.close()
+    assert retries == log.dropped
+    assert list(range(5 * log.capacity)) == _values(path)
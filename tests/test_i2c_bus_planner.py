@@ -0,0 +1,44 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import pytest
+from fakes import make_adc
+from i2c_bus_planner import make_spec, spec_from_adc, transaction_us, sample_bus_us, plan_bus, format_plan
+
+
+def test_transaction_time():
+    # START, STOP и 5 байт по 9 тактов при 400 кГц, плюс tBUF 1.3 мкс
+    assert 47 * 2.5 + 1.3 == pytest.approx(transaction_us(4, 400_000))
+    assert 47 * 10 * 1.1 + 4.7 + 20 == pytest.approx(transaction_us(4, 100_000, stretch=0.1, overhead_us=20))
+
+
+def test_channel_switching_costs_extra_transactions():
+    read_us, write_us = transaction_us(4), transaction_us(1)
+    assert read_us == pytest.approx(sample_bus_us(make_spec(0x68)))
+    assert 2 * read_us == pytest.approx(sample_bus_us(make_spec(0x68, polls_per_sample=2)))
+    assert 3 * read_us + write_us == pytest.approx(sample_bus_us(make_spec(0x68, channels=4)))
+    assert 3 * read_us + write_us == pytest.approx(sample_bus_us(make_spec(0x68, single_shot=True)))
+
+
+def test_eight_scanning_adcs_overload_slow_bus():
+    devices = [make_spec(0x68 + i, channels=4, data_rate_raw=0) for i in range(8)]
+    slow = plan_bus(devices, freq=100_000)
+    assert slow.overloaded
+    assert 8 * 240 == slow.aggregate_sps
+    # предел - суммарная частота при загрузке max_utilization
+    assert slow.aggregate_sps * 0.7 / slow.utilization == pytest.approx(slow.max_aggregate_sps)
+    assert "ПЕРЕГРУЗКА" in format_plan(slow)
+    fast = plan_bus(devices, freq=1_000_000, stretch=0.0)
+    assert not fast.overloaded
+    assert sum(d.bus_us_per_s for d in fast.devices) / 1E6 == pytest.approx(fast.utilization)
+    assert "ПЕРЕГРУЗКА" not in format_plan(fast)
+
+
+def test_spec_from_adc_and_bad_parameters():
+    adc, _ = make_adc(address=0x6A)
+    adc.start_measurement(single_shot=False, data_rate_raw=2, gain_raw=0, channel=0, differential_channel=True)
+    assert make_spec(0x6A, 2, 2) == spec_from_adc(adc, channels=2)
+    with pytest.raises(ValueError):
+        make_spec(0x68, data_rate_raw=4)
+    with pytest.raises(ValueError):
+        plan_bus([], max_utilization=1.5)
@@ -0,0 +1,28 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import os
+import subprocess
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(code: str) -> str:
+    """Выполняет code в новом интерпретаторе (без site), корень репозитория в sys.path. Возвращает stdout"""
+    return subprocess.run([sys.executable, "-I", "-S", "-c", f"import sys; sys.path.insert(0, {_ROOT!r}); {code}"],
+                          check=True, capture_output=True, text=True, timeout=60).stdout
+
+
+def test_driver_import_skips_collections_and_struct():
+    out = _run("import mcp3421mod; print(*sorted(m for m in ('collections', 'struct') if m in sys.modules))")
+    assert "" == out.strip()
+
+
+def test_driver_import_budget():
+    # CPython: код и объекты модулей драйвера, без collections и struct (было около 490 КБ).
+    # На плате бюджет намного меньше (смотри README)
+    out = _run("from sensor_pack_2.memaudit import audit_import; "
+               "print(*audit_import('mcp3421mod', budget=320_000, time_budget_us=200_000))")
+    used, elapsed = map(int, out.split())
+    assert 0 < used and 0 < elapsed
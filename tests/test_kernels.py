@@ -0,0 +1,35 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+from sensor_pack_2 import kernels
+from sensor_pack_2.kernels import sign_extend, be_to_int, get_bits, set_bits, raw_to_real
+
+
+def test_python_fallback_is_selected():
+    assert 'python' == kernels.KERNEL_IMPL
+    # заглушка декораторов возвращает функцию без изменений
+    assert sign_extend is kernels.micropython.native(sign_extend)
+
+
+def test_be_to_int_matches_reference():
+    for bits, n in ((16, 2), (18, 3)):
+        for value in (-(1 << (bits - 1)), -1, 0, 1, 12345, (1 << (bits - 1)) - 1):
+            buf = bytearray((value & ((1 << 8 * n) - 1)).to_bytes(n, 'big') + b"\x90")
+            assert value == be_to_int(buf, n, bits)
+
+
+def test_sign_extend_ignores_high_bits():
+    assert -1 == sign_extend(0xFFFFFF, 18)
+    assert 0x1FFFF == sign_extend(0xFE1FFFF, 18)
+    assert -2048 == sign_extend(0x800, 12)
+
+
+def test_bit_fields_and_scale():
+    cfg = 0x90
+    cfg = set_bits(cfg, 3, 0x0C, 2)
+    assert 0x9C == cfg
+    assert 3 == get_bits(cfg, 0x0C, 2)
+    # значение шире поля обрезается маской
+    assert 0x90 | 0x60 == set_bits(0x90, 7, 0x60, 5)
+    assert 2.5 == raw_to_real(10, 0.25, 0.0)
+    assert 1.0 == raw_to_real(-2, 0.25, 1.5)
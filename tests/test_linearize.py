@@ -0,0 +1,52 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import pytest
+from fakes import make_adc
+from sensor_pack_2.adcmod import RAW_GAP
+from sensor_pack_2.linearize import Linearizer, Rtd, Thermocouple
+
+
+def test_reference_values():
+    # таблицы NIST ITS-90 и IEC 60751
+    assert 4.096 == pytest.approx(Thermocouple('K').emf(100.0), abs=1E-3)
+    assert 5.269 == pytest.approx(Thermocouple('J').emf(100.0), abs=1E-3)
+    assert 4.279 == pytest.approx(Thermocouple('T').emf(100.0), abs=1E-3)
+    assert 138.5055 == pytest.approx(Rtd().resistance(100.0), abs=1E-4)
+    assert 60.2558 == pytest.approx(Rtd().resistance(-100.0), abs=1E-4)
+    with pytest.raises(ValueError):
+        Thermocouple('X')
+
+
+def _code(adc, volts: float) -> int:
+    return round(volts / adc.raw_value_to_real(1))
+
+
+def test_thermocouple_with_cold_junction():
+    adc, _ = make_adc()
+    adc.start_measurement(single_shot=False, data_rate_raw=3, gain_raw=3, channel=0, differential_channel=True)
+    tc = Thermocouple('K')
+    lin = Linearizer(adc, tc)
+    assert 100.0 == pytest.approx(lin.eval(_code(adc, tc.volts(100.0))), abs=0.05)
+    lin.set_cold_junction(25.0)
+    assert 100.0 == pytest.approx(lin.eval(_code(adc, tc.volts(100.0) - tc.volts(25.0))), abs=0.05)
+    assert lin.eval(RAW_GAP) is None
+    assert lin.eval(None) is None
+
+
+def test_rtd_table_per_configuration():
+    adc, _ = make_adc()
+    adc.start_measurement(single_shot=False, data_rate_raw=3, gain_raw=0, channel=0, differential_channel=True)
+    rtd = Rtd(r0=100.0, current=0.001)
+    lin = Linearizer(adc, rtd, max_points=256)
+    first = lin.select()
+    assert len(first) <= 256
+    assert -50.0 == pytest.approx(lin.eval(_code(adc, rtd.volts(-50.0))), abs=0.05)
+    # вне таблицы (больше 850 °C)
+    assert lin.eval(_code(adc, rtd.volts(900.0))) is None
+    adc.start_measurement(single_shot=False, data_rate_raw=2, gain_raw=0, channel=0, differential_channel=True)
+    second = lin.select()
+    assert second is not first
+    assert 300.0 == pytest.approx(lin.eval(_code(adc, rtd.volts(300.0))), abs=0.1)
+    adc.start_measurement(single_shot=False, data_rate_raw=3, gain_raw=0, channel=0, differential_channel=True)
+    assert first is lin.select()
@@ -0,0 +1,76 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import ctypes
+import pytest
+from sensor_pack_2 import linux_i2c
+from sensor_pack_2.linux_i2c import LinuxI2C, LinuxI2cAdapter, i2c_msg, I2C_RDWR, I2C_M_RD, I2C_RDWR_MAX_MSGS
+from mcp3421mod import Mcp342X
+
+
+class _Kernel:
+    """Имитация ioctl I2C_RDWR: MCP342X (адрес 0x68) на шине. Записанный байт - конфигурация,
+    чтение - отсчет 0x1234 и конфигурация"""
+
+    def __init__(self):
+        self.cfg = 0x90
+        # сообщения каждого вызова ioctl: [(адрес, чтение, длина), ...]
+        self.calls = []
+
+    def ioctl(self, fd: int, request: int, data) -> int:
+        assert I2C_RDWR == request
+        msgs = [data.msgs[i] for i in range(data.nmsgs)]
+        self.calls.append([(m.addr, bool(m.flags & I2C_M_RD), m.len) for m in msgs])
+        for m in msgs:
+            if m.flags & I2C_M_RD:
+                out = bytes((0x12, 0x34, self.cfg, self.cfg))[:m.len]
+                ctypes.memmove(m.buf, out, len(out))
+            else:
+                self.cfg = ctypes.string_at(m.buf, m.len)[-1]
+        return len(msgs)
+
+
+@pytest.fixture
+def kernel(monkeypatch):
+    k = _Kernel()
+    # fcntl.ioctl, импортированный модулем linux_i2c
+    monkeypatch.setattr(linux_i2c, "_sys_ioctl", k.ioctl)
+    return k
+
+
+@pytest.fixture
+def dev(tmp_path) -> str:
+    """Файл вместо /dev/i2c-1"""
+    path = tmp_path / "i2c-1"
+    path.write_bytes(b"")
+    return str(path)
+
+
+def test_mem_read_is_one_combined_transaction(kernel, dev):
+    with LinuxI2C(1, dev) as bus:
+        buf = bytearray(2)
+        bus.readfrom_mem_into(0x50, 0x10, buf)
+        assert [[(0x50, False, 1), (0x50, True, 2)]] == kernel.calls
+        assert b"\x12\x34" == buf
+
+
+def test_transfer_split_by_kernel_limit(kernel, dev):
+    with LinuxI2C(1, dev) as bus:
+        msgs = [i2c_msg(0x68, True, bytearray(4)) for _ in range(I2C_RDWR_MAX_MSGS + 1)]
+        assert 2 == bus.transfer(msgs)
+        assert [I2C_RDWR_MAX_MSGS, 1] == [len(c) for c in kernel.calls]
+
+
+def test_mcp342x_config_write_and_read_in_one_syscall(kernel, dev):
+    adapter = LinuxI2cAdapter(LinuxI2C(1, dev))
+    try:
+        adc = Mcp342X(adapter)
+        kernel.calls.clear()
+        adc.start_measurement(single_shot=False, data_rate_raw=2, gain_raw=1, channel=0, differential_channel=True)
+        # чтение конфигурации (adc_properties_to_raw_config), затем запись и чтение одним вызовом ioctl
+        assert [[(0x68, True, 4)], [(0x68, False, 1), (0x68, True, 4)]] == kernel.calls
+        assert 2 == adc.current_sample_rate and 1 == adc.current_raw_gain
+        assert 0x1234 == adc.get_raw_value()
+        assert 3 == len(kernel.calls)
+    finally:
+        adapter.close()
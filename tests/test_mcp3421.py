@@ -0,0 +1,13 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+from fakes import make_adc
+
+
+def test_scale_follows_config_read_back():
+    adc, bus = make_adc(code=1000)
+    assert abs(adc.get_value(raw=False) - 1000 * 2 * 2.048 / 2 ** 12) < 1e-9
+    # настройки АЦП изменены в обход драйвера: 18 бит, усиление 4
+    bus.cfg = 0x10 | 3 << 2 | 2
+    assert abs(adc.get_value(raw=False) - 1000 * 2 * 2.048 / (4 * 2 ** 18)) < 1e-12
+    assert 18 == adc.current_resolution and 4 == adc.gain
@@ -0,0 +1,32 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+from collections import namedtuple
+import pytest
+from fakes import make_adc
+from sensor_pack_2.memaudit import audit_alloc
+
+
+def test_raw_mode_next_within_zero_budget():
+    adc, _ = make_adc(code=100000)
+    adc.start_measurement(single_shot=False, data_rate_raw=3, gain_raw=0, channel=0, differential_channel=True)
+    adc.raw_mode = True
+    assert 100000 == next(adc)
+    assert 0 == audit_alloc(adc.__next__, n=240, budget=0)
+    assert 0 == audit_alloc(adc.get_raw_value, n=240, budget=0)
+
+
+def test_accumulation_exceeds_budget():
+    kept = []
+    with pytest.raises(RuntimeError):
+        audit_alloc(lambda: kept.append(bytearray(64)), n=100, budget=0)
+
+
+def test_transient_allocation_exceeds_budget():
+    report = namedtuple("report", "text values code")
+    code = [100000]
+    # объекты на каждый вызов, сразу освобождаемые: кортеж, строка, список
+    with pytest.raises(RuntimeError):
+        audit_alloc(lambda: report(f"{code[0]}", [code[0]], code[0]), n=100, budget=0)
+    with pytest.raises(RuntimeError):
+        audit_alloc(lambda: bytearray(256), n=100, budget=0)
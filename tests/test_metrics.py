@@ -0,0 +1,61 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+from fakes import make_adc
+from sensor_pack_2 import metrics
+from sensor_pack_2.metrics import MetricsRegistry, to_prometheus
+
+
+def test_single_mcp3421_counts_into_own_slot():
+    reg = MetricsRegistry(max_slots=1)
+    adc, bus = make_adc()
+    adc.attach_metrics(reg, "a")
+    for _ in range(5):
+        next(adc)
+    snap = reg.snapshot()
+    assert 1 == len(snap)
+    assert "a" == snap[0].device
+    assert 5 == snap[0].transactions
+    assert 5 == snap[0].samples
+
+
+def test_two_devices_do_not_share_slots():
+    reg = MetricsRegistry(max_slots=2)
+    a, _ = make_adc(address=0x68)
+    b, _ = make_adc(address=0x69)
+    a.attach_metrics(reg, "a")
+    b.attach_metrics(reg, "b")
+    for _ in range(3):
+        next(a)
+    next(b)
+    counts = {s.device: s.transactions for s in reg.snapshot()}
+    assert {"a": 3, "b": 1} == counts
+
+
+def test_snapshot_does_not_change_registry_state(monkeypatch):
+    now = [1000]
+    monkeypatch.setattr(metrics, "ticks_ms", lambda: now[0])
+    reg = MetricsRegistry(max_slots=1)
+    slot = reg.register("a")
+    for _ in range(10):
+        reg.on_read(slot, 100, True)
+    now[0] += 500
+    first = reg.snapshot()
+    # другой клиент (например, HTTP сервер) читает метрики между снимками первого
+    for _ in range(5):
+        reg.snapshot()
+    for _ in range(10):
+        reg.on_read(slot, 100, True)
+    now[0] += 250
+    second = reg.snapshot(first)
+    assert 20 == second[0].samples
+    assert 250 == second[0].ticks - first[0].ticks
+    # 10 новых отсчетов за 250 мс от снимка first, а не от последнего снимка другого клиента
+    assert 40.0 == second[0].sps
+
+
+def test_prometheus_escapes_label_values():
+    reg = MetricsRegistry(max_slots=1)
+    reg.register('a"b\\c\nd')
+    text = to_prometheus(reg.snapshot())
+    assert 'mcp342x_samples_total{device="a\\"b\\\\c\\nd",channel="0"} 0' in text.split("\n")
@@ -0,0 +1,82 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import queue
+import threading
+import time
+from fakes import FakeMcp, make_adc
+from sensor_pack_2.multibus import MultiBusPoller
+
+
+def _drain(q: queue.Queue, seconds: float = 0.0) -> list:
+    """Отсчеты из очереди за seconds секунд, затем все оставшиеся"""
+    out = []
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        try:
+            out.append(q.get(timeout=0.01))
+        except queue.Empty:
+            pass
+    while not q.empty():
+        out.append(q.get_nowait())
+    return out
+
+
+def test_merged_output_is_ordered():
+    a, _ = make_adc(address=0x68)
+    b, _ = make_adc(address=0x69)
+    with MultiBusPoller([a, b]) as poller:
+        got = _drain(poller.output, 0.2)
+    got += _drain(poller.output)
+    stamps = [s.timestamp for s in got]
+    assert stamps == sorted(stamps)
+    assert {0, 1} == {s.bus for s in got}
+    assert all(0 == late for _, _, late in poller.get_stats())
+
+
+def test_blocked_bus_does_not_stall_others():
+    a, _ = make_adc(address=0x68)
+    b, bus_b = make_adc(address=0x69)
+    gate = threading.Event()
+    bus_b.gate = gate       # шина b зависает на первой же транзакции
+    poller = MultiBusPoller([a, b], max_lateness=4)
+    poller.start()
+    try:
+        got = _drain(poller.output, 0.3)
+        # отсчеты шины a выдаются, пока шина b висит
+        assert len([s for s in got if 0 == s.bus]) > 10
+        assert not [s for s in got if 1 == s.bus]
+    finally:
+        gate.set()
+        poller.stop()
+    got += _drain(poller.output)
+    late = [s for s in got if 1 == s.bus]
+    assert late
+    assert poller.get_stats()[1][2] >= 1
+    # опоздавший отсчет выдан с настоящей отметкой времени (до зависания)
+    assert late[0].timestamp < max(s.timestamp for s in got if 0 == s.bus)
+
+
+def test_sample_reports_configured_channel():
+    a, bus_a = make_adc(model="mcp3424", address=0x68)
+    a.start_measurement(single_shot=False, data_rate_raw=0, gain_raw=0, channel=2, differential_channel=True)
+    b, bus_b = make_adc(address=0x69)
+    # MCP3421: биты CH ответа не используются и могут быть любыми
+    bus_b.cfg |= 0x60
+    with MultiBusPoller([a, b]) as poller:
+        got = _drain(poller.output, 0.1)
+    got += _drain(poller.output)
+    assert {(0x68, 2), (0x69, 0)} == {(s.address, s.channel) for s in got}
+
+
+def test_stop_with_full_bounded_queue():
+    a, _ = make_adc(address=0x68)
+    poller = MultiBusPoller([a], maxsize=2)
+    poller.start()
+    time.sleep(0.1)     # очередь не читается и заполняется
+    stopper = threading.Thread(target=poller.stop)
+    stopper.start()
+    stopper.join(2)
+    assert not stopper.is_alive()
+    assert 2 == poller.output.qsize()
+    assert poller.dropped > 0
@@ -0,0 +1,23 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import numpy as np
+from host_tools.noise import analyze_captures, iter_chunks, adc_config
+
+
+def test_welch_segments_do_not_span_captures():
+    # две записи одной настройки без шума, с разным смещением: сегмент через границу записей дал бы скачок
+    first, second = np.zeros(300, dtype=np.int32), np.full(300, 1000, dtype=np.int32)
+    res = analyze_captures([(3, 0, iter_chunks(first, 100)), (3, 0, iter_chunks(second, 100))])
+    r = res[adc_config(3, 0)]
+    assert 600 == r.count
+    assert r.nsd is not None and np.allclose(r.nsd, 0.0)
+
+
+def test_statistics_independent_of_chunk_size():
+    x = np.random.default_rng(1).integers(-50, 50, 5000).astype(np.int32)
+    a = analyze_captures([(3, 0, iter_chunks(x, 333))])[adc_config(3, 0)]
+    b = analyze_captures([(3, 0, iter_chunks(x, 5000))])[adc_config(3, 0)]
+    assert a.count == b.count
+    assert abs(a.rms - b.rms) < 1e-12
+    assert np.allclose(a.nsd, b.nsd)
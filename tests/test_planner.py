@@ -0,0 +1,48 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+from collections import namedtuple
+import pytest
+from fakes import make_adc
+from mcp342x_planner import plan, apply_plan
+
+
+def test_loose_target_gives_fastest_rate():
+    res = plan(2.0, noise_free_bits=8)
+    assert (0, 0, 1) == (res.data_rate_raw, res.gain_raw, res.oversampling)
+    assert 240 == res.throughput
+
+
+def test_result_meets_target_within_input_range():
+    res = plan(0.3, max_noise_uv=5)
+    assert res.noise_rms <= 5E-6
+    # 0.3 В укладывается в шкалу PGA = 4 (±0.512 В), но не PGA = 8 (±0.256 В)
+    assert res.gain_raw <= 2
+    assert 0 == plan(1.5, noise_free_bits=14).gain_raw
+
+
+def test_measured_noise_overrides_model():
+    table = {(r, g): 2E-5 for r in range(4) for g in range(4)}
+    res = plan(0.3, max_noise_uv=5, noise_table=table)
+    assert res.oversampling > 1
+    assert res.noise_rms <= 5E-6
+    stats = namedtuple("stats", "rms")
+    assert res == plan(0.3, max_noise_uv=5, noise_table={k: stats(v) for k, v in table.items()})
+
+
+def test_bad_requests():
+    with pytest.raises(ValueError):
+        plan(3.0, noise_free_bits=8)
+    with pytest.raises(ValueError):
+        plan(1.0)
+    with pytest.raises(ValueError):
+        plan(0.1, max_noise_uv=0.01)
+
+
+def test_apply_plan_configures_adc():
+    adc, bus = make_adc()
+    res = plan(0.3, max_noise_uv=5)
+    apply_plan(adc, res)
+    assert res.data_rate_raw == (bus.cfg >> 2) & 0x03
+    assert res.gain_raw == bus.cfg & 0x03
+    assert bus.cfg & 0x10
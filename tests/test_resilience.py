@@ -0,0 +1,39 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import pytest
+from fakes import RecordingAdapter, make_adc
+from sensor_pack_2.memaudit import audit_alloc
+from sensor_pack_2.resilience import ResilientAdapter, RetryPolicy
+
+
+def test_memory_transfers_forward_address_size():
+    inner = RecordingAdapter()
+    ra = ResilientAdapter(inner, RetryPolicy(retries=0))
+    buf = bytearray(2)
+    ra.read_buf_from_memory(0x50, 0x1234, buf, 2)
+    ra.write_buf_to_memory(0x50, 0x1234, buf, address_size=2)
+    assert [("read_buf_from_memory", 0x50, 0x1234, buf, 2),
+            ("write_buf_to_memory", 0x50, 0x1234, buf, 2)] == inner.calls
+
+
+def test_retry_then_failure_counted():
+    inner = RecordingAdapter()
+    ra = ResilientAdapter(inner, RetryPolicy(retries=2, base_delay_us=0))
+    buf = bytearray(3)
+    inner.fail = 2
+    assert buf is ra.read_to_buf(0x68, buf)
+    inner.fail = 3
+    with pytest.raises(OSError):
+        ra.write(0x68, b"\x10")
+    assert (2, 5, 4, 1) == tuple(ra.get_counters(0x68))
+    assert 6 == len(inner.calls)
+
+
+def test_read_without_errors_allocates_nothing():
+    adc, _ = make_adc(code=100000)
+    adc.adapter = ResilientAdapter(adc.adapter)
+    adc.start_measurement(single_shot=False, data_rate_raw=3, gain_raw=0, channel=0, differential_channel=True)
+    adc.raw_mode = True
+    assert 100000 == next(adc)
+    assert 0 == audit_alloc(adc.__next__, n=240, budget=0)
@@ -0,0 +1,45 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+from fakes import make_adc
+from sensor_pack_2.adcmod import RAW_GAP
+from sensor_pack_2.samples import SampleBatch, limit_flags, FLAG_GAP, FLAG_LOW_LIMIT, FLAG_HI_LIMIT
+
+
+def test_limit_flags():
+    assert FLAG_LOW_LIMIT == limit_flags(-2048, 12)
+    assert FLAG_HI_LIMIT == limit_flags(2047, 12)
+    assert 0 == limit_flags(2046, 12)
+    assert FLAG_HI_LIMIT == limit_flags(2046, 12, delta=1)
+    assert FLAG_HI_LIMIT == limit_flags(0x1FFFF, 18)
+    assert 0 == limit_flags(RAW_GAP, 18)
+
+
+def test_read_batch_sets_flags_and_gaps():
+    adc, bus = make_adc(model="mcp3424", code=-2048)
+    adc.start_measurement(single_shot=False, data_rate_raw=0, gain_raw=0, channel=2, differential_channel=True)
+    batch = SampleBatch(8)
+    assert 1 == adc.read_batch(batch, count=1, channel_base=4)
+    bus.code = 2047
+    assert 1 == adc.read_batch(batch, count=1, channel_base=4)
+    bus.code = 100
+    bus.fail = 1
+    # пакет заполняется до конца: пропуск и 5 обычных отсчетов
+    assert 6 == adc.read_batch(batch, channel_base=4)
+    assert batch.is_full()
+    assert [-2048, 2047, RAW_GAP, 100] == list(batch.raw[:4])
+    assert [FLAG_LOW_LIMIT, FLAG_HI_LIMIT, FLAG_GAP, 0] == list(batch.flags[:4])
+    assert {6} == set(batch.channel)
+    assert 1 == adc.bus_errors
+    assert 0 == adc.read_batch(batch)
+
+
+def test_channel_values_skip_gaps():
+    batch = SampleBatch(4)
+    batch.append(5, 1, 10)
+    batch.append(RAW_GAP, 1, 11)
+    batch.append(7, 0, 12)
+    out = [0] * 4
+    assert 1 == batch.channel_values(1, out)
+    assert 5 == out[0]
+    assert [1, 1, 0] == [s.channel for s in batch]
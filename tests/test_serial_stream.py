@@ -0,0 +1,106 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import asyncio
+import io
+import os
+import struct
+import zlib
+import pytest
+from sensor_pack_2.framing import FrameWriter, SYNC, FRAME_SAMPLES, ENC_RAW, ENC_DELTA, HEADER_FMT, SAMPLES_FMT, \
+    MAX_PAYLOAD
+from host_tools.serial_stream import FrameDecoder, SampleStream, open_serial, stream_config, sample_block
+
+
+class _Adc:
+    """Настройки АЦП для кадра FRAME_CONFIG"""
+    address = 0x68
+    current_sample_rate = 0
+    current_raw_gain = 0
+    current_resolution = 12
+    sample_rate = 240
+
+    class channel:
+        number = 0
+
+    @staticmethod
+    def raw_value_to_real(raw: int) -> float:
+        # с калибровкой: смещение нуля
+        return raw * 0.001 + 0.25
+
+
+def _bad_frame(seq: int) -> bytes:
+    """Кадр с верной CRC, но неизвестным кодированием отсчетов"""
+    payload = struct.pack(SAMPLES_FMT, 0, 7, 0, 1) + bytes(4)
+    body = struct.pack(HEADER_FMT, len(payload), FRAME_SAMPLES, seq) + payload
+    return SYNC + body + struct.pack("<I", zlib.crc32(body))
+
+
+def _stream() -> bytes:
+    """Кадр настроек, кадр отсчетов, недекодируемый кадр, кадр отсчетов (порядковые номера подряд)"""
+    out = io.BytesIO()
+    fw = FrameWriter(out, max_samples=16, encoding=ENC_DELTA)
+    fw.send_config(_Adc())
+    fw.send_samples([1, 2, 3, 4])
+    out.write(_bad_frame(2))
+    fw._seq = 3
+    fw.send_samples([5, -6, 7])
+    return out.getvalue()
+
+
+def _check(frames, dec: FrameDecoder):
+    assert [type(f) for f in frames] == [stream_config, sample_block, sample_block]
+    assert [1, 2, 3, 4] == frames[1].values.tolist()
+    assert [5, -6, 7] == frames[2].values.tolist()
+    assert 1 == dec.decode_errors
+    assert 0 == dec.lost
+    assert 0 == dec.crc_errors
+
+
+def test_undecodable_frame_is_skipped():
+    dec = FrameDecoder()
+    frames = dec.feed(_stream())
+    _check(frames, dec)
+    assert 0 == len(dec._buf)
+
+
+def test_undecodable_frame_byte_by_byte():
+    dec = FrameDecoder()
+    frames = []
+    for b in _stream():
+        frames += dec.feed(bytes((b,)))
+    _check(frames, dec)
+
+
+def test_pty_stream():
+    master, slave = os.openpty()
+
+    async def run():
+        # open_serial до передачи: терминал в двоичном режиме
+        reader = await open_serial(slave, baudrate=None)
+        os.write(master, b"\x00\xA5noise" + _stream())
+        ss = SampleStream(reader)
+        got = []
+        async for block, volts in ss.blocks():
+            got.append((block, volts))
+            if 2 == len(got):
+                break
+        return ss, got
+
+    try:
+        ss, got = asyncio.run(asyncio.wait_for(run(), 5))
+    finally:
+        os.close(master)
+    assert ss.config is not None
+    assert [5, -6, 7] == got[1][0].values.tolist()
+    assert abs(got[1][1][1] - (-6 * 0.001 + 0.25)) < 1e-6
+    assert 1 == ss.decoder.decode_errors
+
+
+def test_frame_longer_than_decoder_limit_rejected():
+    n = (MAX_PAYLOAD - struct.calcsize(SAMPLES_FMT)) // 4
+    FrameWriter(io.BytesIO(), max_samples=n, encoding=ENC_RAW)
+    with pytest.raises(ValueError):
+        FrameWriter(io.BytesIO(), max_samples=n + 1, encoding=ENC_RAW)
+    with pytest.raises(ValueError):
+        FrameWriter(io.BytesIO(), max_samples=n, encoding=ENC_DELTA)
@@ -0,0 +1,79 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+from sensor_pack_2.bus_service import SpiAdapter
+
+
+class _Pin:
+    """Вывод выбора устройства (chip select)"""
+
+    def __init__(self):
+        self.selected = False
+
+    def low(self):
+        self.selected = True
+
+    def high(self):
+        self.selected = False
+
+
+class _SpiMemory:
+    """Память SPI (EEPROM): команда 0x03 - чтение, 0x02 - запись, затем адрес (2 байта, старшим вперед)"""
+
+    def __init__(self, cs: _Pin):
+        self.mem = bytearray(range(256)) * 256
+        self.cs = cs
+        self.sent = []
+
+    def read(self, n: int) -> bytes:
+        assert self.cs.selected
+        return bytes(range(n))
+
+    def write(self, buf):
+        assert self.cs.selected
+        self.sent.append(bytes(buf))
+
+    def write_readinto(self, tx, rx):
+        assert self.cs.selected and len(tx) == len(rx)
+        self.sent.append(bytes(tx))
+        assert 0x03 == tx[0]
+        addr = tx[1] << 8 | tx[2]
+        rx[3:] = self.mem[addr:addr + len(rx) - 3]
+
+
+def _adapter():
+    cs = _Pin()
+    spi = _SpiMemory(cs)
+    adapter = SpiAdapter(spi)
+    adapter.mem_read_cmd, adapter.mem_write_cmd = 0x03, 0x02
+    return adapter, spi, cs
+
+
+def test_read_buf_from_memory_single_transfer():
+    adapter, spi, cs = _adapter()
+    buf = bytearray(4)
+    adapter.read_buf_from_memory(cs, 0x0102, buf, address_size=2)
+    assert bytes((2, 3, 4, 5)) == buf
+    # одна транзакция: заголовок, затем нули
+    assert [bytes((0x03, 0x01, 0x02, 0, 0, 0, 0))] == spi.sent
+    buf = bytearray(2)
+    adapter.read_buf_from_memory(cs, 0x0010, buf, address_size=2)
+    assert bytes((0x10, 0x11)) == buf
+    assert bytes((0x03, 0x00, 0x10, 0, 0)) == spi.sent[-1]
+    assert not cs.selected
+
+
+def test_read_returns_bytes():
+    adapter, spi, cs = _adapter()
+    first = adapter.read(cs, 3)
+    adapter.read(cs, 2)
+    assert isinstance(first, bytes) and b"\x00\x01\x02" == first
+
+
+def test_prepare_func_applied_to_data():
+    adapter, spi, cs = _adapter()
+    prepared = []
+    adapter.prepare_func = lambda buf, index: prepared.append(bytes(buf))
+    adapter.write_buf_to_memory(cs, 0x0203, b"\xAA\xBB", address_size=2)
+    assert [b"\xAA\xBB"] == prepared
+    assert [bytes((0x02, 0x02, 0x03)), b"\xAA\xBB"] == spi.sent
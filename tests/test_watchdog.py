@@ -0,0 +1,61 @@
+# CPython
+# MIT license
+# Copyright (c) 2024 Roman Shevchik   goctaprog@gmail.com
+import pytest
+import mcp3421mod
+from fakes import make_adc
+from mcp3421mod import StallWatchdog
+
+
+def _watched_adc(**kwargs):
+    adc, bus = make_adc(code=321)
+    adc.start_measurement(single_shot=False, data_rate_raw=0, gain_raw=1, channel=0, differential_channel=True)
+    adc.raw_mode = True
+    wd = StallWatchdog(**kwargs)
+    adc.attach_watchdog(wd)
+    return adc, bus, wd
+
+
+def test_reset_config_is_restored_with_one_write():
+    adc, bus, wd = _watched_adc()
+    assert 321 == next(adc)
+    # сброс АЦП после просадки питания: конфигурация по умолчанию
+    bus.cfg = 0x90
+    assert next(adc) is None
+    assert (1, 1) == (wd.mismatches, wd.recoveries)
+    assert 0x11 == bus.cfg & 0x7F
+    assert 321 == next(adc)
+    assert 1 == wd.recoveries
+
+
+def test_stalled_conversions_are_recovered(monkeypatch):
+    now = [0]
+    monkeypatch.setattr(mcp3421mod, "ticks_us", lambda: now[0])
+    adc, bus, wd = _watched_adc(stall_periods=4)
+    limit = 4 * adc.get_conversion_cycle_time()
+    bus.busy = True
+    next(adc)
+    now[0] += limit
+    next(adc)
+    assert 0 == wd.stalls
+    now[0] += 1
+    next(adc)
+    assert (1, 1, 0) == (wd.stalls, wd.recoveries, wd.mismatches)
+    # новый отсчет сбрасывает отсчет времени
+    bus.busy = False
+    next(adc)
+    bus.busy = True
+    now[0] += limit
+    next(adc)
+    next(adc)
+    assert 1 == wd.stalls
+
+
+def test_single_shot_is_not_watched():
+    adc, bus, wd = _watched_adc()
+    adc.start_measurement(single_shot=True, data_rate_raw=0, gain_raw=1, channel=0, differential_channel=True)
+    wd.arm(adc, adc.get_raw_config())
+    assert wd.expected is None
+    assert wd.check(adc, 0x90)
+    with pytest.raises(ValueError):
+        StallWatchdog(-1)